@@ -0,0 +1,4 @@
+"""Benchmarks for the formula parser and all exports of tablespam.
+
+Run `python -m benchmarks.run --help` from the root of the repository for details.
+"""
@@ -0,0 +1,61 @@
+"""Compare two benchmark runs created with benchmarks/run.py.
+
+Run with `python -m benchmarks.compare old.json new.json`. For each table and
+operation that is part of both runs, the script prints the median run times and
+their ratio (new / old). Ratios below 1 mean that the new run is faster.
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import Any
+
+
+def load_medians(file: Path) -> dict[tuple[str, str], float]:
+    """Load the median run times of a benchmark run.
+
+    Args:
+        file (Path): JSON file created with benchmarks/run.py
+
+    Returns:
+        dict[tuple[str, str], float]: median run time in seconds per table (case) and operation
+    """
+    results: dict[str, Any] = json.loads(file.read_text(encoding='utf-8'))
+    return {
+        (record['case'], record['operation']): record['median']
+        for record in results['results']
+    }
+
+
+def compare(old: Path, new: Path) -> list[str]:
+    """Compare the median run times of two benchmark runs.
+
+    Args:
+        old (Path): JSON file of the reference run
+        new (Path): JSON file of the new run
+
+    Returns:
+        list[str]: one line per table and operation found in both runs
+    """
+    old_medians = load_medians(old)
+    new_medians = load_medians(new)
+    lines = [
+        f'{"case":>20} {"operation":>16} {"old [s]":>10} {"new [s]":>10} {"ratio":>7}'
+    ]
+    for key, new_median in new_medians.items():
+        if key not in old_medians:
+            continue
+        old_median = old_medians[key]
+        ratio = new_median / old_median if old_median > 0 else float('inf')
+        lines.append(
+            f'{key[0]:>20} {key[1]:>16} {old_median:10.4f} {new_median:10.4f} {ratio:7.2f}'
+        )
+    return lines
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('old', type=Path)
+    parser.add_argument('new', type=Path)
+    args = parser.parse_args()
+    print('\n'.join(compare(args.old, args.new)))
@@ -0,0 +1,121 @@
+"""Synthetic data sets and formulas for the benchmarks.
+
+The tables can be scaled along the dimensions that matter for the performance of
+tablespam: the number of rows and columns, the number of row name columns (lhs depth),
+the nesting of the spanners, and the mix of data types.
+"""
+
+from dataclasses import dataclass, field
+import numpy as np
+import polars as pl
+
+DTYPES = ('float', 'int', 'str', 'date', 'bool')
+
+
+@dataclass(frozen=True)
+class TableSize:
+    """Dimensions of a synthetic table.
+
+    Attributes:
+        rows (int): number of rows of the data
+        cols (int): number of columns shown right of the row names (rhs)
+        lhs_depth (int): number of row name columns. 0 creates a table without row names.
+        nesting (int): number of nested spanner levels above the columns
+        group_size (int): number of sub-entries of each spanner
+        dtypes (tuple[str, ...]): data types of the columns, assigned in turn (see DTYPES)
+        seed (int): seed of the random number generator
+    """
+
+    rows: int = 1_000
+    cols: int = 10
+    lhs_depth: int = 1
+    nesting: int = 1
+    group_size: int = 4
+    dtypes: tuple[str, ...] = field(default=('float',))
+    seed: int = 1
+
+
+def make_data(size: TableSize) -> pl.DataFrame:
+    """Create a data set with row names and columns.
+
+    The row names are sorted, so that consecutive rows share the same names and can be
+    merged. Each row name column has ten times more distinct values than the one to
+    its left. About 5% of the cells of the columns are missing.
+
+    Args:
+        size (TableSize): dimensions of the table
+
+    Returns:
+        pl.DataFrame: data set with the row names (group_0, ...) followed by the columns (col_0, ...)
+    """
+    rng = np.random.default_rng(size.seed)
+    columns: dict[str, pl.Series] = {}
+    for level in range(size.lhs_depth):
+        groups = np.sort(rng.integers(0, 10 ** (level + 1), size.rows))
+        columns[f'group_{level}'] = pl.Series([f'g{value}' for value in groups])
+    if size.lhs_depth > 0:
+        order = pl.DataFrame(columns).sort(list(columns))
+        columns = {name: order.get_column(name) for name in columns}
+
+    for col in range(size.cols):
+        dtype = size.dtypes[col % len(size.dtypes)]
+        values = make_column(rng=rng, dtype=dtype, rows=size.rows)
+        missing = rng.random(size.rows) < 0.05
+        columns[f'col_{col}'] = values.scatter(np.flatnonzero(missing), None)
+    return pl.DataFrame(columns)
+
+
+def make_column(rng: np.random.Generator, dtype: str, rows: int) -> pl.Series:
+    """Create the values of a single column.
+
+    Args:
+        rng (np.random.Generator): random number generator
+        dtype (str): one of DTYPES
+        rows (int): number of rows
+
+    Raises:
+        ValueError: Error if the data type is unknown.
+
+    Returns:
+        pl.Series: values of the column
+    """
+    if dtype == 'float':
+        return pl.Series(rng.normal(100, 25, rows))
+    if dtype == 'int':
+        return pl.Series(rng.integers(0, 10_000, rows))
+    if dtype == 'str':
+        return pl.Series([f'item {value}' for value in rng.integers(0, 1_000, rows)])
+    if dtype == 'date':
+        # Days since 1970-01-01, starting in the year 2000
+        return pl.Series(rng.integers(10_957, 19_957, rows)).cast(pl.Date)
+    if dtype == 'bool':
+        return pl.Series(rng.random(rows) < 0.5)
+    raise ValueError(f'Unknown data type {dtype}. Use one of {DTYPES}.')
+
+
+def make_formula(size: TableSize) -> str:
+    """Create the formula of a table with nested spanners.
+
+    The columns are split into groups of group_size columns, the groups into groups of
+    group_size spanners, and so on, until there are nesting levels of spanners. Every
+    other column is renamed (e.g., `Col 1:col_1`).
+
+    Args:
+        size (TableSize): dimensions of the table
+
+    Returns:
+        str: formula for the data created with make_data
+    """
+    entries = [
+        f'`Col {col}`:col_{col}' if col % 2 == 1 else f'col_{col}'
+        for col in range(size.cols)
+    ]
+    for level in range(size.nesting):
+        entries = [
+            f'(`Level {level} Spanner {index}` = '
+            + ' + '.join(entries[start : start + size.group_size])
+            + ')'
+            for index, start in enumerate(range(0, len(entries), size.group_size))
+        ]
+    lhs = ' + '.join(f'group_{level}' for level in range(size.lhs_depth)) or '1'
+    return f'{lhs} ~ ' + ' + '.join(entries)
@@ -0,0 +1,59 @@
+"""Measure how long `import tablespam` takes in a new interpreter.
+
+Run with `python benchmarks/import_time.py`. Each repetition starts a new Python
+process with `-X importtime`, so that no module is cached. The script prints the
+median cumulative import time of tablespam and of its largest dependencies.
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+
+MODULES = ['tablespam', 'polars', 'numpy', 'great_tables', 'openpyxl']
+
+
+def import_times(module: str = 'tablespam') -> dict[str, int]:
+    """Import a module in a new interpreter and return the import times.
+
+    Args:
+        module (str, optional): module that is imported. Defaults to 'tablespam'.
+
+    Returns:
+        dict[str, int]: cumulative import time in microseconds of each module in MODULES
+            that was imported. Modules that were not imported are missing.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    # Lines have the format 'import time: self [us] | cumulative | imported package'
+    for line in result.stderr.splitlines():
+        parts = line.removeprefix('import time:').split('|')
+        if len(parts) == 3 and parts[2].strip() in MODULES:
+            times[parts[2].strip()] = int(parts[1])
+    return times
+
+
+def benchmark_import(repeat: int = 5) -> dict[str, float]:
+    """Measure the median import times of tablespam.
+
+    Args:
+        repeat (int, optional): number of new interpreters. Defaults to 5.
+
+    Returns:
+        dict[str, float]: median cumulative import time in milliseconds per module
+    """
+    runs = [import_times() for _ in range(repeat)]
+    return {
+        module: statistics.median(run[module] for run in runs) / 1000
+        for module in MODULES
+        if module in runs[0]
+    }
+
+
+if __name__ == '__main__':
+    print(json.dumps(benchmark_import(), indent=2))
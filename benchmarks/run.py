@@ -0,0 +1,273 @@
+"""Measure the run time of the formula parser, the table construction, and all exports.
+
+Run with `python -m benchmarks.run --output results.json` from the root of the
+repository. The synthetic tables (see benchmarks/data.py) are scaled along one dimension
+at a time, starting from a base table. Each operation is repeated and the timings are
+written to JSON together with the versions of Python and the dependencies, so that runs
+can be compared over time (see benchmarks/compare.py).
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import asdict, replace
+from datetime import datetime, timezone
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Any
+
+from benchmarks.data import DTYPES, TableSize, make_data, make_formula
+from benchmarks.import_time import benchmark_import
+
+BASE = TableSize()
+
+PRESETS: dict[str, dict[str, TableSize]] = {
+    'quick': {
+        'base': replace(BASE, rows=100),
+        'rows': replace(BASE, rows=1_000),
+        'cols': replace(BASE, rows=100, cols=50),
+        'lhs_depth': replace(BASE, rows=100, lhs_depth=3),
+        'nesting': replace(BASE, rows=100, cols=50, nesting=2),
+        'dtypes': replace(BASE, rows=100, dtypes=DTYPES),
+    },
+    'full': {
+        'base': BASE,
+        'rows_10k': replace(BASE, rows=10_000),
+        'rows_100k': replace(BASE, rows=100_000),
+        'cols_100': replace(BASE, cols=100),
+        'cols_500': replace(BASE, cols=500),
+        'lhs_depth_0': replace(BASE, lhs_depth=0),
+        'lhs_depth_3': replace(BASE, lhs_depth=3),
+        'nesting_0': replace(BASE, cols=100, nesting=0),
+        'nesting_3': replace(BASE, cols=100, nesting=3),
+        'dtypes_mixed': replace(BASE, dtypes=DTYPES),
+        'dtypes_mixed_10k': replace(BASE, rows=10_000, cols=50, dtypes=DTYPES),
+    },
+}
+
+OPERATIONS = [
+    'formula',
+    'construct',
+    'as_string',
+    'as_gt',
+    'as_excel',
+    'as_excel_stream',
+]
+
+PACKAGES = ['tablespam', 'polars', 'numpy', 'great_tables', 'openpyxl']
+
+
+def time_operation(
+    operation: Callable[[], Any],
+    repeat: int,
+    setup: Callable[[], Any] | None = None,
+    warmup: int = 1,
+) -> list[float]:
+    """Time an operation repeatedly.
+
+    The operation is first run warmup times without timing it, so that modules that
+    are imported on first use (e.g., great_tables) do not distort the timings.
+
+    Args:
+        operation (Callable[[], Any]): function that is timed
+        repeat (int): number of repetitions
+        setup (Callable[[], Any] | None, optional): function that is called before each
+            repetition and that is not timed. Defaults to None.
+        warmup (int, optional): number of untimed runs. Defaults to 1.
+
+    Returns:
+        list[float]: run time of each repetition in seconds
+    """
+    for _ in range(warmup):
+        operation()
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        operation()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def benchmark_case(
+    size: TableSize,
+    repeat: int = 3,
+    operations: list[str] | None = None,
+) -> dict[str, list[float]]:
+    """Run the benchmarks for a single synthetic table.
+
+    Args:
+        size (TableSize): dimensions of the table
+        repeat (int, optional): number of repetitions of each operation. Defaults to 3.
+        operations (list[str] | None, optional): operations that are timed (see OPERATIONS).
+            Defaults to None, which times all operations.
+
+    Raises:
+        ValueError: Error if an operation is unknown.
+
+    Returns:
+        dict[str, list[float]]: run times in seconds of each repetition per operation
+    """
+    from tablespam import TableSpam, clear_formula_cache
+    from tablespam._Formula.Formulas import Formula
+
+    operations = OPERATIONS if operations is None else operations
+    unknown = set(operations) - set(OPERATIONS)
+    if unknown:
+        raise ValueError(f'Unknown operations {sorted(unknown)}. Use {OPERATIONS}.')
+
+    data = make_data(size)
+    formula = make_formula(size)
+
+    def construct() -> TableSpam:
+        tbl = TableSpam(data=data, formula=formula, title='Title', footnote='Note')
+        # The header is created when it is first used
+        tbl.layout
+        return tbl
+
+    tbl = construct()
+    results: dict[str, list[float]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        file = Path(tmp) / 'table.xlsx'
+        timed: dict[str, Callable[[], Any]] = {
+            'formula': lambda: Formula(formula).parse_trees(),
+            'construct': construct,
+            'as_string': tbl.as_string,
+            'as_gt': tbl.as_gt,
+            'as_excel': lambda: tbl.as_excel().save(file),
+            'as_excel_stream': lambda: tbl.as_excel(mode='stream').save(file),
+        }
+        for operation in operations:
+            results[operation] = time_operation(
+                timed[operation],
+                repeat=repeat,
+                # Tables are constructed from scratch, including the formula
+                setup=clear_formula_cache if operation == 'construct' else None,
+            )
+    return results
+
+
+def package_versions() -> dict[str, str | None]:
+    """Get the installed versions of tablespam and its dependencies.
+
+    Returns:
+        dict[str, str | None]: version of each package in PACKAGES; None if it is not installed
+    """
+    versions: dict[str, str | None] = {}
+    for package in PACKAGES:
+        try:
+            versions[package] = version(package)
+        except PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+def git_commit() -> str | None:
+    """Get the current git commit of the repository.
+
+    Returns:
+        str | None: hash of the commit or None if it cannot be determined
+    """
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def run_benchmarks(
+    preset: str = 'full',
+    repeat: int = 3,
+    operations: list[str] | None = None,
+    import_repeat: int = 5,
+) -> dict[str, Any]:
+    """Run all benchmarks of a preset.
+
+    Args:
+        preset (str, optional): name of the preset in PRESETS. Defaults to 'full'.
+        repeat (int, optional): number of repetitions of each operation. Defaults to 3.
+        operations (list[str] | None, optional): operations that are timed (see OPERATIONS).
+            Defaults to None, which times all operations.
+        import_repeat (int, optional): number of repetitions of the import benchmark
+            (see benchmarks/import_time.py). 0 skips the import benchmark. Defaults to 5.
+
+    Returns:
+        dict[str, Any]: results with the keys 'metadata', 'import' (median import
+            times in milliseconds), and 'results' (one record per table and operation)
+    """
+    results = []
+    for case, size in PRESETS[preset].items():
+        for operation, times in benchmark_case(
+            size=size, repeat=repeat, operations=operations
+        ).items():
+            results.append(
+                {
+                    'case': case,
+                    'operation': operation,
+                    'size': asdict(size),
+                    'times': times,
+                    'min': min(times),
+                    'median': statistics.median(times),
+                }
+            )
+    return {
+        'metadata': {
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'preset': preset,
+            'repeat': repeat,
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'packages': package_versions(),
+        },
+        'import': benchmark_import(repeat=import_repeat) if import_repeat > 0 else {},
+        'results': results,
+    }
+
+
+def main() -> None:
+    """Run the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--preset', choices=list(PRESETS), default='full')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument(
+        '--operations', nargs='+', choices=OPERATIONS, default=None, metavar='OP'
+    )
+    parser.add_argument('--import-repeat', type=int, default=5)
+    parser.add_argument(
+        '--output', type=Path, default=None, help='JSON file; printed if missing.'
+    )
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        preset=args.preset,
+        repeat=args.repeat,
+        operations=args.operations,
+        import_repeat=args.import_repeat,
+    )
+    text = json.dumps(results, indent=2)
+    if args.output is None:
+        print(text)
+        return
+    args.output.write_text(text + '\n', encoding='utf-8')
+    for record in results['results']:
+        print(
+            f'{record["case"]:>20} {record["operation"]:>16} {record["median"]:10.4f} s'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,1170 @@
+"""Compose the final style of each cell of an Excel table before it is written.
+
+The elements of a table (background, title, header, data, merged cells, and outlines) each
+add a layer of styles to the cells they cover. Instead of applying these layers to the cells
+of the worksheet one after the other, the layers of each cell are collected first. The final
+style is then composed on an in-memory cell and assigned to the cell in the worksheet once.
+Cells with the same layers share their style, so each distinct combination of layers is only
+composed once.
+"""
+
+from __future__ import annotations
+from copy import copy
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Iterator, cast
+
+import numpy as np
+import polars as pl
+from openpyxl.cell.cell import Cell
+from openpyxl.styles.alignment import Alignment
+from openpyxl.styles.borders import Border, DEFAULT_BORDER
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.styles.fills import Fill, PatternFill, DEFAULT_EMPTY_FILL
+from openpyxl.styles.fonts import Font, DEFAULT_FONT
+from openpyxl.styles.protection import Protection
+from openpyxl.styles.proxy import StyleProxy
+from openpyxl.worksheet.cell_range import CellRange
+
+from tablespam.Excel.xlsx_styles import (
+    CellStyle,
+    ConditionalStyle,
+    DataStyle,
+    XlsxStyles,
+)
+from tablespam.Excel.style_spec import StyleSpec
+from tablespam.Excel._as_excel.write_excel import get_data_style
+from tablespam.Excel._as_excel.locations import Locations
+from tablespam._Formula.Layout import to_list
+
+if TYPE_CHECKING:
+    from tablespam.TableSpam import TableSpam
+
+Style = Callable[[Cell], None]
+
+# Solid fills in these colors look like cells without fill (except for the gridlines)
+WHITE_FILLS = {'00FFFFFF', 'FFFFFFFF'}
+
+# Number of rows that are translated to Python objects at once when creating the table body
+BATCH_SIZE = 10_000
+
+
+class StyledCell:
+    """In-memory stand-in for an openpyxl cell on which the style layers are composed.
+
+    StyledCell provides the style attributes of an openpyxl cell (font, fill, border,
+    alignment, number_format, and protection) as well as its value, row, and column,
+    which style functions may read. As for openpyxl cells, the style objects are immutable
+    and must be replaced to change the style. The number format is only assigned to cells
+    if a style layer sets it; otherwise, cells keep the number format of their value (e.g.,
+    the date format openpyxl uses for dates).
+    """
+
+    def __init__(
+        self, value: Any = None, row: int | None = None, column: int | None = None
+    ) -> None:
+        """Create a cell with openpyxl's default style.
+
+        Args:
+            value (Any, optional): value of the cell. Defaults to None.
+            row (int | None, optional): row of the cell. Defaults to None.
+            column (int | None, optional): column of the cell. Defaults to None.
+        """
+        self.value = value
+        self.row = row
+        self.column = column
+        self._font: Font = DEFAULT_FONT
+        self._fill: Fill = DEFAULT_EMPTY_FILL
+        self._border: Border = DEFAULT_BORDER
+        self._alignment = Alignment()
+        self._protection = Protection()
+        self._number_format: str | None = None
+
+    @property
+    def font(self) -> Font:
+        """Font of the cell."""
+        return cast(Font, StyleProxy(self._font))
+
+    @font.setter
+    def font(self, value: Font) -> None:
+        self._font = value
+
+    @property
+    def fill(self) -> Fill:
+        """Fill of the cell."""
+        return cast(Fill, StyleProxy(self._fill))
+
+    @fill.setter
+    def fill(self, value: Fill) -> None:
+        self._fill = value
+
+    @property
+    def border(self) -> Border:
+        """Border of the cell."""
+        return cast(Border, StyleProxy(self._border))
+
+    @border.setter
+    def border(self, value: Border) -> None:
+        self._border = value
+
+    @property
+    def alignment(self) -> Alignment:
+        """Alignment of the cell."""
+        return cast(Alignment, StyleProxy(self._alignment))
+
+    @alignment.setter
+    def alignment(self, value: Alignment) -> None:
+        self._alignment = value
+
+    @property
+    def number_format(self) -> str:
+        """Number format of the cell ('General' if no style layer sets one)."""
+        return 'General' if self._number_format is None else self._number_format
+
+    @number_format.setter
+    def number_format(self, value: str) -> None:
+        self._number_format = value
+
+    @property
+    def protection(self) -> Protection:
+        """Protection of the cell."""
+        return cast(Protection, StyleProxy(self._protection))
+
+    @protection.setter
+    def protection(self, value: Protection) -> None:
+        self._protection = value
+
+    def style_objects(
+        self, number_format: str = 'General'
+    ) -> tuple[Font, Fill, Border, Alignment, Protection, str]:
+        """Get the style objects of the cell.
+
+        Args:
+            number_format (str, optional): number format of the cell's value. Used if no
+                style layer sets a number format. Defaults to 'General'.
+
+        Returns:
+            tuple[Font, Fill, Border, Alignment, Protection, str]: font, fill, border, alignment,
+                protection, and number format of the cell
+        """
+        return (
+            self._font,
+            self._fill,
+            self._border,
+            self._alignment,
+            self._protection,
+            number_format if self._number_format is None else self._number_format,
+        )
+
+    def drop_default_lookalikes(self) -> None:
+        """Replace style objects that look like the default style by the default objects.
+
+        White solid fills are removed, fonts that only set the default name (Calibri) or
+        size (11) are replaced by the default font, and borders without any lines by the
+        default border.
+        """
+        fill = self._fill
+        if (
+            isinstance(fill, PatternFill)
+            and fill.patternType == 'solid'
+            and fill.fgColor is not None
+            and str(fill.fgColor.rgb).upper() in WHITE_FILLS
+        ):
+            self._fill = DEFAULT_EMPTY_FILL
+        font = self._font
+        if (
+            font.name in (None, DEFAULT_FONT.name)
+            and font.sz in (None, DEFAULT_FONT.sz)
+            and font.color in (None, DEFAULT_FONT.color)
+            and font.u is None
+            and font.vertAlign is None
+            and not any(
+                [
+                    font.b,
+                    font.i,
+                    font.strike,
+                    font.outline,
+                    font.shadow,
+                    font.condense,
+                    font.extend,
+                ]
+            )
+        ):
+            self._font = DEFAULT_FONT
+        border = self._border
+        if not (
+            border.diagonalUp
+            or border.diagonalDown
+            or any(
+                side is not None and side.style is not None
+                for side in [
+                    border.left,
+                    border.right,
+                    border.top,
+                    border.bottom,
+                    border.diagonal,
+                    border.vertical,
+                    border.horizontal,
+                ]
+            )
+        ):
+            self._border = DEFAULT_BORDER
+
+    def is_default(self) -> bool:
+        """Check if the cell has openpyxl's default style.
+
+        Returns:
+            bool: True if all style objects are the default objects.
+        """
+        return self.style_objects() == DEFAULT_STYLE
+
+    def assign_to(self, cell: Cell) -> None:
+        """Assign the style to a cell of an openpyxl worksheet.
+
+        Args:
+            cell (Cell): cell of the worksheet
+        """
+        cell.font = self._font
+        cell.fill = self._fill
+        cell.border = self._border
+        cell.alignment = self._alignment
+        cell.protection = self._protection
+        if self._number_format is not None:
+            cell.number_format = self._number_format
+
+
+# Style objects of cells with openpyxl's default style
+DEFAULT_STYLE = StyledCell().style_objects()
+
+
+@dataclass(frozen=True)
+class AddBorder:
+    """Style layer that adds a border to the existing border of a cell.
+
+    Used to reproduce the borders openpyxl adds to merged cells.
+    """
+
+    border: Border
+
+    def __call__(self, cell: Cell) -> None:
+        """Add the border to the cell.
+
+        Args:
+            cell (Cell): cell to which the border is added
+        """
+        cell.border = cast(Border, cell.border) + self.border
+
+
+@dataclass(frozen=True)
+class SetProtection:
+    """Style layer that replaces the protection of a cell."""
+
+    protection: Protection
+
+    def __call__(self, cell: Cell) -> None:
+        """Set the protection of the cell.
+
+        Args:
+            cell (Cell): cell of which the protection is set
+        """
+        cell.protection = self.protection
+
+
+# Style layers that only depend on the existing style of a cell
+PURE_LAYERS = (StyleSpec, AddBorder, SetProtection)
+
+
+def is_pure(layers: tuple[Style, ...] | list[Style]) -> bool:
+    """Check if the style of a cell only depends on its style layers.
+
+    Style functions may read the value or the position of the cell, so only layers that
+    are StyleSpecs or internal layers can be composed once and shared between cells.
+
+    Args:
+        layers (tuple[Style, ...] | list[Style]): style layers of a cell
+
+    Returns:
+        bool: True if all layers are StyleSpecs or internal layers.
+    """
+    return all(isinstance(layer, PURE_LAYERS) for layer in layers)
+
+
+class CellLayers:
+    """The value of a single cell and the style layers that are applied to it (in order)."""
+
+    __slots__ = ('value', 'layers')
+
+    def __init__(self, value: Any = None, layers: list[Style] | None = None):
+        """Create a new cell.
+
+        Args:
+            value (Any, optional): value of the cell. Defaults to None.
+            layers (list[Style] | None, optional): style layers of the cell. Defaults to None.
+        """
+        self.value = value
+        self.layers = [] if layers is None else layers
+
+
+class StyleCompositor:
+    """Composes the style layers of cells and assigns the final style to openpyxl cells.
+
+    Styles that only consist of StyleSpecs (and internal layers) are cached by their
+    layers. Styles with other style functions are composed for each cell, because these
+    functions may read the value or the position of the cell. A style function must
+    only change the style of the cell it is applied to. A compositor is bound to the
+    workbook of the first cell it assigns a style to.
+
+    In sparse mode, composed styles that look like the default style (e.g., white
+    background fills) are replaced by the default style, so these cells remain unstyled.
+    """
+
+    def __init__(self, sparse: bool = False) -> None:
+        """Create a compositor with empty caches.
+
+        Args:
+            sparse (bool, optional): Should styles that look like the default style be
+                replaced by the default style? Defaults to False.
+        """
+        self.sparse = sparse
+        self.styled: dict[tuple[Style, ...], StyledCell] = {}
+        self.style_arrays: dict[tuple[tuple[Style, ...], int], StyleArray] = {}
+
+    def compose(
+        self,
+        layers: list[Style],
+        value: Any = None,
+        row: int | None = None,
+        column: int | None = None,
+    ) -> StyledCell:
+        """Compose the final style of a list of style layers.
+
+        Args:
+            layers (list[Style]): style layers in the order in which they are applied.
+            value (Any, optional): value of the cell. Defaults to None.
+            row (int | None, optional): row of the cell. Defaults to None.
+            column (int | None, optional): column of the cell. Defaults to None.
+
+        Returns:
+            StyledCell: in-memory cell with the final style. Must not be changed.
+        """
+        key = tuple(layers)
+        styled = self.styled.get(key)
+        if styled is None:
+            pure = is_pure(key)
+            # Cached styles must not depend on the value or position of a cell
+            styled = (
+                StyledCell()
+                if pure
+                else StyledCell(value=value, row=row, column=column)
+            )
+            for layer in key:
+                layer(cast(Cell, styled))
+            if self.sparse:
+                styled.drop_default_lookalikes()
+            if pure:
+                self.styled[key] = styled
+        return styled
+
+    def assign(self, cell: Cell, layers: list[Style]) -> None:
+        """Assign the final style of a list of style layers to a cell.
+
+        The first cell with a specific list of cached layers receives the composed style.
+        All other cells with the same layers and the same number format copy the style of
+        that cell. Cells start with the number format of their value (e.g., 'yyyy-mm-dd'
+        for dates), which is kept unless a style layer sets a number format.
+
+        Args:
+            cell (Cell): cell of the worksheet
+            layers (list[Style]): style layers in the order in which they are applied.
+        """
+        # _style holds the ids of the cell's style objects in the workbook
+        # (see openpyxl's StyleableObject); it is not part of openpyxl's type stubs.
+        styleable: Any = cell
+        # Merged cells (except for the first one) do not have a style array
+        number_format_id = (
+            0 if styleable._style is None else int(styleable._style.numFmtId)
+        )
+        key = (tuple(layers), number_format_id)
+        style_array = self.style_arrays.get(key)
+        if style_array is None:
+            self.compose(
+                layers, value=cell.value, row=cell.row, column=cell.column
+            ).assign_to(cell)
+            if key[0] in self.styled:
+                self.style_arrays[key] = copy(styleable._style)
+        else:
+            styleable._style = copy(style_array)
+
+    def is_unstyled(self, cell: CellLayers, row: int, column: int) -> bool:
+        """Check if a cell can be left out of the worksheet in sparse mode.
+
+        These are cells without value whose style looks like the default style.
+
+        Args:
+            cell (CellLayers): value and style layers of the cell
+            row (int): row of the cell
+            column (int): column of the cell
+
+        Returns:
+            bool: True if the cell can be left out.
+        """
+        return (
+            self.sparse
+            and cell.value is None
+            and self.compose(cell.layers, row=row, column=column).is_default()
+        )
+
+
+def compose_rows(
+    tbl: TableSpam,
+    locations: Locations,
+    styles: XlsxStyles,
+    compositor: StyleCompositor,
+    merge: Callable[[CellRange], None],
+) -> Iterator[tuple[int, dict[int, CellLayers]]]:
+    """Create the cells of the table row by row.
+
+    The style layers of each cell are collected in the following order: background,
+    content styles, merging, and outlines. Merged ranges are passed to merge as soon as
+    they are found; this is always before the first cell of the range is returned.
+
+    Args:
+        tbl (TableSpam): TableSpam table created with TableSpam
+        locations (Locations): the locations (indexes) of different elements found in the table.
+        styles (XlsxStyles): Styles that should be applied to the table.
+        compositor (StyleCompositor): compositor used to look up the styles of merged cells.
+        merge (Callable[[CellRange], None]): function that registers a merged range in the sheet.
+
+    Yields:
+        tuple[int, dict[int, CellLayers]]: The index of the next row and its cells with their
+            column index as key.
+    """
+    outlines = Outlines(tbl=tbl, locations=locations, styles=styles)
+    yield from head_rows(
+        tbl=tbl,
+        locations=locations,
+        styles=styles,
+        outlines=outlines,
+        compositor=compositor,
+        merge=merge,
+    )
+    yield from data_rows(
+        tbl=tbl,
+        locations=locations,
+        styles=styles,
+        outlines=outlines,
+        compositor=compositor,
+        merge=merge,
+    )
+    yield footer_row(
+        tbl=tbl,
+        locations=locations,
+        styles=styles,
+        outlines=outlines,
+        compositor=compositor,
+        merge=merge,
+    )
+
+
+def head_rows(
+    tbl: TableSpam,
+    locations: Locations,
+    styles: XlsxStyles,
+    outlines: Outlines,
+    compositor: StyleCompositor,
+    merge: Callable[[CellRange], None],
+) -> Iterator[tuple[int, dict[int, CellLayers]]]:
+    """Create the rows above the table body (title, subtitle, and header).
+
+    Args:
+        tbl (TableSpam): TableSpam table created with TableSpam
+        locations (Locations): the locations (indexes) of different elements found in the table.
+        styles (XlsxStyles): Styles that should be applied to the table.
+        outlines (Outlines): vertical and horizontal lines of the table.
+        compositor (StyleCompositor): compositor used to look up the styles of merged cells.
+        merge (Callable[[CellRange], None]): function that registers a merged range in the sheet.
+
+    Yields:
+        tuple[int, dict[int, CellLayers]]: index and cells of the next row
+    """
+    start_col = locations.get_col('start_col_title')
+    end_col = locations.get_col('end_col_header_rhs')
+
+    if tbl.title is not None:
+        row = locations.get_row('start_row_title')
+        yield (
+            row,
+            text_row(
+                text=tbl.title,
+                row=row,
+                start_col=start_col,
+                end_col=end_col,
+                bg_style=styles.bg_title,
+                style=styles.cell_title,
+                compositor=compositor,
+                merge=merge,
+            ),
+        )
+
+    if tbl.subtitle is not None:
+        row = locations.get_row('start_row_subtitle')
+        yield (
+            row,
+            text_row(
+                text=tbl.subtitle,
+                row=row,
+                start_col=start_col,
+                end_col=end_col,
+                bg_style=styles.bg_subtitle,
+                style=styles.cell_subtitle,
+                compositor=compositor,
+                merge=merge,
+            ),
+        )
+
+    yield from header_rows(
+        tbl=tbl,
+        locations=locations,
+        styles=styles,
+        outlines=outlines,
+        compositor=compositor,
+        merge=merge,
+    )
+
+
+def footer_row(
+    tbl: TableSpam,
+    locations: Locations,
+    styles: XlsxStyles,
+    outlines: Outlines,
+    compositor: StyleCompositor,
+    merge: Callable[[CellRange], None],
+) -> tuple[int, dict[int, CellLayers]]:
+    """Create the row below the table body.
+
+    The row holds the footnote (if there is one) and the bottom line of the table.
+
+    Args:
+        tbl (TableSpam): TableSpam table created with TableSpam
+        locations (Locations): the locations (indexes) of different elements found in the table.
+        styles (XlsxStyles): Styles that should be applied to the table.
+        outlines (Outlines): vertical and horizontal lines of the table.
+        compositor (StyleCompositor): compositor used to look up the styles of merged cells.
+        merge (Callable[[CellRange], None]): function that registers a merged range in the sheet.
+
+    Returns:
+        tuple[int, dict[int, CellLayers]]: index and cells of the row
+    """
+    start_col = locations.get_col('start_col_title')
+    end_col = locations.get_col('end_col_header_rhs')
+    row = locations.get_row('end_row_data') + 1
+    if tbl.footnote is not None:
+        cells = text_row(
+            text=tbl.footnote,
+            row=row,
+            start_col=start_col,
+            end_col=end_col,
+            bg_style=styles.bg_footnote,
+            style=styles.cell_footnote,
+            compositor=compositor,
+            merge=merge,
+        )
+    else:
+        cells = {col: CellLayers() for col in range(start_col, end_col + 1)}
+    for col in cells:
+        outlines.apply(cell=cells[col], row=row, col=col)
+    return row, cells
+
+
+def text_row(
+    text: str,
+    row: int,
+    start_col: int,
+    end_col: int,
+    bg_style: Style,
+    style: Style,
+    compositor: StyleCompositor,
+    merge: Callable[[CellRange], None],
+) -> dict[int, CellLayers]:
+    """Create a row with a single text spanning the table (title, subtitle, or footnote).
+
+    Args:
+        text (str): text shown in the row
+        row (int): index of the row
+        start_col (int): first column of the table
+        end_col (int): last column of the table
+        bg_style (Style): background style of the row
+        style (Style): style of the text cells
+        compositor (StyleCompositor): compositor used to look up the styles of merged cells.
+        merge (Callable[[CellRange], None]): function that registers a merged range in the sheet.
+
+    Returns:
+        dict[int, CellLayers]: cells of the row with their column index as key
+    """
+    cells = {
+        col: CellLayers(layers=[bg_style]) for col in range(start_col, end_col + 1)
+    }
+    cells[start_col].value = text
+    merge_row_cells(
+        cells=cells,
+        row=row,
+        start_col=start_col,
+        end_col=end_col,
+        compositor=compositor,
+        merge=merge,
+    )
+    for col in range(start_col, end_col + 1):
+        cells[col].layers.append(style)
+    return cells
+
+
+def header_rows(
+    tbl: TableSpam,
+    locations: Locations,
+    styles: XlsxStyles,
+    outlines: Outlines,
+    compositor: StyleCompositor,
+    merge: Callable[[CellRange], None],
+) -> Iterator[tuple[int, dict[int, CellLayers]]]:
+    """Create the rows of the table header.
+
+    Args:
+        tbl (TableSpam): TableSpam table created with TableSpam
+        locations (Locations): the locations (indexes) of different elements found in the table.
+        styles (XlsxStyles): Styles that should be applied to the table.
+        outlines (Outlines): vertical and horizontal lines of the table.
+        compositor (StyleCompositor): compositor used to look up the styles of merged cells.
+        merge (Callable[[CellRange], None]): function that registers a merged range in the sheet.
+
+    Yields:
+        tuple[int, dict[int, CellLayers]]: index and cells of the next header row
+    """
+    start_col = locations.get_col('start_col_title')
+    end_col = locations.get_col('end_col_header_rhs')
+    start_col_rhs = locations.get_col('start_col_header_rhs')
+    start_row = locations.get_row('start_row_header')
+
+    # Start column, name, width, and style of the header entries in each row
+    layout = tbl.layout
+    entry_styles = (styles.cell_header_lhs, styles.cell_header_rhs)
+    entries = layout.cells
+    positions: dict[int, list[tuple[int, str, int, Style]]] = {}
+    for entry_row, entry_col, name, width, side in zip(
+        to_list(layout.row[entries] + start_row),
+        to_list(layout.col[entries] + start_col),
+        to_list(layout.names[entries]),
+        to_list(layout.width[entries]),
+        to_list(layout.side[entries]),
+    ):
+        positions.setdefault(entry_row, []).append(
+            (entry_col, name, width, entry_styles[side])
+        )
+
+    for row in range(start_row, locations.get_row('end_row_header') + 1):
+        cells = {
+            col: CellLayers(
+                layers=[
+                    styles.bg_header_lhs
+                    if col < start_col_rhs
+                    else styles.bg_header_rhs
+                ]
+            )
+            for col in range(start_col, end_col + 1)
+        }
+
+        for entry_col, name, width, style in positions.get(row, []):
+            cells[entry_col].value = name
+            if width > 1:
+                merge_row_cells(
+                    cells=cells,
+                    row=row,
+                    start_col=entry_col,
+                    end_col=entry_col + width - 1,
+                    compositor=compositor,
+                    merge=merge,
+                )
+            for col in range(entry_col, entry_col + width):
+                cells[col].layers.append(style)
+
+        # The right outline is drawn as left border of the first column after the table
+        cells[end_col + 1] = CellLayers()
+        for col in cells:
+            outlines.apply(cell=cells[col], row=row, col=col)
+        yield row, cells
+
+
+def data_rows(
+    tbl: TableSpam,
+    locations: Locations,
+    styles: XlsxStyles,
+    outlines: Outlines,
+    compositor: StyleCompositor,
+    merge: Callable[[CellRange], None],
+) -> Iterator[tuple[int, dict[int, CellLayers]]]:
+    """Create the rows of the table body (row names and data).
+
+    The data is translated to Python objects column-wise in batches of BATCH_SIZE rows.
+
+    Args:
+        tbl (TableSpam): TableSpam table created with TableSpam
+        locations (Locations): the locations (indexes) of different elements found in the table.
+        styles (XlsxStyles): Styles that should be applied to the table.
+        outlines (Outlines): vertical and horizontal lines of the table.
+        compositor (StyleCompositor): compositor used to look up the styles of merged cells.
+        merge (Callable[[CellRange], None]): function that registers a merged range in the sheet.
+
+    Raises:
+        ValueError: Error when data does not exist.
+
+    Yields:
+        tuple[int, dict[int, CellLayers]]: index and cells of the next data row
+    """
+    col_data = tbl.table_data['col_data']
+    if col_data is None:
+        raise ValueError('Missing data')
+    if tbl.layout.has_lhs:
+        row_data = tbl.table_data['row_data']
+        if row_data is None:
+            raise ValueError('Missing data')
+        rownames = RownameCells(
+            row_data=row_data,
+            locations=locations,
+            styles=styles,
+            compositor=compositor,
+            merge=merge,
+        )
+    else:
+        row_data = pl.DataFrame()
+        rownames = None
+
+    col_data_layers = column_layers(
+        data=col_data,
+        bg_style=styles.bg_data,
+        cell_style=styles.cell_data,
+        data_styles=styles.data_styles,
+    )
+    custom_styles = cell_style_map(cell_styles=styles.cell_styles, col_data=col_data)
+
+    start_row_data = locations.get_row('start_row_data')
+    start_col_data = locations.get_col('start_col_header_rhs')
+    end_col = locations.get_col('end_col_header_rhs')
+
+    for offset in range(0, col_data.height, BATCH_SIZE):
+        col_values = [
+            col_data[item].slice(offset, BATCH_SIZE).to_list()
+            for item in col_data.columns
+        ]
+        row_values = [
+            row_data[item].slice(offset, BATCH_SIZE).to_list()
+            for item in row_data.columns
+        ]
+        for k, values in enumerate(zip(*col_values)):
+            i = offset + k
+            row = start_row_data + i
+            cells: dict[int, CellLayers] = {}
+
+            if rownames is not None:
+                cells.update(
+                    rownames.create(index=i, values=[val[k] for val in row_values])
+                )
+
+            for j, value in enumerate(values):
+                layers = col_data_layers[j]
+                custom = custom_styles.get((i + 1, j))
+                if custom is not None:
+                    layers = layers + custom
+                cells[start_col_data + j] = CellLayers(value=value, layers=list(layers))
+
+            cells[end_col + 1] = CellLayers()
+            for col in cells:
+                outlines.apply(cell=cells[col], row=row, col=col)
+            yield row, cells
+
+
+def column_layers(
+    data: pl.DataFrame,
+    bg_style: Style,
+    cell_style: Style,
+    data_styles: dict[str, DataStyle],
+) -> list[list[Style]]:
+    """Collect the style layers that are shared by all cells of each column.
+
+    Args:
+        data (pl.DataFrame): data of the row names or of the table body
+        bg_style (Style): background style of the cells
+        cell_style (Style): style of the cells
+        data_styles (dict[str, DataStyle]): styles applied based on the data type of each column
+
+    Returns:
+        list[list[Style]]: for each column, the background, cell, and data style (if any)
+    """
+    layers: list[list[Style]] = []
+    for item in data.columns:
+        column = [bg_style, cell_style]
+        data_style = get_data_style(data=data.select(item), data_styles=data_styles)
+        if data_style is not None:
+            column.append(data_style)
+        layers.append(column)
+    return layers
+
+
+class RownameCells:
+    """Creates the row name cells of a single row, including merged row names."""
+
+    def __init__(
+        self,
+        row_data: pl.DataFrame,
+        locations: Locations,
+        styles: XlsxStyles,
+        compositor: StyleCompositor,
+        merge: Callable[[CellRange], None],
+    ):
+        """Prepare the styles and merged ranges of the row names.
+
+        Args:
+            row_data (pl.DataFrame): data that is written as rownames in the table.
+            locations (Locations): the locations (indexes) of different elements found in the table.
+            styles (XlsxStyles): Styles that should be applied to the table.
+            compositor (StyleCompositor): compositor used to look up the styles of merged cells.
+            merge (Callable[[CellRange], None]): function that registers a merged range in the sheet.
+        """
+        self.styles = styles
+        self.compositor = compositor
+        self.merge = merge
+        self.start_row = locations.get_row('start_row_data')
+        self.start_col = locations.get_col('start_col_header_lhs')
+        self.layers = column_layers(
+            data=row_data,
+            bg_style=styles.bg_rownames,
+            cell_style=styles.cell_rownames,
+            data_styles=styles.data_styles,
+        )
+        self.merge_ranges: list[list[tuple[int, int]]] | None = None
+        if styles.merge_rownames:
+            self.merge_ranges = rowname_merge_ranges(row_data_cell_ids(row_data))
+        # For every column, we keep track of the next merged range and
+        # of the merged range the current row belongs to
+        self.next_range = [0] * row_data.width
+        self.merged: list[MergedRange | None] = [None] * row_data.width
+
+    def merge_range(self, index: int, co: int) -> tuple[int, int] | None:
+        """Find the merged range a row name belongs to.
+
+        Rows must be requested in increasing order.
+
+        Args:
+            index (int): index of the row in the data
+            co (int): index of the row name column
+
+        Returns:
+            tuple[int, int] | None: (start_row, end_row) of the merged range or None if the
+                row name is not merged.
+        """
+        if self.merge_ranges is None:
+            return None
+        ranges = self.merge_ranges[co]
+        while (
+            self.next_range[co] < len(ranges) and ranges[self.next_range[co]][1] < index
+        ):
+            self.next_range[co] += 1
+        if (
+            self.next_range[co] < len(ranges)
+            and ranges[self.next_range[co]][0] <= index
+        ):
+            return ranges[self.next_range[co]]
+        return None
+
+    def create(self, index: int, values: list[Any]) -> dict[int, CellLayers]:
+        """Create the row name cells of a single row.
+
+        Args:
+            index (int): index of the row in the data
+            values (list[Any]): row names of the current row
+
+        Raises:
+            ValueError: Error if the start of a merged range is missing.
+
+        Returns:
+            dict[int, CellLayers]: cells of the row names with their column index as key
+        """
+        cells = {}
+        for co, value in enumerate(values):
+            col = self.start_col + co
+            row = self.start_row + index
+            merge_range = self.merge_range(index=index, co=co)
+            if merge_range is None:
+                # nothing to merge
+                cells[col] = CellLayers(value=value, layers=list(self.layers[co]))
+                continue
+
+            first, last = merge_range
+            if index == first:
+                cell = CellLayers(
+                    value=value,
+                    layers=self.layers[co] + [self.styles.merged_rownames_style],
+                )
+                # All cells of the range have the same layers up to this point
+                end_cell = CellLayers(layers=list(cell.layers))
+                started = MergedRange(
+                    start_cell=cell,
+                    end_cell=end_cell,
+                    min_row=row,
+                    min_col=col,
+                    max_row=self.start_row + last,
+                    max_col=col,
+                    compositor=self.compositor,
+                )
+                self.merge(started.cell_range)
+                self.merged[co] = started
+            else:
+                cell = CellLayers()
+            merged = self.merged[co]
+            if merged is None:
+                raise ValueError('Missing start of merged row names.')
+            merged.format(cell=cell, row=row, col=col)
+            cells[col] = cell
+        return cells
+
+
+class MergedRange:
+    """Style information of a merged range that is required to format its cells.
+
+    openpyxl replaces all but the top left cell of a merged range with new cells and
+    copies the borders at the edges of the range from the top left cell. MergedRange
+    reproduces these steps one cell at a time so that cells can be created in order.
+    """
+
+    def __init__(
+        self,
+        start_cell: CellLayers,
+        end_cell: CellLayers | None,
+        min_row: int,
+        min_col: int,
+        max_row: int,
+        max_col: int,
+        compositor: StyleCompositor,
+    ):
+        """Save the borders and protection of the top left cell.
+
+        Args:
+            start_cell (CellLayers): top left cell of the merged range
+            end_cell (CellLayers | None): bottom right cell of the merged range (if it exists)
+            min_row (int): first row of the merged range
+            min_col (int): first column of the merged range
+            max_row (int): last row of the merged range
+            max_col (int): last column of the merged range
+            compositor (StyleCompositor): compositor used to look up the styles of the cells.
+        """
+        self.cell_range = CellRange(
+            min_col=min_col, min_row=min_row, max_col=max_col, max_row=max_row
+        )
+        if end_cell is not None:
+            end_border = compositor.compose(
+                end_cell.layers, value=end_cell.value, row=max_row, column=max_col
+            ).border
+            start_cell.layers.append(
+                AddBorder(Border(right=end_border.right, bottom=end_border.bottom))
+            )
+        start_style = compositor.compose(
+            start_cell.layers, value=start_cell.value, row=min_row, column=min_col
+        )
+        self.border = start_style.border
+        self.protection = SetProtection(cast(Protection, copy(start_style.protection)))
+
+    def format(self, cell: CellLayers, row: int, col: int) -> None:
+        """Add the borders and protection of the top left cell to a cell of the merged range.
+
+        Args:
+            cell (CellLayers): cell within the merged range
+            row (int): row of the cell
+            col (int): column of the cell
+        """
+        edges = {
+            'top': row == self.cell_range.min_row,
+            'left': col == self.cell_range.min_col,
+            'right': col == self.cell_range.max_col,
+            'bottom': row == self.cell_range.max_row,
+        }
+        sides = {}
+        for name in ['top', 'left', 'right', 'bottom']:
+            if not edges[name]:
+                continue
+            side = getattr(self.border, name)
+            if side and side.style is None:
+                continue
+            sides[name] = side
+        if sides:
+            cell.layers.append(AddBorder(Border(**sides)))
+        cell.layers.append(self.protection)
+
+
+def merge_row_cells(
+    cells: dict[int, CellLayers],
+    row: int,
+    start_col: int,
+    end_col: int,
+    compositor: StyleCompositor,
+    merge: Callable[[CellRange], None],
+) -> None:
+    """Merge cells within a single row.
+
+    Args:
+        cells (dict[int, CellLayers]): cells of the current row with their column index as key.
+            The cells within the merged range are replaced.
+        row (int): index of the row
+        start_col (int): first column of the merged range
+        end_col (int): last column of the merged range
+        compositor (StyleCompositor): compositor used to look up the styles of the cells.
+        merge (Callable[[CellRange], None]): function that registers a merged range in the sheet.
+    """
+    merged = MergedRange(
+        start_cell=cells[start_col],
+        end_cell=cells.get(end_col),
+        min_row=row,
+        min_col=start_col,
+        max_row=row,
+        max_col=end_col,
+        compositor=compositor,
+    )
+    merge(merged.cell_range)
+    for col in range(start_col, end_col + 1):
+        if col != start_col:
+            cells[col] = CellLayers()
+        merged.format(cell=cells[col], row=row, col=col)
+
+
+class Outlines:
+    """Vertical and horizontal lines of the table."""
+
+    def __init__(self, tbl: TableSpam, locations: Locations, styles: XlsxStyles):
+        """Save the locations of the lines.
+
+        Args:
+            tbl (TableSpam): TableSpam table created with TableSpam
+            locations (Locations): the locations (indexes) of different elements found in the table.
+            styles (XlsxStyles): Styles that should be applied to the table.
+        """
+        if tbl.layout.has_lhs:
+            self.left_most = locations.get_col('start_col_header_lhs')
+        else:
+            self.left_most = locations.get_col('start_col_header_rhs')
+        self.start_row = locations.get_row('start_row_header')
+        self.end_row = locations.get_row('end_row_data')
+        self.end_col = locations.get_col('end_col_header_rhs')
+        self.separator_col = locations.get_col('start_col_header_rhs')
+        self.styles = styles
+
+    def apply(self, cell: CellLayers, row: int, col: int) -> None:
+        """Add the lines to a single cell.
+
+        The outlines are the last layers of each cell as they may have to overwrite
+        some border colors.
+
+        Args:
+            cell (CellLayers): cell to which the lines are added
+            row (int): row of the cell
+            col (int): column of the cell
+        """
+        in_cols = self.left_most <= col <= self.end_col
+        in_rows = self.start_row <= row <= self.end_row
+        # top line
+        if row == self.start_row and in_cols:
+            cell.layers.append(self.styles.hline)
+        # bottom line
+        if row == self.end_row + 1 and in_cols:
+            cell.layers.append(self.styles.hline)
+        # left line
+        if col == self.left_most and in_rows:
+            cell.layers.append(self.styles.vline)
+        # right line
+        if col == self.end_col + 1 and in_rows:
+            cell.layers.append(self.styles.vline)
+        # row name separator
+        if col == self.separator_col and in_rows:
+            cell.layers.append(self.styles.vline)
+
+
+def cell_style_map(
+    cell_styles: list[CellStyle | ConditionalStyle] | None, col_data: pl.DataFrame
+) -> dict[tuple[int, int], list[Style]]:
+    """Collect the custom cell styles that are applied to each data cell.
+
+    ConditionalStyles are skipped; they are added as conditional formatting (see add_conditional_styles).
+
+    Args:
+        cell_styles (list[CellStyle | ConditionalStyle] | None): custom styles for selected cells in the data.
+        col_data (pl.DataFrame): data that is written into the table body.
+
+    Raises:
+        ValueError: Error when trying to add a style to a column that does not exist.
+        ValueError: Error when trying to add a style to a row that does not exist.
+
+    Returns:
+        dict[tuple[int, int], list[Style]]: For each (row, column index), the styles in the
+            order in which they are applied. Rows start at 1 and columns at 0.
+    """
+    styles_map: dict[tuple[int, int], list[Style]] = {}
+    if cell_styles is None:
+        return styles_map
+    col_index = {col: j for j, col in enumerate(col_data.columns)}
+    for sty in cell_styles:
+        if isinstance(sty, ConditionalStyle):
+            continue
+        if not set(sty.cols).issubset(col_index):
+            raise ValueError(
+                f'Trying to style an element that was not found in the data: {[(c) for c in sty.cols if c not in col_index]}.'
+            )
+        if any([r > col_data.shape[0] for r in sty.rows]):
+            raise ValueError('Trying to style a row outside of the range of the data.')
+        for col in sty.cols:
+            for row in sty.rows:
+                styles_map.setdefault((row, col_index[col]), []).append(sty.style)
+    return styles_map
+
+
+def row_data_cell_ids(row_data: pl.DataFrame) -> np.ndarray[Any, Any]:
+    """Generate unique IDs to represent entries that should be merged.
+
+    A cell gets the same id as the cell above it if the row names in this column and all
+    columns to its left are identical to those of the previous row. The ids are therefore
+    run-length ids over the cumulative prefixes of the row name columns (see polars' rle_id).
+
+    Args:
+        row_data (pl.DataFrame): data that is written as rownames in the table.
+
+    Returns:
+        np.ndarray[Any]: a matrix with the same number of rows and columns as the row_data. Each entry is given an index. If two cells should be merged, they will have the same index.
+    """
+    ids = row_data.select(
+        [
+            (pl.struct(row_data.columns[: co + 1]).rle_id() + 1)
+            .cast(pl.Int64)
+            .alias(f'id_{co}')
+            for co in range(row_data.width)
+        ]
+    )
+    return ids.to_numpy()
+
+
+def rowname_merge_ranges(
+    cell_ids: np.ndarray[Any, Any],
+) -> list[list[tuple[int, int]]]:
+    """Find the row names that should be merged.
+
+    The ranges are found in a single pass over each column of the ids: A new range starts
+    wherever the id differs from the one in the row above.
+
+    Args:
+        cell_ids (np.ndarray[Any, Any]): ids created with row_data_cell_ids.
+
+    Returns:
+        list[list[tuple[int, int]]]: For each row name column, the (start_row, end_row) of all
+            ranges with identical ids that span more than one row. Rows are 0-based indices
+            of the data and end_row is inclusive.
+    """
+    ranges = []
+    for co in range(cell_ids.shape[1]):
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(cell_ids[:, co])) + 1))
+        ends = np.concatenate((starts[1:] - 1, [cell_ids.shape[0] - 1]))
+        is_merged = ends > starts
+        ranges.append(list(zip(starts[is_merged].tolist(), ends[is_merged].tolist())))
+    return ranges
@@ -0,0 +1,232 @@
+"""Translate conditional styles to conditional formatting rules of Excel."""
+
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Literal
+
+import numpy as np
+import polars as pl
+from openpyxl.formatting.rule import Rule
+from openpyxl.styles import PatternFill
+from openpyxl.styles.differential import DifferentialStyle
+from openpyxl.styles.numbers import BUILTIN_FORMATS_REVERSE, NumberFormat
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.worksheet import Worksheet
+
+from tablespam.Excel.style_spec import openpyxl_border, openpyxl_font
+from tablespam.Excel.xlsx_styles import CellStyle, ConditionalStyle
+from tablespam.Excel._as_excel.locations import Locations
+
+if TYPE_CHECKING:
+    from tablespam.Excel.style_spec import StyleSpec
+
+CellIsOperator = Literal[
+    'greaterThan',
+    'greaterThanOrEqual',
+    'lessThan',
+    'lessThanOrEqual',
+    'equal',
+    'notEqual',
+]
+
+# Operators of Excel's cellIs rules
+CELL_IS_OPERATORS: dict[str, CellIsOperator] = {
+    '>': 'greaterThan',
+    '>=': 'greaterThanOrEqual',
+    '<': 'lessThan',
+    '<=': 'lessThanOrEqual',
+    '==': 'equal',
+    '!=': 'notEqual',
+}
+
+
+def add_conditional_styles(
+    sheet: Worksheet,
+    cell_styles: list[CellStyle | ConditionalStyle] | None,
+    col_data: pl.DataFrame,
+    locations: Locations,
+) -> None:
+    """Add the conditional styles to the sheet as conditional formatting rules.
+
+    Each conditional style results in a single rule (see conditional_rules).
+
+    Args:
+        sheet (Worksheet): sheet to which the table is added.
+        cell_styles (list[CellStyle | ConditionalStyle] | None): custom styles for selected cells in the data.
+            Only the ConditionalStyles are added.
+        col_data (pl.DataFrame): data that is written into the table body.
+        locations (Locations): the locations (indexes) of different elements found in the table.
+    """
+    for cell_range, rule in conditional_rules(
+        cell_styles=cell_styles, col_data=col_data, locations=locations
+    ):
+        sheet.conditional_formatting.add(cell_range, rule)
+
+
+def conditional_rules(
+    cell_styles: list[CellStyle | ConditionalStyle] | None,
+    col_data: pl.DataFrame,
+    locations: Locations,
+) -> list[tuple[str, Rule]]:
+    """Translate the conditional styles to conditional formatting rules.
+
+    Thresholds are evaluated by Excel and cover each column with a single range. Polars
+    expressions are evaluated here; their rules list one range per run of consecutive
+    matching rows and column, so their size grows with the number of runs.
+
+    Args:
+        cell_styles (list[CellStyle | ConditionalStyle] | None): custom styles for selected cells in the data.
+            Only the ConditionalStyles are translated.
+        col_data (pl.DataFrame): data that is written into the table body.
+        locations (Locations): the locations (indexes) of different elements found in the table.
+
+    Raises:
+        ValueError: Error when trying to add a style to a column that does not exist.
+
+    Returns:
+        list[tuple[str, Rule]]: the cell ranges (separated by spaces) and the rule of each
+            conditional style. Styles whose condition is never True and styles of tables
+            without data rows are skipped.
+    """
+    rules: list[tuple[str, Rule]] = []
+    if cell_styles is None:
+        return rules
+    col_index = {col: j for j, col in enumerate(col_data.columns)}
+    start_row = locations.get_row('start_row_data')
+    end_row = locations.get_row('end_row_data')
+    start_col = locations.get_col('start_col_header_rhs')
+
+    for sty in cell_styles:
+        if not isinstance(sty, ConditionalStyle):
+            continue
+        if not set(sty.cols).issubset(col_index):
+            raise ValueError(
+                f'Trying to style an element that was not found in the data: {[(c) for c in sty.cols if c not in col_index]}.'
+            )
+        letters = [get_column_letter(start_col + col_index[col]) for col in sty.cols]
+
+        if sty.condition is not None:
+            if sty.operator is not None or sty.value is not None:
+                raise ValueError(
+                    'A ConditionalStyle must either have a condition or an operator and a value.'
+                )
+            ranges = [
+                f'{letter}{start_row + first}:{letter}{start_row + last}'
+                for first, last in condition_ranges(
+                    data=col_data, condition=sty.condition
+                )
+                for letter in letters
+            ]
+            if len(ranges) == 0:
+                continue
+            # The rows were already selected by polars; the rule always applies
+            rule = Rule(
+                type='expression', formula=['TRUE'], dxf=differential_style(sty.style)
+            )
+        else:
+            if sty.operator not in CELL_IS_OPERATORS or sty.value is None:
+                raise ValueError(
+                    'A ConditionalStyle must either have a condition or an operator and a value. '
+                    + f'The operator must be one of {list(CELL_IS_OPERATORS)}.'
+                )
+            if col_data.height == 0:
+                # There are no data cells the rule could apply to
+                continue
+            ranges = [f'{letter}{start_row}:{letter}{end_row}' for letter in letters]
+            rule = Rule(
+                type='cellIs',
+                operator=CELL_IS_OPERATORS[sty.operator],
+                formula=[excel_value(sty.value)],
+                dxf=differential_style(sty.style),
+            )
+        rules.append((' '.join(ranges), rule))
+    return rules
+
+
+def condition_ranges(data: pl.DataFrame, condition: pl.Expr) -> list[tuple[int, int]]:
+    """Find the consecutive rows for which a condition is True.
+
+    Args:
+        data (pl.DataFrame): data on which the condition is evaluated
+        condition (pl.Expr): polars expression that returns a boolean for each row
+
+    Raises:
+        ValueError: Error if the condition does not return one boolean for each row.
+
+    Returns:
+        list[tuple[int, int]]: (start_row, end_row) of all ranges of rows where the condition
+            is True. Rows are 0-based indices of the data and end_row is inclusive.
+    """
+    result = data.select(condition.alias('condition')).to_series()
+    if result.dtype != pl.Boolean or result.len() != data.height:
+        raise ValueError(
+            'The condition of a ConditionalStyle must return one boolean for each row of the data.'
+        )
+    is_true = result.fill_null(False).to_numpy().astype(np.int8)
+    changes = np.diff(np.concatenate(([0], is_true, [0])))
+    starts = np.flatnonzero(changes == 1)
+    ends = np.flatnonzero(changes == -1) - 1
+    return [(int(start), int(end)) for start, end in zip(starts, ends)]
+
+
+def differential_style(style: StyleSpec) -> DifferentialStyle:
+    """Translate a style spec to the differential style used in conditional formatting.
+
+    Args:
+        style (StyleSpec): style of the cells that fulfill the condition
+
+    Raises:
+        ValueError: Error if the style sets an alignment or the name or size of the font.
+            Excel ignores these in conditional formatting.
+        ValueError: Error if the number format is not a built-in number format of Excel.
+
+    Returns:
+        DifferentialStyle: differential style
+    """
+    unsupported = []
+    if style.alignment is not None:
+        unsupported.append('alignment')
+    if style.font is not None and style.font.name is not None:
+        unsupported.append('font name')
+    if style.font is not None and style.font.size is not None:
+        unsupported.append('font size')
+    if unsupported:
+        raise ValueError(
+            'Conditional styles only support the font style and color, fill, border, and '
+            + f'number format. Got a style with {", ".join(unsupported)}.'
+        )
+    number_format = None
+    if style.number_format is not None:
+        if style.number_format not in BUILTIN_FORMATS_REVERSE:
+            raise ValueError(
+                'Conditional styles only support the built-in number formats of Excel. '
+                + f'Got {style.number_format}.'
+            )
+        number_format = NumberFormat(
+            numFmtId=BUILTIN_FORMATS_REVERSE[style.number_format],
+            formatCode=style.number_format,
+        )
+    return DifferentialStyle(
+        font=None if style.font is None else openpyxl_font(style.font),
+        # Conditional formats use the background color of solid fills
+        fill=None
+        if style.fill is None
+        else PatternFill(
+            start_color=style.fill, end_color=style.fill, fill_type='solid'
+        ),
+        border=None if style.border is None else openpyxl_border(style.border, None),
+        numFmt=number_format,
+    )
+
+
+def excel_value(value: Any) -> str:
+    """Translate a threshold to an Excel formula.
+
+    Args:
+        value (Any): threshold
+
+    Returns:
+        str: formula
+    """
+    if isinstance(value, str):
+        return '"' + value.replace('"', '""') + '"'
+    return str(value)
@@ -4,7 +4,9 @@ import openpyxl.workbook
 from tablespam import TableSpam
 from tablespam.Excel.xlsx_styles import CellStyle, XlsxStyles, DataStyle, style_color
 from tablespam.Data.mtcars import mtcars
+from tablespam.Excel._as_excel.xlsx_writer import NativeWorkbook
 from dataclasses import dataclass
+from typing import Literal
 import polars as pl
 import openpyxl
 
@@ -12,18 +14,23 @@ import openpyxl
 @dataclass
 class CarsTestFiles:
     tbls: dict[str, TableSpam]
-    wbs: dict[str, openpyxl.workbook.Workbook]
+    wbs: dict[str, openpyxl.workbook.Workbook | NativeWorkbook]
 
 
 def create_test_files_cars(
     target_dir: str | None = None,
+    mode: Literal['default', 'stream'] = 'default',
+    backend: Literal['openpyxl', 'native'] = 'openpyxl',
 ) -> CarsTestFiles:
     """Create test excel files for internal tests.
 
     Args:
         target_dir (str|None): Target directory. When set to None (default) only returns a dict with the results
-        Returns:
-            dict[str, openpyxl.workbook.Workbook]: dict with results.
+        mode (Literal['default', 'stream']): mode passed to TableSpam.as_excel. Defaults to 'default'.
+        backend (Literal['openpyxl', 'native']): backend passed to TableSpam.as_excel. Defaults to 'openpyxl'.
+
+    Returns:
+        CarsTestFiles: tables and workbooks created for the tests.
     """
     cars = mtcars()
 
@@ -55,15 +62,19 @@ def create_test_files_cars(
     )
 
     results.tbls['cars'] = tbl
-    results.wbs['cars'] = tbl.as_excel()
+    results.wbs['cars'] = tbl.as_excel(mode=mode, backend=backend)
 
     if target_dir is not None:
         results.wbs['cars'].save(f'{target_dir}/cars.xlsx')
 
     results.tbls['cars_color_1'] = tbl
-    results.wbs['cars_color_1'] = tbl.as_excel(styles=style_color('008080'))
+    results.wbs['cars_color_1'] = tbl.as_excel(
+        styles=style_color('008080'), mode=mode, backend=backend
+    )
     results.tbls['cars_color_2'] = tbl
-    results.wbs['cars_color_2'] = tbl.as_excel(styles=style_color('FFFFC5'))
+    results.wbs['cars_color_2'] = tbl.as_excel(
+        styles=style_color('FFFFC5'), mode=mode, backend=backend
+    )
 
     if target_dir is not None:
         results.wbs['cars_color_1'].save(f'{target_dir}/cars_color_1.xlsx')
@@ -91,20 +102,24 @@ def create_test_files_cars(
     )
 
     results.tbls['cars_complex_merge'] = tbl_merge
-    results.wbs['cars_complex_merge'] = tbl_merge.as_excel()
+    results.wbs['cars_complex_merge'] = tbl_merge.as_excel(mode=mode, backend=backend)
 
     if target_dir is not None:
         results.wbs['cars_complex_merge'].save(f'{target_dir}/cars_complex_merge.xlsx')
 
     # offset
     results.tbls['cars_offset'] = tbl
-    results.wbs['cars_offset'] = tbl.as_excel(start_row=3, start_col=5)
+    results.wbs['cars_offset'] = tbl.as_excel(
+        start_row=3, start_col=5, mode=mode, backend=backend
+    )
     if target_dir is not None:
         results.wbs['cars_offset'].save(f'{target_dir}/cars_offset.xlsx')
 
     # custom cell styles
     results.tbls['cars_cell_styles'] = tbl
     results.wbs['cars_cell_styles'] = tbl.as_excel(
+        mode=mode,
+        backend=backend,
         styles=XlsxStyles(
             cell_styles=[
                 CellStyle(
@@ -118,7 +133,7 @@ def create_test_files_cars(
                     style=lambda c: setattr(c, 'font', openpyxl.styles.Font(bold=True)),
                 ),
             ]
-        )
+        ),
     )
 
     if target_dir is not None:
@@ -132,6 +147,8 @@ def create_test_files_cars(
     # custom data type styles
     results.tbls['cars_data_styles'] = tbl
     results.wbs['cars_data_styles'] = tbl.as_excel(
+        mode=mode,
+        backend=backend,
         styles=XlsxStyles(
             data_styles={
                 'double': DataStyle(
@@ -139,7 +156,7 @@ def create_test_files_cars(
                     style=lambda c: setattr(c, 'font', openpyxl.styles.Font(bold=True)),
                 ),
             }
-        )
+        ),
     )
 
     if target_dir is not None:
@@ -158,7 +175,7 @@ def create_test_files_cars(
     )
 
     results.tbls['cars_additional_spanners'] = tbl
-    results.wbs['cars_additional_spanners'] = tbl.as_excel()
+    results.wbs['cars_additional_spanners'] = tbl.as_excel(mode=mode, backend=backend)
 
     if target_dir is not None:
         results.wbs['cars_additional_spanners'].save(
@@ -178,7 +195,9 @@ def create_test_files_cars(
     )
 
     results.tbls['cars_additional_spanners_left_right'] = tbl
-    results.wbs['cars_additional_spanners_left_right'] = tbl.as_excel()
+    results.wbs['cars_additional_spanners_left_right'] = tbl.as_excel(
+        mode=mode, backend=backend
+    )
 
     if target_dir is not None:
         results.wbs['cars_additional_spanners_left_right'].save(
@@ -197,7 +216,7 @@ def create_test_files_cars(
         footnote='Data from the infamous mtcars data set.',
     )
     results.tbls['cars_no_row_names'] = tbl
-    results.wbs['cars_no_row_names'] = tbl.as_excel()
+    results.wbs['cars_no_row_names'] = tbl.as_excel(mode=mode, backend=backend)
 
     if target_dir is not None:
         results.wbs['cars_no_row_names'].save(f'{target_dir}/cars_no_row_names.xlsx')
@@ -212,7 +231,7 @@ def create_test_files_cars(
         footnote='Data from the infamous mtcars data set.',
     )
     results.tbls['cars_no_titles'] = tbl
-    results.wbs['cars_no_titles'] = tbl.as_excel()
+    results.wbs['cars_no_titles'] = tbl.as_excel(mode=mode, backend=backend)
 
     if target_dir is not None:
         results.wbs['cars_no_titles'].save(f'{target_dir}/cars_no_titles.xlsx')
@@ -226,7 +245,7 @@ def create_test_files_cars(
                           (`Weight` = Mean:mean_wt + SD:sd_wt))""",
     )
     results.tbls['cars_no_titles_no_footnote'] = tbl
-    results.wbs['cars_no_titles_no_footnote'] = tbl.as_excel()
+    results.wbs['cars_no_titles_no_footnote'] = tbl.as_excel(mode=mode, backend=backend)
 
     if target_dir is not None:
         results.wbs['cars_no_titles_no_footnote'].save(
@@ -258,7 +277,7 @@ def create_test_files_cars(
         footnote='Data from the infamous mtcars data set.',
     )
     results.tbls['cars_missing_rownames'] = tbl
-    results.wbs['cars_missing_rownames'] = tbl.as_excel()
+    results.wbs['cars_missing_rownames'] = tbl.as_excel(mode=mode, backend=backend)
 
     if target_dir is not None:
         results.wbs['cars_missing_rownames'].save(
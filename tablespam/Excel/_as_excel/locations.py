@@ -35,10 +35,8 @@ class Locations:
 
         start_row_header = start_row
 
-        if tbl.header['lhs'] is not None:
-            start_row += max(tbl.header['lhs'].level, tbl.header['rhs'].level) - 1
-        else:
-            start_row += tbl.header['rhs'].level - 1
+        layout = tbl.layout
+        start_row += layout.n_rows
 
         # Previous iteration was last entry of header rows, moving one up is the last row that belongs to the header
         end_row_header = start_row - 1
@@ -61,15 +59,13 @@ class Locations:
         ) = start_col
         n_col = 0
 
-        # Get number of columns from `width` key in table header and add to start column
+        # Get number of columns from the header layout and add to start column
         # Skip lhs if formula had no lhs
-        if tbl.header['lhs'] is not None:
-            n_col += tbl.header['lhs'].width + tbl.header['rhs'].width - 1
-            start_col_header_rhs = start_col + tbl.header['lhs'].width
-            end_col_header_lhs = start_col + tbl.header['lhs'].width - 1
+        n_col += layout.n_cols - 1
+        start_col_header_rhs = start_col + layout.lhs_width
+        if layout.has_lhs:
+            end_col_header_lhs = start_col + layout.lhs_width - 1
         else:
-            n_col += tbl.header['rhs'].width - 1
-            start_col_header_rhs = start_col
             end_col_header_lhs = None
         end_col_title = end_col_subtitle = end_col_footnote = end_col_header_rhs = (
             start_col + n_col
@@ -131,4 +127,4 @@ class Locations:
         """
         if self.cols[of] is None:
             raise ValueError(f'Column {of} is None.')
-        return self.cols[of]
+        return cast(int, self.cols[of])
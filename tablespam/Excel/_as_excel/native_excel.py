@@ -0,0 +1,948 @@
+"""Export a TableSpam table to Excel by writing the XML of the sheet directly.
+
+The rows above and below the table body (title, subtitle, header, and footnote) are
+composed cell by cell as for the openpyxl backend (see compose.py) and translated to XML.
+In the table body, the style of a cell only depends on its column, on whether the
+row name is merged, and on the custom cell styles. The body is therefore written
+column-wise from the polars data with string expressions in chunks of rows. No Python
+object is created for the cells of the body.
+
+The resulting sheet is identical to the one created by tbl_as_excel. The only difference
+is that strings are saved as shared strings, whereas openpyxl saves strings in the cells.
+"""
+
+from __future__ import annotations
+import datetime
+import os
+from dataclasses import dataclass
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    BinaryIO,
+    Literal,
+    Callable,
+    Iterator,
+    cast,
+)
+
+import numpy as np
+import polars as pl
+from openpyxl.cell.cell import TIME_FORMATS
+from openpyxl.formatting.formatting import ConditionalFormattingList
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.cell_range import CellRange
+from openpyxl.xml.functions import tostring
+
+from tablespam.Excel.xlsx_styles import XlsxStyles
+from tablespam.Excel._as_excel.compose import (
+    CellLayers,
+    MergedRange,
+    Outlines,
+    Style,
+    StyleCompositor,
+    cell_style_map,
+    is_pure,
+    column_layers,
+    footer_row,
+    head_rows,
+    row_data_cell_ids,
+    rowname_merge_ranges,
+)
+from tablespam.Excel._as_excel.conditional import conditional_rules
+from tablespam.Excel._as_excel.locations import Locations
+from tablespam.Excel._as_excel.overflow import sheet_parts
+from tablespam.Excel._as_excel.xlsx_writer import (
+    MAIN_NS,
+    REL_NS,
+    XML_DECLARATION,
+    NativeWorkbook,
+    SharedStrings,
+    check_sheet_title,
+    open_archive,
+    write_package,
+)
+
+if TYPE_CHECKING:
+    from tablespam.TableSpam import TableSpam
+
+# Number of rows of the table body that are translated to XML at once
+CHUNK_ROWS = 10_000
+
+# Days between Excel's epoch (1899-12-30) and the Unix epoch (1970-01-01)
+EXCEL_EPOCH_OFFSET = 25_569
+
+
+def tbl_native_excel(
+    tbl: TableSpam,
+    workbook: NativeWorkbook,
+    sheet: str = 'Table',
+    start_row: int = 1,
+    start_col: int = 1,
+    styles: XlsxStyles | None = None,
+) -> NativeWorkbook:
+    """Export a TableSpam table to a sheet of a native workbook.
+
+    Args:
+        tbl (TableSpam): TableSpam table created with TableSpam
+        workbook (NativeWorkbook): workbook to which the sheet is added
+        sheet (str, optional): name of the sheet that is created for the table. Defaults to 'Table'.
+        start_row (int, optional): index of the row at which the table should start. Defaults to 1.
+        start_col (int, optional): index of the column at which the table should start. Defaults to 1.
+        styles (XlsxStyles | None, optional): Styles that should be applied to the table. Defaults to None.
+
+    Returns:
+        NativeWorkbook: workbook with added table
+    """
+    if styles is None:
+        styles = XlsxStyles()
+    file = workbook.create_sheet(title=sheet)
+    write_sheet(
+        tbl=tbl,
+        file=file,
+        workbook=workbook,
+        start_row=start_row,
+        start_col=start_col,
+        styles=styles,
+        selected=len(workbook.sheets) == 1,
+    )
+    return workbook
+
+
+def write_excel(
+    tbl: TableSpam,
+    target: str | os.PathLike[str] | BinaryIO,
+    sheet: str = 'Table',
+    start_row: int = 1,
+    start_col: int = 1,
+    styles: XlsxStyles | None = None,
+    compresslevel: int = 1,
+    overflow: Literal['split', 'error'] = 'split',
+) -> None:
+    """Write a TableSpam table to an xlsx file while the sheet is created.
+
+    The XML of the sheet is written chunk by chunk into the compressed part of the
+    xlsx file. Only the shared strings and styles are kept until the sheet is complete.
+    Tables that do not fit on a single sheet are continued on additional sheets
+    (see overflow.py), which are written one after the other in the same way.
+
+    Args:
+        tbl (TableSpam): TableSpam table created with TableSpam
+        target (str | os.PathLike[str] | BinaryIO): path of the file or an open binary stream
+        sheet (str, optional): name of the sheet that is created for the table. Defaults to 'Table'.
+        start_row (int, optional): index of the row at which the table should start. Defaults to 1.
+        start_col (int, optional): index of the column at which the table should start. Defaults to 1.
+        styles (XlsxStyles | None, optional): Styles that should be applied to the table. Defaults to None.
+        compresslevel (int, optional): zlib compression level from 0 (no compression) to 9. Defaults to 1.
+        overflow (Literal['split', 'error'], optional): 'split' continues tables with more rows than
+            an Excel sheet on additional sheets, 'error' raises an error. Defaults to 'split'.
+    """
+    if styles is None:
+        styles = XlsxStyles()
+    check_sheet_title(title=sheet, sheetnames=[])
+    parts = sheet_parts(
+        tbl=tbl,
+        sheet=sheet,
+        start_row=start_row,
+        start_col=start_col,
+        styles=styles,
+        overflow=overflow,
+    )
+    # The workbook only collects the strings and styles; the sheets are not saved in it
+    workbook = NativeWorkbook()
+    with open_archive(file=target, compresslevel=compresslevel) as archive:
+        write_package(archive=archive, sheetnames=[name for name, _, _ in parts])
+        for index, (_, part, part_styles) in enumerate(parts, 1):
+            # The size of the sheet is not known before it is written
+            with archive.open(
+                f'xl/worksheets/sheet{index}.xml', 'w', force_zip64=True
+            ) as file:
+                write_sheet(
+                    tbl=part,
+                    file=file,
+                    workbook=workbook,
+                    start_row=start_row,
+                    start_col=start_col,
+                    styles=part_styles,
+                    selected=index == 1,
+                )
+        workbook.write_shared_parts(archive)
+
+
+def write_sheet(
+    tbl: TableSpam,
+    file: IO[bytes],
+    workbook: NativeWorkbook,
+    start_row: int,
+    start_col: int,
+    styles: XlsxStyles,
+    selected: bool = True,
+    chunk_rows: int = CHUNK_ROWS,
+) -> None:
+    """Write the XML of a sheet with a single table.
+
+    Strings and styles are added to the shared strings and styles of the workbook.
+
+    Args:
+        tbl (TableSpam): TableSpam table created with TableSpam
+        file (IO[bytes]): binary file to which the XML is written
+        workbook (NativeWorkbook): workbook of the sheet
+        start_row (int): index of the row at which the table should start.
+        start_col (int): index of the column at which the table should start.
+        styles (XlsxStyles): Styles that should be applied to the table.
+        selected (bool, optional): Is the sheet selected when the workbook is opened? Defaults to True.
+        chunk_rows (int, optional): number of rows of the body that are translated at once.
+            Defaults to CHUNK_ROWS.
+    """
+    locations = Locations(tbl=tbl, start_row=start_row, start_col=start_col)
+    outlines = Outlines(tbl=tbl, locations=locations, styles=styles)
+    cells = CellWriter(
+        workbook=workbook, compositor=StyleCompositor(sparse=styles.sparse)
+    )
+    merges: list[str] = []
+
+    def merge(cell_range: CellRange) -> None:
+        merges.append(cell_range.coord)
+
+    # The right outline is drawn in the first column after the table
+    end_row = locations.get_row('end_row_data') + 1
+    end_col = locations.get_col('end_col_header_rhs') + 1
+    dimension = f'{get_column_letter(start_col)}{start_row}:{get_column_letter(end_col)}{end_row}'
+    file.write(
+        (
+            XML_DECLARATION
+            + f'<worksheet xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">'
+            + f'<dimension ref="{dimension}"/>'
+            + '<sheetViews><sheetView'
+            + (' tabSelected="1"' if selected else '')
+            + ' workbookViewId="0"/></sheetViews>'
+            + '<sheetFormatPr defaultRowHeight="15"/>'
+            + '<sheetData>'
+        ).encode('utf-8')
+    )
+    for row, row_cells in head_rows(
+        tbl=tbl,
+        locations=locations,
+        styles=styles,
+        outlines=outlines,
+        compositor=cells.compositor,
+        merge=merge,
+    ):
+        file.write(cells.row_xml(row=row, cells=row_cells).encode('utf-8'))
+
+    for chunk in body_xml(
+        tbl=tbl,
+        locations=locations,
+        styles=styles,
+        outlines=outlines,
+        cells=cells,
+        chunk_rows=chunk_rows,
+    ):
+        file.write(chunk.encode('utf-8'))
+
+    row, row_cells = footer_row(
+        tbl=tbl,
+        locations=locations,
+        styles=styles,
+        outlines=outlines,
+        compositor=cells.compositor,
+        merge=merge,
+    )
+    file.write(cells.row_xml(row=row, cells=row_cells).encode('utf-8'))
+    file.write(b'</sheetData>')
+
+    row_data = tbl.table_data['row_data']
+    if tbl.layout.has_lhs and styles.merge_rownames and row_data is not None:
+        merges.extend(rowname_merges(row_data=row_data, locations=locations))
+    if merges:
+        file.write(f'<mergeCells count="{len(merges)}">'.encode('utf-8'))
+        file.write(
+            ''.join(f'<mergeCell ref="{ref}"/>' for ref in merges).encode('utf-8')
+        )
+        file.write(b'</mergeCells>')
+
+    col_data = tbl.table_data['col_data']
+    if col_data is not None:
+        formatting = ConditionalFormattingList()
+        for cell_range, rule in conditional_rules(
+            cell_styles=styles.cell_styles, col_data=col_data, locations=locations
+        ):
+            formatting.add(cell_range, rule)
+        for conditional in formatting:
+            for rule in conditional.rules:
+                workbook.styles.add_rule(rule)
+            # openpyxl's tostring returns bytes
+            file.write(cast(bytes, tostring(conditional.to_tree())))
+
+    file.write(
+        b'<pageMargins left="0.75" right="0.75" top="1" bottom="1" header="0.5" footer="0.5"/>'
+        b'</worksheet>'
+    )
+
+
+class CellWriter:
+    """Translates composed cells to XML and registers their styles in the workbook."""
+
+    def __init__(self, workbook: NativeWorkbook, compositor: StyleCompositor):
+        """Create a writer for the cells of a single sheet.
+
+        Args:
+            workbook (NativeWorkbook): workbook of the sheet
+            compositor (StyleCompositor): compositor used to compose the styles of the sheet
+        """
+        self.workbook = workbook
+        self.compositor = compositor
+        self.style_ids: dict[tuple[tuple[Style, ...], str], int] = {}
+
+    def style_id(
+        self,
+        layers: list[Style],
+        value: Any = None,
+        row: int | None = None,
+        column: int | None = None,
+        number_format: str = 'General',
+    ) -> int:
+        """Find the index of the style of a cell in the workbook.
+
+        Args:
+            layers (list[Style]): style layers in the order in which they are applied.
+            value (Any, optional): value of the cell. Defaults to None.
+            row (int | None, optional): row of the cell. Defaults to None.
+            column (int | None, optional): column of the cell. Defaults to None.
+            number_format (str, optional): number format of the cell's value (see
+                value_number_format). Used if no style layer sets a number format.
+                Defaults to 'General'.
+
+        Returns:
+            int: index of the style; 0 is the default style
+        """
+        key = (tuple(layers), number_format)
+        style_id = self.style_ids.get(key)
+        if style_id is None:
+            style_id = self.workbook.styles.add(
+                self.compositor.compose(layers, value=value, row=row, column=column),
+                number_format=number_format,
+            )
+            if is_pure(key[0]):
+                self.style_ids[key] = style_id
+        return style_id
+
+    def row_xml(self, row: int, cells: dict[int, CellLayers]) -> str:
+        """Translate a row of the title, subtitle, header, or footnote to XML.
+
+        Args:
+            row (int): index of the row
+            cells (dict[int, CellLayers]): cells of the row with their column index as key
+
+        Raises:
+            ValueError: Error if a cell has a value that is not a string.
+
+        Returns:
+            str: XML of the row
+        """
+        parts = [f'<row r="{row}">']
+        for col in sorted(cells):
+            value = cells[col].value
+            style_id = self.style_id(
+                cells[col].layers, value=value, row=row, column=col
+            )
+            style = f' s="{style_id}"' if style_id else ''
+            ref = f'{get_column_letter(col)}{row}'
+            if value is None:
+                if style_id:
+                    parts.append(f'<c r="{ref}"{style}/>')
+            elif value == '':
+                parts.append(f'<c r="{ref}"{style} t="inlineStr"/>')
+            elif isinstance(value, str):
+                index = self.workbook.strings.add(value)
+                parts.append(f'<c r="{ref}"{style} t="s"><v>{index}</v></c>')
+            else:
+                raise ValueError(f'Expected a string in cell {ref}, got {value!r}.')
+        parts.append('</row>')
+        return ''.join(parts)
+
+
+@dataclass
+class BodyColumn:
+    """A column of the table body.
+
+    Attributes:
+        col (int): column index in the sheet
+        values (pl.Series | None): values of the column; None for columns without values
+        styles (np.ndarray | int): style id of each row or a single style id for all rows
+        is_shown (np.ndarray | None): boolean mask of the rows in which the value is shown.
+            Merged row names are only shown in the first row of the merged range.
+    """
+
+    col: int
+    values: pl.Series | None
+    styles: np.ndarray | int
+    is_shown: np.ndarray | None = None
+
+
+def body_xml(
+    tbl: TableSpam,
+    locations: Locations,
+    styles: XlsxStyles,
+    outlines: Outlines,
+    cells: CellWriter,
+    chunk_rows: int = CHUNK_ROWS,
+) -> Iterator[str]:
+    """Translate the table body (row names and data) to XML, chunk by chunk.
+
+    Args:
+        tbl (TableSpam): TableSpam table created with TableSpam
+        locations (Locations): the locations (indexes) of different elements found in the table.
+        styles (XlsxStyles): Styles that should be applied to the table.
+        outlines (Outlines): vertical and horizontal lines of the table.
+        cells (CellWriter): writer used to look up the styles of the cells.
+        chunk_rows (int, optional): number of rows translated at once. Defaults to CHUNK_ROWS.
+
+    Raises:
+        ValueError: Error when data does not exist.
+
+    Yields:
+        str: XML of the rows of the next chunk
+    """
+    col_data = tbl.table_data['col_data']
+    if col_data is None:
+        raise ValueError('Missing data')
+    start_row = locations.get_row('start_row_data')
+    start_col_data = locations.get_col('start_col_header_rhs')
+    end_col = locations.get_col('end_col_header_rhs')
+
+    def outline(col: int) -> list[Style]:
+        # Within the body, the outlines only depend on the column
+        cell = CellLayers()
+        outlines.apply(cell=cell, row=start_row, col=col)
+        return cell.layers
+
+    columns: list[BodyColumn] = []
+    if tbl.layout.has_lhs:
+        row_data = tbl.table_data['row_data']
+        if row_data is None:
+            raise ValueError('Missing data')
+        columns.extend(
+            rowname_columns(
+                row_data=row_data,
+                locations=locations,
+                styles=styles,
+                outline=outline,
+                cells=cells,
+            )
+        )
+
+    custom_styles = cell_style_map(cell_styles=styles.cell_styles, col_data=col_data)
+    for j, layers in enumerate(
+        column_layers(
+            data=col_data,
+            bg_style=styles.bg_data,
+            cell_style=styles.cell_data,
+            data_styles=styles.data_styles,
+        )
+    ):
+        col = start_col_data + j
+        custom = {
+            row: custom_layers
+            for (row, co), custom_layers in custom_styles.items()
+            if co == j
+        }
+        values = col_data.to_series(j)
+
+        def data_style_ids(number_format: str) -> np.ndarray | int:
+            style_ids: np.ndarray | int
+            if not is_pure(layers + outline(col)) or not all(
+                is_pure(custom_layers) for custom_layers in custom.values()
+            ):
+                # Style functions may read the value or the position of each cell
+                style_ids = np.array(
+                    [
+                        cells.style_id(
+                            layers + custom.get(i + 1, []) + outline(col),
+                            value=value,
+                            row=start_row + i,
+                            column=col,
+                            number_format=number_format,
+                        )
+                        for i, value in enumerate(values.to_list())
+                    ],
+                    dtype=np.int64,
+                )
+            elif custom:
+                style_ids = np.full(
+                    col_data.height,
+                    cells.style_id(layers + outline(col), number_format=number_format),
+                    dtype=np.int64,
+                )
+                for row, custom_layers in custom.items():
+                    # Rows of custom styles start at 1
+                    style_ids[row - 1] = cells.style_id(
+                        layers + custom_layers + outline(col),
+                        number_format=number_format,
+                    )
+            else:
+                style_ids = cells.style_id(
+                    layers + outline(col), number_format=number_format
+                )
+            return style_ids
+
+        columns.append(
+            BodyColumn(
+                col=col,
+                values=values,
+                styles=value_style_ids(style_ids=data_style_ids, values=values),
+            )
+        )
+    columns.append(
+        BodyColumn(
+            col=end_col + 1, values=None, styles=cells.style_id(outline(end_col + 1))
+        )
+    )
+
+    for offset in range(0, col_data.height, chunk_rows):
+        n_rows = min(chunk_rows, col_data.height - offset)
+        chunk: dict[str, pl.Series] = {
+            'row': pl.Series(
+                np.arange(start_row + offset, start_row + offset + n_rows)
+            ).cast(pl.String)
+        }
+        row_cells = []
+        for k, column in enumerate(columns):
+            value_type = None
+            if column.values is not None:
+                values, value_type = cell_values(
+                    values=column.values.slice(offset, n_rows),
+                    strings=cells.workbook.strings,
+                )
+                if column.is_shown is not None:
+                    hidden = np.flatnonzero(~column.is_shown[offset : offset + n_rows])
+                    values = values.scatter(hidden, None)
+                chunk[f'value_{k}'] = values
+            style: pl.Expr | int
+            if isinstance(column.styles, int):
+                style = column.styles
+            else:
+                chunk[f'style_{k}'] = pl.Series(
+                    column.styles[offset : offset + n_rows]
+                ).cast(pl.String)
+                style = pl.col(f'style_{k}')
+            row_cells.append(
+                cell_xml(
+                    letter=get_column_letter(column.col),
+                    value=None if value_type is None else pl.col(f'value_{k}'),
+                    value_type=value_type,
+                    style=style,
+                )
+            )
+        rows = pl.DataFrame(chunk).select(
+            pl.concat_str(
+                [
+                    pl.lit('<row r="'),
+                    pl.col('row'),
+                    pl.lit('">'),
+                    *row_cells,
+                    pl.lit('</row>'),
+                ]
+            ).str.join('')
+        )
+        yield rows.item()
+
+
+def rowname_columns(
+    row_data: pl.DataFrame,
+    locations: Locations,
+    styles: XlsxStyles,
+    outline: Callable[[int], list[Style]],
+    cells: CellWriter,
+) -> list[BodyColumn]:
+    """Create the columns of the row names.
+
+    If the row names are merged, each cell is either not merged, the first cell of a
+    merged range, the last cell of a merged range, or a cell in between. Each of these
+    has its own style (see RownameCells.create).
+
+    Args:
+        row_data (pl.DataFrame): data that is written as rownames in the table.
+        locations (Locations): the locations (indexes) of different elements found in the table.
+        styles (XlsxStyles): Styles that should be applied to the table.
+        outline (Callable[[int], list[Style]]): function returning the outline layers of a column
+        cells (CellWriter): writer used to look up the styles of the cells.
+
+    Returns:
+        list[BodyColumn]: one column per row name
+    """
+    start_row = locations.get_row('start_row_data')
+    start_col = locations.get_col('start_col_header_lhs')
+    cell_ids = row_data_cell_ids(row_data) if styles.merge_rownames else None
+    columns = []
+    for co, layers in enumerate(
+        column_layers(
+            data=row_data,
+            bg_style=styles.bg_rownames,
+            cell_style=styles.cell_rownames,
+            data_styles=styles.data_styles,
+        )
+    ):
+        col = start_col + co
+        position_layers = [layers + outline(col)]
+        position: np.ndarray = np.zeros(row_data.height, dtype=np.int64)
+        is_shown = None
+        if cell_ids is not None and row_data.height > 0:
+            # A merged range of three rows has a first, a middle, and a last cell
+            first = CellLayers(layers=layers + [styles.merged_rownames_style])
+            merged = MergedRange(
+                start_cell=first,
+                end_cell=CellLayers(layers=list(first.layers)),
+                min_row=start_row,
+                min_col=col,
+                max_row=start_row + 2,
+                max_col=col,
+                compositor=cells.compositor,
+            )
+            middle = CellLayers()
+            last = CellLayers()
+            for row, cell in enumerate([first, middle, last], start_row):
+                merged.format(cell=cell, row=row, col=col)
+            position_layers.extend(
+                cell.layers + outline(col) for cell in [first, last, middle]
+            )
+
+            changes = cell_ids[1:, co] != cell_ids[:-1, co]
+            is_first = np.concatenate(([True], changes))
+            is_last = np.concatenate((changes, [True]))
+            # 0: not merged, 1: first, 2: last, 3: middle cell of a merged range
+            position = (~is_first).astype(np.int64) * 2 + (~is_last).astype(np.int64)
+            is_shown = is_first
+
+        values = row_data.to_series(co)
+
+        def rowname_style_ids(number_format: str) -> np.ndarray | int:
+            style_ids: np.ndarray | int
+            if not all(is_pure(cell_layers) for cell_layers in position_layers):
+                # Style functions may read the value or the position of each cell.
+                # The borders of merged ranges are still taken from a representative range.
+                names = values.to_list()
+                style_ids = np.array(
+                    [
+                        cells.style_id(
+                            position_layers[int(pos)],
+                            value=names[i] if is_shown is None or is_shown[i] else None,
+                            row=start_row + i,
+                            column=col,
+                            number_format=number_format,
+                        )
+                        for i, pos in enumerate(position)
+                    ],
+                    dtype=np.int64,
+                )
+            elif is_shown is None:
+                style_ids = cells.style_id(
+                    position_layers[0], number_format=number_format
+                )
+            else:
+                range_styles = np.array(
+                    [
+                        cells.style_id(cell_layers, number_format=number_format)
+                        for cell_layers in position_layers
+                    ]
+                )
+                style_ids = range_styles[position]
+            return style_ids
+
+        columns.append(
+            BodyColumn(
+                col=col,
+                values=values,
+                styles=value_style_ids(
+                    style_ids=rowname_style_ids, values=values, is_shown=is_shown
+                ),
+                is_shown=is_shown,
+            )
+        )
+    return columns
+
+
+def rowname_merges(row_data: pl.DataFrame, locations: Locations) -> list[str]:
+    """Find the cell ranges of the merged row names.
+
+    Args:
+        row_data (pl.DataFrame): data that is written as rownames in the table.
+        locations (Locations): the locations (indexes) of different elements found in the table.
+
+    Returns:
+        list[str]: ranges (e.g., 'A5:A8') of the merged row names
+    """
+    start_row = locations.get_row('start_row_data')
+    start_col = locations.get_col('start_col_header_lhs')
+    merges: list[str] = []
+    if row_data.height == 0:
+        return merges
+    for co, ranges in enumerate(rowname_merge_ranges(row_data_cell_ids(row_data))):
+        letter = get_column_letter(start_col + co)
+        merges.extend(
+            f'{letter}{start_row + first}:{letter}{start_row + last}'
+            for first, last in ranges
+        )
+    return merges
+
+
+def cell_xml(
+    letter: str, value: pl.Expr | None, value_type: str | None, style: pl.Expr | int
+) -> pl.Expr:
+    """Create the XML of the cells in a column of the table body.
+
+    Cells without value are only written if they have a style.
+
+    Args:
+        letter (str): letter of the column
+        value (pl.Expr | None): text of the values (see cell_values) or None if the column has no values
+        value_type (str | None): type of the values (see cell_values)
+        style (pl.Expr | int): style id of each cell (as string) or a single style id for all cells
+
+    Returns:
+        pl.Expr: expression with the XML of each cell
+    """
+    style_attribute: list[pl.Expr]
+    if isinstance(style, int):
+        style_attribute = [pl.lit(f' s="{style}"' if style else '')]
+        empty = (
+            pl.concat_str(
+                [pl.lit(f'<c r="{letter}'), pl.col('row'), pl.lit(f'" s="{style}"/>')]
+            )
+            if style
+            else pl.lit('')
+        )
+    else:
+        style_attribute = [pl.lit(' s="'), style, pl.lit('"')]
+        empty = (
+            pl.when(style == '0')
+            .then(pl.lit(''))
+            .otherwise(
+                pl.concat_str(
+                    [
+                        pl.lit(f'<c r="{letter}'),
+                        pl.col('row'),
+                        pl.lit('" s="'),
+                        style,
+                        pl.lit('"/>'),
+                    ]
+                )
+            )
+        )
+    if value is None:
+        return empty
+    type_attribute = f' t="{value_type}"' if value_type != 'n' else ''
+    full = pl.concat_str(
+        [
+            pl.lit(f'<c r="{letter}'),
+            pl.col('row'),
+            pl.lit('"'),
+            *style_attribute,
+            pl.lit(f'{type_attribute}><v>'),
+            value,
+            pl.lit('</v></c>'),
+        ]
+    )
+    if value_type == 's':
+        # openpyxl writes empty strings as inline strings without text
+        empty_string = pl.concat_str(
+            [
+                pl.lit(f'<c r="{letter}'),
+                pl.col('row'),
+                pl.lit('"'),
+                *style_attribute,
+                pl.lit(' t="inlineStr"/>'),
+            ]
+        )
+        return (
+            pl.when(value.is_null())
+            .then(empty)
+            .when(value == '')
+            .then(empty_string)
+            .otherwise(full)
+        )
+    return pl.when(value.is_null()).then(empty).otherwise(full)
+
+
+def cell_values(values: pl.Series, strings: SharedStrings) -> tuple[pl.Series, str]:
+    """Translate the values of a column to the text of Excel cells.
+
+    The values are translated as by openpyxl: Numbers are written with 16 significant
+    digits, dates and times as serial numbers (days since 1899-12-30), and booleans as 1 or 0.
+    Strings are added to the shared strings and written as their index.
+
+    Args:
+        values (pl.Series): values of the column
+        strings (SharedStrings): shared strings of the workbook
+
+    Raises:
+        TypeError: Error if a datetime has a time zone.
+        ValueError: Error if the values cannot be written to Excel.
+
+    Returns:
+        tuple[pl.Series, str]: text of each value (null for missing values) and the
+            type of the cells ('n' for numbers, 'b' for booleans, 's' for strings)
+    """
+    dtype = values.dtype
+    if dtype == pl.Null:
+        return values.cast(pl.String), 'n'
+    if dtype == pl.Boolean:
+        return values.cast(pl.UInt8).cast(pl.String), 'b'
+    if dtype == pl.String or isinstance(dtype, (pl.Categorical, pl.Enum)):
+        text = values.cast(pl.String)
+        # Empty strings are not added to the shared strings (see cell_xml)
+        index = strings.add_series(
+            pl.select(pl.when(text != '').then(text)).to_series()
+        ).cast(pl.String)
+        return pl.select(
+            pl.when(text == '').then(pl.lit('')).otherwise(index)
+        ).to_series(), 's'
+    if dtype.is_numeric():
+        if isinstance(dtype, pl.Decimal):
+            values = values.cast(pl.Float64)
+        return number_text(values), 'n'
+    if dtype == pl.Date:
+        days = values.cast(pl.Int64) + EXCEL_EPOCH_OFFSET
+        return number_text(leap_year_bug(days)), 'n'
+    if isinstance(dtype, pl.Datetime):
+        if dtype.time_zone is not None:
+            raise TypeError(
+                'Excel does not support timezones in datetimes. '
+                + 'The tzinfo in the datetime/time object must be set to None.'
+            )
+        microseconds = values.dt.cast_time_unit('us').cast(pl.Int64)
+        days = microseconds // 86_400_000_000
+        serial = leap_year_bug(days + EXCEL_EPOCH_OFFSET) + day_fraction(
+            microseconds - days * 86_400_000_000
+        )
+        return number_text(serial), 'n'
+    if dtype == pl.Time:
+        return number_text(day_fraction(values.cast(pl.Int64) // 1_000)), 'n'
+    if isinstance(dtype, pl.Duration):
+        microseconds = values.dt.cast_time_unit('us').cast(pl.Int64)
+        return number_text(divide(divide(microseconds, 1_000_000), 86_400)), 'n'
+    raise ValueError(f'Cannot write values of type {dtype} to Excel.')
+
+
+def value_number_format(dtype: pl.DataType) -> str:
+    """Find the number format openpyxl assigns to cells with values of a data type.
+
+    Args:
+        dtype (pl.DataType): data type of the values
+
+    Returns:
+        str: number format of dates, datetimes, times, and durations; 'General' otherwise
+    """
+    if dtype == pl.Date:
+        return TIME_FORMATS[datetime.date]
+    if isinstance(dtype, pl.Datetime):
+        return TIME_FORMATS[datetime.datetime]
+    if dtype == pl.Time:
+        return TIME_FORMATS[datetime.time]
+    if isinstance(dtype, pl.Duration):
+        return TIME_FORMATS[datetime.timedelta]
+    return 'General'
+
+
+def value_style_ids(
+    style_ids: Callable[[str], np.ndarray | int],
+    values: pl.Series,
+    is_shown: np.ndarray | None = None,
+) -> np.ndarray | int:
+    """Find the styles of a column, including the number format of its values.
+
+    As in openpyxl, cells with a date or time get the number format of their value unless
+    a style layer sets a number format. Cells without a value keep the 'General' format.
+
+    Args:
+        style_ids (Callable[[str], np.ndarray | int]): function returning the style ids of
+            the column given the number format of its values
+        values (pl.Series): values of the column
+        is_shown (np.ndarray | None, optional): boolean mask of the rows in which the value
+            is shown. Defaults to None (all rows).
+
+    Returns:
+        np.ndarray | int: style id of each row or a single style id for all rows
+    """
+    number_format = value_number_format(values.dtype)
+    if number_format == 'General':
+        return style_ids(number_format)
+    has_value = values.is_not_null().to_numpy()
+    if is_shown is not None:
+        has_value = has_value & is_shown
+    if has_value.all():
+        return style_ids(number_format)
+    return np.where(has_value, style_ids(number_format), style_ids('General'))
+
+
+def leap_year_bug(days: pl.Series) -> pl.Series:
+    """Adjust serial dates for Excel's non-existent 1900-02-29.
+
+    Args:
+        days (pl.Series): days since 1899-12-30
+
+    Returns:
+        pl.Series: serial dates. Dates before 1900-03-01 are moved one day back (as in openpyxl).
+    """
+    return pl.select(
+        pl.when((days > 0) & (days <= 60)).then(days - 1).otherwise(days)
+    ).to_series()
+
+
+def day_fraction(microseconds: pl.Series) -> pl.Series:
+    """Translate the time of a day to the fraction of the day.
+
+    Args:
+        microseconds (pl.Series): microseconds since midnight
+
+    Returns:
+        pl.Series: fraction of the day (computed as openpyxl's time_to_days)
+    """
+    seconds = microseconds // 1_000_000 + divide(microseconds % 1_000_000, 1_000_000)
+    return divide(seconds, 86_400)
+
+
+def divide(values: pl.Series, divisor: int) -> pl.Series:
+    """Divide values by a constant.
+
+    polars multiplies by the reciprocal of constant divisors, which may change the
+    last digit of the result. numpy divides exactly as Python does (and as openpyxl).
+
+    Args:
+        values (pl.Series): numbers; missing values become NaN
+        divisor (int): divisor
+
+    Returns:
+        pl.Series: quotients
+    """
+    return pl.Series(values.name, values.cast(pl.Float64).to_numpy() / divisor)
+
+
+def number_text(values: pl.Series) -> pl.Series:
+    """Write numbers with 16 significant digits (as openpyxl).
+
+    polars writes numbers with the shortest text that is read as the same number.
+    This text only differs from the one created with '%.16g' if it has more than 16
+    significant digits; those numbers are formatted with '%.16g'.
+
+    Args:
+        values (pl.Series): numbers
+
+    Returns:
+        pl.Series: text of the numbers; null for missing, infinite, and NaN values
+    """
+    if values.dtype.is_float():
+        values = pl.select(pl.when(values.is_finite()).then(values)).to_series()
+    text = values.cast(pl.String)
+    digits = (
+        text.str.replace(r'e.*$', '')
+        .str.replace_all(r'[^0-9]', '')
+        .str.strip_chars_start('0')
+        .str.len_chars()
+    )
+    long = (digits > 16).arg_true()
+    if long.len() > 0:
+        text = text.scatter(
+            long, ['%.16g' % value for value in values.gather(long).to_list()]
+        )
+    return text
@@ -0,0 +1,142 @@
+"""Split tables that do not fit on a single Excel sheet.
+
+Excel sheets have at most 1,048,576 rows. Larger tables are continued on additional
+sheets (e.g., 'Table', 'Table (2)', 'Table (3)'). Each sheet repeats the title,
+subtitle, header, and footnote of the table and shows the next block of rows.
+"""
+
+from __future__ import annotations
+from dataclasses import replace
+from typing import TYPE_CHECKING, Literal
+
+from tablespam.Excel.xlsx_styles import CellStyle, ConditionalStyle, XlsxStyles
+from tablespam.Excel._as_excel.locations import Locations
+
+if TYPE_CHECKING:
+    from tablespam.TableSpam import TableSpam
+
+# Maximal number of rows in an Excel sheet
+EXCEL_MAX_ROWS = 1_048_576
+
+# Maximal number of characters in the name of an Excel sheet
+EXCEL_MAX_TITLE = 31
+
+
+def sheet_parts(
+    tbl: TableSpam,
+    sheet: str,
+    start_row: int,
+    start_col: int,
+    styles: XlsxStyles,
+    overflow: Literal['split', 'error'],
+) -> list[tuple[str, TableSpam, XlsxStyles]]:
+    """Split a table into parts that each fit on a single sheet.
+
+    Args:
+        tbl (TableSpam): TableSpam table created with TableSpam
+        sheet (str): name of the first sheet
+        start_row (int): index of the row at which the table starts on each sheet.
+        start_col (int): index of the column at which the table starts on each sheet.
+        styles (XlsxStyles): Styles that should be applied to the table.
+        overflow (Literal['split', 'error']): 'split' continues the table on additional
+            sheets, 'error' raises an error if the table does not fit on a single sheet.
+
+    Raises:
+        ValueError: Error if the overflow policy is unknown.
+        ValueError: Error if the table does not fit on a single sheet and overflow='error'.
+        ValueError: Error if not a single row of data fits on a sheet.
+        ValueError: Error when trying to style a row outside of the range of the data.
+
+    Returns:
+        list[tuple[str, TableSpam, XlsxStyles]]: name, table, and styles of each sheet.
+            If the table fits on a single sheet, the list only contains the table itself.
+    """
+    if overflow not in ['split', 'error']:
+        raise ValueError(f"overflow must be 'split' or 'error', got {overflow}.")
+    locations = Locations(tbl=tbl, start_row=start_row, start_col=start_col)
+    # The row below the data holds the footnote and the bottom line of the table
+    if locations.get_row('end_row_data') + 1 <= EXCEL_MAX_ROWS:
+        return [(sheet, tbl, styles)]
+    if overflow == 'error':
+        raise ValueError(
+            f'The table does not fit on a single sheet with {EXCEL_MAX_ROWS} rows. '
+            + "Use overflow='split' to continue the table on additional sheets."
+        )
+
+    rows_per_sheet = EXCEL_MAX_ROWS - locations.get_row('start_row_data')
+    if rows_per_sheet < 1:
+        raise ValueError('The header of the table does not fit on a single sheet.')
+    col_data = tbl.table_data['col_data']
+    n_rows = 0 if col_data is None else col_data.height
+    check_cell_style_rows(styles=styles, n_rows=n_rows)
+
+    parts = []
+    for index, offset in enumerate(range(0, n_rows, rows_per_sheet), 1):
+        length = min(rows_per_sheet, n_rows - offset)
+        parts.append(
+            (
+                continuation_title(sheet=sheet, index=index),
+                tbl._slice_rows(offset=offset, length=length),
+                shift_cell_styles(styles=styles, offset=offset, length=length),
+            )
+        )
+    return parts
+
+
+def continuation_title(sheet: str, index: int) -> str:
+    """Create the name of the index-th sheet of a table.
+
+    Args:
+        sheet (str): name of the first sheet
+        index (int): index of the sheet, starting at 1
+
+    Returns:
+        str: name of the sheet; the name of the first sheet is shortened if necessary
+            so that the name has at most 31 characters.
+    """
+    if index == 1:
+        return sheet
+    suffix = f' ({index})'
+    return sheet[: EXCEL_MAX_TITLE - len(suffix)] + suffix
+
+
+def check_cell_style_rows(styles: XlsxStyles, n_rows: int) -> None:
+    """Check that the custom cell styles only refer to rows of the data.
+
+    Args:
+        styles (XlsxStyles): Styles that should be applied to the table.
+        n_rows (int): number of rows in the data
+
+    Raises:
+        ValueError: Error when trying to style a row outside of the range of the data.
+    """
+    for sty in styles.cell_styles or []:
+        if isinstance(sty, CellStyle) and any(row > n_rows for row in sty.rows):
+            raise ValueError('Trying to style a row outside of the range of the data.')
+
+
+def shift_cell_styles(styles: XlsxStyles, offset: int, length: int) -> XlsxStyles:
+    """Select the custom cell styles of a block of rows.
+
+    CellStyles refer to the rows of the data, starting at 1. In the block, the rows start
+    again at 1. ConditionalStyles are evaluated on the data of each block and are kept as is.
+
+    Args:
+        styles (XlsxStyles): Styles that should be applied to the table.
+        offset (int): index of the first row of the block (starting at 0)
+        length (int): number of rows in the block
+
+    Returns:
+        XlsxStyles: styles with the custom cell styles of the block
+    """
+    if styles.cell_styles is None:
+        return styles
+    cell_styles: list[CellStyle | ConditionalStyle] = []
+    for sty in styles.cell_styles:
+        if not isinstance(sty, CellStyle):
+            cell_styles.append(sty)
+            continue
+        rows = [row - offset for row in sty.rows if offset < row <= offset + length]
+        if rows:
+            cell_styles.append(replace(sty, rows=rows))
+    return replace(styles, cell_styles=cell_styles)
@@ -0,0 +1,131 @@
+"""Export a TableSpam table to Excel using openpyxl's write-only worksheets."""
+
+from __future__ import annotations
+from typing import TYPE_CHECKING, cast
+
+import openpyxl as opy
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import Cell
+from openpyxl.worksheet.cell_range import CellRange
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
+from openpyxl.worksheet.worksheet import Worksheet
+
+from tablespam.Excel.xlsx_styles import XlsxStyles
+from tablespam.Excel._as_excel.locations import Locations
+from tablespam.Excel._as_excel.conditional import add_conditional_styles
+from tablespam.Excel._as_excel.compose import (
+    CellLayers,
+    StyleCompositor,
+    compose_rows,
+)
+
+if TYPE_CHECKING:
+    from tablespam.TableSpam import TableSpam
+
+
+def tbl_stream_excel(
+    tbl: TableSpam,
+    workbook: opy.Workbook,
+    sheet: str = 'Table',
+    start_row: int = 1,
+    start_col: int = 1,
+    styles: XlsxStyles | None = None,
+) -> opy.Workbook:
+    """Export a TableSpam table to a write-only Excel workbook.
+
+    In contrast to tbl_as_excel, the rows are emitted in order through openpyxl's
+    write-only worksheet, which writes them to a temporary file right away. The memory
+    used by the export therefore does not grow with the number of rows in the table.
+    The resulting sheet is identical to the one created by tbl_as_excel.
+
+    Args:
+        tbl (TableSpam): TableSpam table created with TableSpam
+        workbook (opy.Workbook): openpyxl workbook created with write_only=True
+        sheet (str, optional): name of the sheet to which the table should be added. Defaults to 'Table'.
+        start_row (int, optional): index of the row at which the table should start. Defaults to 1.
+        start_col (int, optional): index of the column at which the table should start. Defaults to 1.
+        styles (XlsxStyles | None, optional): Styles that should be applied to the table. Defaults to None.
+
+    Raises:
+        ValueError: Error if the workbook is not write-only.
+        ValueError: Error if the sheet already exists.
+
+    Returns:
+        opy.Workbook: workbook with added table
+    """
+    if styles is None:
+        styles = XlsxStyles()
+
+    if not workbook.write_only:
+        raise ValueError(
+            'Streaming requires a write-only workbook. Create it with opy.Workbook(write_only=True).'
+        )
+    if sheet in workbook.sheetnames:
+        raise ValueError(
+            f'The sheet {sheet} already exists. Sheets of write-only workbooks cannot be changed after they were created.'
+        )
+
+    sheet_ref = workbook.create_sheet(title=sheet)
+    locations = Locations(tbl=tbl, start_row=start_row, start_col=start_col)
+    compositor = StyleCompositor(sparse=styles.sparse)
+
+    def merge(cell_range: CellRange) -> None:
+        # Write-only sheets are set up with the same merged_cells as regular sheets
+        # (see openpyxl's Worksheet._setup) and write them when the sheet is closed.
+        # The ranges are added directly as the merged ranges of a table never overlap.
+        cast(Worksheet, sheet_ref).merged_cells.ranges.add(cell_range)
+
+    # Write-only sheets are always filled from the first row on.
+    for _ in range(1, start_row):
+        sheet_ref.append([])
+
+    for row, cells in compose_rows(
+        tbl=tbl,
+        locations=locations,
+        styles=styles,
+        compositor=compositor,
+        merge=merge,
+    ):
+        sheet_ref.append(
+            write_only_row(sheet=sheet_ref, row=row, cells=cells, compositor=compositor)
+        )
+
+    if tbl.table_data['col_data'] is not None:
+        add_conditional_styles(
+            sheet=cast(Worksheet, sheet_ref),
+            cell_styles=styles.cell_styles,
+            col_data=tbl.table_data['col_data'],
+            locations=locations,
+        )
+
+    return workbook
+
+
+def write_only_row(
+    sheet: WriteOnlyWorksheet,
+    row: int,
+    cells: dict[int, CellLayers],
+    compositor: StyleCompositor,
+) -> list[Cell | None]:
+    """Create the write-only cells of a single row.
+
+    Args:
+        sheet (WriteOnlyWorksheet): write-only sheet to which the table is added.
+        row (int): index of the row
+        cells (dict[int, CellLayers]): cells of the row with their column index as key.
+        compositor (StyleCompositor): compositor that assigns the styles to the cells.
+
+    Returns:
+        list[Cell | None]: cells of the row, starting with the first column of the sheet.
+    """
+    row_cells: list[Cell | None] = [None] * max(cells)
+    for col, layers in cells.items():
+        if compositor.is_unstyled(layers, row=row, column=col):
+            continue
+        cell = WriteOnlyCell(sheet, value=layers.value)
+        # Write-only cells are positioned when the row is appended; style functions
+        # may read the position of the cell before.
+        cell.row, cell.column = row, col
+        compositor.assign(cell=cell, layers=layers.layers)
+        row_cells[col - 1] = cell
+    return row_cells
@@ -1,11 +1,18 @@
 """Styling options for tables exported to excel."""
 
 from __future__ import annotations
-from typing import Callable, cast, Literal, Optional
+from typing import Callable, cast, Optional
 import openpyxl as opy
 from openpyxl.worksheet.worksheet import Worksheet
 from openpyxl.utils import get_column_interval
 from openpyxl.cell.cell import Cell
+from tablespam.Excel.style_spec import (
+    AlignmentSpec,
+    BorderSpec,
+    BorderStyle,
+    FontSpec,
+    StyleSpec,
+)
 
 
 def set_region_style(
@@ -35,24 +42,6 @@ def set_region_style(
             style(sheet[cell])
 
 
-BorderStyle = Literal[
-    'dashDot',
-    'dashDotDot',
-    'dashed',
-    'dotted',
-    'double',
-    'hair',
-    'medium',
-    'mediumDashDot',
-    'mediumDashDotDot',
-    'mediumDashed',
-    'slantDashDot',
-    'thick',
-    'thin',
-    'none',
-]
-
-
 def set_border(
     c: Cell,
     color: str,
@@ -87,125 +76,33 @@ def set_border(
     c.border = border
 
 
-# Helper functions
-def default_bg_style(cell: Cell) -> None:
-    """Default background style.
-
-    Args:
-        cell (Cell): Cell reference to which the style is applied
-    """
-    cell.fill = opy.styles.PatternFill(start_color='FFFFFF', fill_type='solid')
-
-
-def vline_style(cell: Cell) -> None:
-    """Default vertical line style.
-
-    Args:
-        cell (Cell): Cell reference to which the style is applied
-    """
-    set_border(cell, color='FF000000', left='thin')
-
-
-def hline_style(cell: Cell) -> None:
-    """Default horizontal line style.
-
-    Args:
-        cell (Cell): Cell reference to which the style is applied
-    """
-    set_border(cell, color='FF000000', top='thin')
-
-
-def cell_title_style(cell: Cell) -> None:
-    """Default title cell style.
-
-    Args:
-        cell (Cell): Cell reference to which the style is applied
-    """
-    cell.font = opy.styles.Font(size=14, bold=True)
-
-
-def cell_subtitle_style(cell: Cell) -> None:
-    """Default subtitle style.
-
-    Args:
-        cell (Cell): Cell reference to which the style is applied
-    """
-    cell.font = opy.styles.Font(size=11, bold=True)
-
-
-def cell_header_lhs_style(cell: Cell) -> None:
-    """Default style applied to left hand side of the table header.
-
-    Args:
-        cell (Cell): Cell reference to which the style is applied
-    """
-    cell.font = opy.styles.Font(size=11, bold=True)
-    cell.border = opy.styles.borders.Border(
-        left=opy.styles.borders.Side(style='thin', color='FF000000'),
-        bottom=opy.styles.borders.Side(style='thin', color='FF000000'),
-        right=opy.styles.borders.Side(style='thin', color='FF000000'),
-    )
-
-
-def cell_header_rhs_style(cell: Cell) -> None:
-    """Default style applied to right hand side of the table header.
-
-    Args:
-        cell (Cell): Cell reference to which the style is applied
-    """
-    cell.font = opy.styles.Font(size=11, bold=True)
-    cell.border = opy.styles.borders.Border(
-        left=opy.styles.borders.Side(style='thin', color='FF000000'),
-        bottom=opy.styles.borders.Side(style='thin', color='FF000000'),
-        right=opy.styles.borders.Side(style='thin', color='FF000000'),
-    )
-
-
-def cell_rownames_style(cell: Cell) -> None:
-    """Default style applied to rowname cells.
-
-    Args:
-        cell (Cell): Cell reference to which the style is applied
-    """
-    cell.font = opy.styles.Font(size=11)
-
-
-def cell_data_style(cell: Cell) -> None:
-    """Default style applied to data cells.
-
-    Args:
-        cell (Cell): Cell reference to which the style is applied
-    """
-    cell.font = opy.styles.Font(size=11)
-
-
-def cell_footnote_style(cell: Cell) -> None:
-    """Default style applied to footnote cells.
-
-    Args:
-        cell (Cell): Cell reference to which the style is applied
-    """
-    cell.font = opy.styles.Font(size=11)
-    cell.alignment = opy.styles.alignment.Alignment(horizontal='left')
-
-
-def merged_rownames_style(cell: Cell) -> None:
-    """Default style applied to merged row name cells.
-
-    Args:
-        cell (Cell): Cell reference to which the style is applied
-    """
-    cell.alignment = opy.styles.alignment.Alignment(vertical='top')
-
-
-def footnote_style(cell: Cell) -> None:
-    """Default style applied to footnote.
-
-    Args:
-        cell (Cell): Cell reference to which the style is applied
-    """
-    cell.font = opy.styles.Font(size=11, bold=True)
-    cell.alignment = opy.styles.alignment.Alignment(horizontal='left')
+# Default styles
+default_bg_style = StyleSpec(fill='FFFFFF')
+vline_style = StyleSpec(border=BorderSpec(left='thin', color='FF000000'))
+hline_style = StyleSpec(border=BorderSpec(top='thin', color='FF000000'))
+cell_title_style = StyleSpec(font=FontSpec(size=14, bold=True))
+cell_subtitle_style = StyleSpec(font=FontSpec(size=11, bold=True))
+cell_header_lhs_style = StyleSpec(
+    font=FontSpec(size=11, bold=True),
+    border=BorderSpec(
+        left='thin', bottom='thin', right='thin', color='FF000000', retain=False
+    ),
+)
+cell_header_rhs_style = StyleSpec(
+    font=FontSpec(size=11, bold=True),
+    border=BorderSpec(
+        left='thin', bottom='thin', right='thin', color='FF000000', retain=False
+    ),
+)
+cell_rownames_style = StyleSpec(font=FontSpec(size=11))
+cell_data_style = StyleSpec(font=FontSpec(size=11))
+cell_footnote_style = StyleSpec(
+    font=FontSpec(size=11), alignment=AlignmentSpec(horizontal='left')
+)
+merged_rownames_style = StyleSpec(alignment=AlignmentSpec(vertical='top'))
+footnote_style = StyleSpec(
+    font=FontSpec(size=11, bold=True), alignment=AlignmentSpec(horizontal='left')
+)
 
 
 def get_text_color(primary_color: str) -> str:
@@ -2,42 +2,26 @@
 
 from typing import Callable
 import polars as pl
-import openpyxl as opy
-from openpyxl.utils import get_column_interval
 from openpyxl.cell.cell import Cell
 from tablespam.Excel.xlsx_styles import DataStyle
 
 
-def write_excel_col(
-    workbook: opy.Workbook,
-    sheet: str,
-    data: pl.DataFrame,
-    row_start: int,
-    col_start: int,
-    base_style: Callable[[Cell], None],
-    data_styles: dict[str, DataStyle],
-) -> None:
-    """Writes a single data column to the Excel workbook.
+def get_data_style(
+    data: pl.DataFrame, data_styles: dict[str, DataStyle]
+) -> Callable[[Cell], None] | None:
+    """Find the data style that should be applied to a single data column.
+
+    The data styles are tested in order and the first style whose test
+    returns True is used.
 
     Args:
-        workbook (opy.Workbook): openpyxl workbook
-        sheet (str): name of the sheet to which the table should be added. Defaults to 'Table'.
-        data (pl.DataFrame): data frame to add to the table. Should a single column.
-        row_start (int): row where the table start will start in the workbook
-        col_start (int): column where the table start will start in the workbook
-        base_style (Callable[[Cell], None]): style to add to all data cells
+        data (pl.DataFrame): data frame with a single column.
         data_styles (dict[str, DataStyle]): style to add to specific data types
+
+    Returns:
+        Callable[[Cell], None] | None: The style of the first matching DataStyle or None if no test matched.
     """
-    style = None
     for data_style in data_styles:
         if data_styles[data_style].test(data):
-            style = data_styles[data_style].style
-            break
-
-    col = get_column_interval(start=col_start, end=col_start)[0]
-    for row in range(row_start, row_start + data.shape[0]):
-        workbook[sheet][col + str(row)] = data[row - row_start, 0]
-        # we first apply the base style and then add/replace type specific styles:
-        base_style(workbook[sheet][col + str(row)])
-        if style is not None:
-            style(workbook[sheet][col + str(row)])
+            return data_styles[data_style].style
+    return None
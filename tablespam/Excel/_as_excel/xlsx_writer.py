@@ -0,0 +1,491 @@
+"""Write xlsx files without creating an openpyxl workbook.
+
+An xlsx file is a zip archive of XML documents. NativeWorkbook holds the parts that are
+shared by all sheets (the shared strings and the styles) and the XML of each sheet.
+The XML of the sheets is created by tbl_native_excel (see native_excel.py); the remaining
+parts are created when the workbook is saved.
+
+The style objects (fonts, fills, borders, ...) are still openpyxl objects, so that the
+styles of tablespam (including custom style functions) work with both backends.
+"""
+
+from __future__ import annotations
+import os
+import re
+import shutil
+import tempfile
+import weakref
+import zipfile
+from typing import IO, BinaryIO, cast
+from xml.sax.saxutils import escape, quoteattr
+
+import polars as pl
+from openpyxl.formatting.rule import Rule
+from openpyxl.styles.alignment import Alignment
+from openpyxl.styles.borders import DEFAULT_BORDER, Border
+from openpyxl.styles.cell_style import CellStyle, CellStyleList
+from openpyxl.styles.differential import DifferentialStyle, DifferentialStyleList
+from openpyxl.styles.fills import DEFAULT_EMPTY_FILL, DEFAULT_GRAY_FILL, Fill
+from openpyxl.styles.fonts import DEFAULT_FONT, Font
+from openpyxl.styles.named_styles import NamedStyle
+from openpyxl.styles.numbers import (
+    BUILTIN_FORMATS,
+    BUILTIN_FORMATS_MAX_SIZE,
+    BUILTIN_FORMATS_REVERSE,
+    NumberFormat,
+)
+from openpyxl.styles.protection import Protection
+from openpyxl.styles.stylesheet import Stylesheet
+from openpyxl.utils.exceptions import IllegalCharacterError
+from openpyxl.utils.indexed_list import IndexedList
+from openpyxl.writer.theme import theme_xml
+from openpyxl.xml.functions import tostring
+
+from tablespam.Excel._as_excel.compose import StyledCell
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PACKAGE_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument'
+
+# Characters that are not allowed in the XML of a worksheet (same as openpyxl)
+ILLEGAL_CHARACTERS_RE = re.compile(r'[\000-\010]|[\013-\014]|[\016-\037]')
+INVALID_TITLE_RE = re.compile(r'[\\*?:/\[\]]')
+
+
+class SharedStrings:
+    """Table of the strings used in the cells of all sheets of a workbook.
+
+    Cells refer to their string by its index in the table, so each distinct string is
+    only saved once.
+    """
+
+    def __init__(self) -> None:
+        """Create an empty table."""
+        self.index: dict[str, int] = {}
+
+    def add(self, value: str) -> int:
+        """Add a string to the table.
+
+        Args:
+            value (str): string
+
+        Raises:
+            IllegalCharacterError: Error if the string contains characters that are not
+                allowed in worksheets.
+
+        Returns:
+            int: index of the string in the table
+        """
+        index = self.index.get(value)
+        if index is None:
+            if ILLEGAL_CHARACTERS_RE.search(value):
+                raise IllegalCharacterError(f'{value} cannot be used in worksheets.')
+            index = len(self.index)
+            self.index[value] = index
+        return index
+
+    def add_series(self, values: pl.Series) -> pl.Series:
+        """Add all strings of a column to the table.
+
+        Args:
+            values (pl.Series): strings
+
+        Returns:
+            pl.Series: index of each string in the table; null where the string is null
+        """
+        mapping = {
+            value: self.add(value)
+            for value in values.drop_nulls().unique(maintain_order=True).to_list()
+        }
+        return values.replace_strict(mapping, default=None, return_dtype=pl.UInt32)
+
+    def to_xml(self) -> str:
+        """Create the XML of the shared strings part.
+
+        Returns:
+            str: content of xl/sharedStrings.xml
+        """
+        items = [
+            '<si><t xml:space="preserve">' + escape(value) + '</t></si>'
+            if value != value.strip()
+            else '<si><t>' + escape(value) + '</t></si>'
+            for value in self.index
+        ]
+        return (
+            XML_DECLARATION
+            + f'<sst xmlns="{MAIN_NS}" uniqueCount="{len(items)}">'
+            + ''.join(items)
+            + '</sst>'
+        )
+
+
+class StyleTable:
+    """Table of the cell styles used in all sheets of a workbook.
+
+    As in openpyxl workbooks, fonts, fills, borders, alignments, protections, and number
+    formats are saved once and each cell style (xf) refers to them by their index.
+    The first style is openpyxl's default style.
+    """
+
+    def __init__(self) -> None:
+        """Create a table with openpyxl's default style."""
+        self.fonts: IndexedList[Font] = IndexedList([DEFAULT_FONT])
+        self.fills: IndexedList[Fill] = IndexedList(
+            [DEFAULT_EMPTY_FILL, DEFAULT_GRAY_FILL]
+        )
+        self.borders: IndexedList[Border] = IndexedList([DEFAULT_BORDER])
+        self.alignments: IndexedList[Alignment] = IndexedList([Alignment()])
+        self.protections: IndexedList[Protection] = IndexedList([Protection()])
+        self.number_formats: IndexedList[str] = IndexedList()
+        self.xfs: IndexedList[tuple[int, int, int, int, int, int]] = IndexedList(
+            [(0, 0, 0, 0, 0, 0)]
+        )
+        self.differential_styles = DifferentialStyleList()
+
+    def add(self, style: StyledCell, number_format: str = 'General') -> int:
+        """Add the style of a cell to the table.
+
+        Args:
+            style (StyledCell): cell with the final style
+            number_format (str, optional): number format of the cell's value. Used if no
+                style layer sets a number format. Defaults to 'General'.
+
+        Returns:
+            int: index of the cell style (the s attribute of cells)
+        """
+        return self.add_objects(*style.style_objects(number_format=number_format))
+
+    def add_objects(
+        self,
+        font: Font,
+        fill: Fill,
+        border: Border,
+        alignment: Alignment,
+        protection: Protection,
+        number_format: str,
+    ) -> int:
+        """Add a cell style given by its style objects to the table.
+
+        Args:
+            font (Font): font of the cell
+            fill (Fill): fill of the cell
+            border (Border): border of the cell
+            alignment (Alignment): alignment of the cell
+            protection (Protection): protection of the cell
+            number_format (str): number format of the cell
+
+        Returns:
+            int: index of the cell style (the s attribute of cells)
+        """
+        if number_format in BUILTIN_FORMATS_REVERSE:
+            number_format_id = BUILTIN_FORMATS_REVERSE[number_format]
+        else:
+            number_format_id = (
+                self.number_formats.add(number_format) + BUILTIN_FORMATS_MAX_SIZE
+            )
+        return int(
+            self.xfs.add(
+                (
+                    number_format_id,
+                    self.fonts.add(font),
+                    self.fills.add(fill),
+                    self.borders.add(border),
+                    self.alignments.add(alignment),
+                    self.protections.add(protection),
+                )
+            )
+        )
+
+    def cell_styles(
+        self,
+    ) -> list[tuple[Font, Fill, Border, Alignment, Protection, str]]:
+        """List the style objects of all cell styles in the table.
+
+        Returns:
+            list[tuple[Font, Fill, Border, Alignment, Protection, str]]: the arguments of
+                add_objects for each cell style in the order of their indices
+        """
+        styles = []
+        for number_format, font, fill, border, alignment, protection in self.xfs:
+            styles.append(
+                (
+                    self.fonts[font],
+                    self.fills[fill],
+                    self.borders[border],
+                    self.alignments[alignment],
+                    self.protections[protection],
+                    BUILTIN_FORMATS[number_format]
+                    if number_format < BUILTIN_FORMATS_MAX_SIZE
+                    else self.number_formats[number_format - BUILTIN_FORMATS_MAX_SIZE],
+                )
+            )
+        return styles
+
+    def add_rule(self, rule: Rule) -> None:
+        """Add the differential style of a conditional formatting rule to the table.
+
+        Args:
+            rule (Rule): rule; its dxfId is set to the index of its style
+        """
+        if rule.dxf and rule.dxf != DifferentialStyle():
+            rule.dxfId = self.differential_styles.add(rule.dxf)
+
+    def to_xml(self) -> str:
+        """Create the XML of the styles part.
+
+        Returns:
+            str: content of xl/styles.xml
+        """
+        stylesheet = Stylesheet()
+        stylesheet.fonts = list(self.fonts)
+        stylesheet.fills = list(self.fills)
+        stylesheet.borders = list(self.borders)
+        stylesheet.dxfs = self.differential_styles.styles
+        stylesheet.numFmts.numFmt = [
+            NumberFormat(index, code)
+            for index, code in enumerate(self.number_formats, BUILTIN_FORMATS_MAX_SIZE)
+        ]
+        xfs = []
+        for number_format, font, fill, border, alignment, protection in self.xfs:
+            xfs.append(
+                CellStyle(
+                    numFmtId=number_format,
+                    fontId=font,
+                    fillId=fill,
+                    borderId=border,
+                    xfId=0,
+                    alignment=self.alignments[alignment] if alignment else None,
+                    protection=self.protections[protection] if protection else None,
+                )
+            )
+        stylesheet.cellXfs = CellStyleList(xf=xfs)
+        normal = NamedStyle(name='Normal', builtinId=0)
+        stylesheet.cellStyles.cellStyle.append(normal.as_name())
+        stylesheet.cellStyleXfs.xf.append(normal.as_xf())
+        # openpyxl's tostring returns bytes
+        xml = cast(bytes, tostring(stylesheet.to_tree()))
+        return XML_DECLARATION + xml.decode('utf-8')
+
+
+class NativeWorkbook:
+    """Workbook of the native xlsx writer.
+
+    In contrast to openpyxl workbooks, the cells of a NativeWorkbook are not kept as
+    objects. The XML of each sheet is written to a temporary file when a table is added
+    (see tbl_native_excel). Sheets can therefore not be changed after they were created.
+
+    Example:
+        >>> import io
+        >>> import polars as pl
+        >>> from tablespam import TableSpam
+        >>> tbl = TableSpam(data=pl.DataFrame({'a': ['x'], 'b': [1.5]}), formula='a ~ b')
+        >>> wb = tbl.as_excel(backend='native')
+        >>> tbl.as_excel(workbook=wb, sheet='Copy', backend='native').sheetnames
+        ['Table', 'Copy']
+        >>> wb.save(io.BytesIO())  # or wb.save('tablespam_table.xlsx')
+    """
+
+    def __init__(self) -> None:
+        """Create a workbook without sheets."""
+        self.strings = SharedStrings()
+        self.styles = StyleTable()
+        self.sheets: list[tuple[str, IO[bytes]]] = []
+        # The temporary files are closed (and thereby deleted) with the workbook
+        self.close = weakref.finalize(self, close_sheets, self.sheets)
+
+    @property
+    def sheetnames(self) -> list[str]:
+        """Names of the sheets in the order in which they were created."""
+        return [title for title, _ in self.sheets]
+
+    def create_sheet(self, title: str) -> IO[bytes]:
+        """Create a new sheet.
+
+        Args:
+            title (str): name of the sheet
+
+        Raises:
+            ValueError: Error if the name is not a valid sheet name or if the sheet already exists.
+
+        Returns:
+            IO[bytes]: temporary file to which the XML of the sheet is written
+        """
+        check_sheet_title(title=title, sheetnames=self.sheetnames)
+        file = tempfile.TemporaryFile()
+        self.sheets.append((title, file))
+        return file
+
+    def save(
+        self, file: str | os.PathLike[str] | BinaryIO, compresslevel: int = 1
+    ) -> None:
+        """Save the workbook as xlsx file.
+
+        Args:
+            file (str | os.PathLike[str] | BinaryIO): path of the file or an open binary stream
+            compresslevel (int, optional): zlib compression level from 0 (no compression) to 9.
+                Compressing the sheets takes most of the time when saving; the default level
+                is about three times faster than zlib's default at slightly larger files. Defaults to 1.
+
+        Raises:
+            ValueError: Error if the workbook has no sheets.
+        """
+        if not self.sheets:
+            # Excel does not open workbooks without sheets
+            raise ValueError('Add at least one table before saving the workbook.')
+        with open_archive(file=file, compresslevel=compresslevel) as archive:
+            write_package(archive=archive, sheetnames=self.sheetnames)
+            for index, (_, sheet) in enumerate(self.sheets, 1):
+                copy_part(
+                    archive=archive,
+                    name=f'xl/worksheets/sheet{index}.xml',
+                    source=sheet,
+                )
+            self.write_shared_parts(archive)
+
+    def write_shared_parts(self, archive: zipfile.ZipFile) -> None:
+        """Write the shared strings and styles of all sheets to an xlsx file.
+
+        The parts must be written after the XML of all sheets was created.
+
+        Args:
+            archive (zipfile.ZipFile): zip archive of the xlsx file
+        """
+        archive.writestr('xl/sharedStrings.xml', self.strings.to_xml())
+        archive.writestr('xl/styles.xml', self.styles.to_xml())
+
+
+def check_sheet_title(title: str, sheetnames: list[str]) -> None:
+    """Check that a sheet name can be used in a workbook.
+
+    Args:
+        title (str): name of the new sheet
+        sheetnames (list[str]): names of the existing sheets
+
+    Raises:
+        ValueError: Error if the name is not a valid sheet name or if the sheet already exists.
+    """
+    if not 0 < len(title) <= 31 or INVALID_TITLE_RE.search(title):
+        raise ValueError(
+            f'Invalid sheet name {title}. Sheet names must have 1 to 31 characters and must not contain \\*?:/[].'
+        )
+    if title.lower() in [name.lower() for name in sheetnames]:
+        raise ValueError(f'The sheet {title} already exists.')
+
+
+def open_archive(
+    file: str | os.PathLike[str] | BinaryIO, compresslevel: int
+) -> zipfile.ZipFile:
+    """Open the zip archive of a new xlsx file.
+
+    Args:
+        file (str | os.PathLike[str] | BinaryIO): path of the file or an open binary stream.
+            The stream does not have to be seekable (e.g., the body of an HTTP response).
+        compresslevel (int): zlib compression level from 0 (no compression) to 9.
+
+    Returns:
+        zipfile.ZipFile: archive opened for writing
+    """
+    return zipfile.ZipFile(
+        file, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=compresslevel
+    )
+
+
+def copy_part(archive: zipfile.ZipFile, name: str, source: IO[bytes]) -> None:
+    """Copy a part of an xlsx file from a file to the archive.
+
+    The size of the part is known, so ZIP64 extensions are only used for parts that
+    are too large for a regular zip entry (with the same margin as zipfile's writestr).
+
+    Args:
+        archive (zipfile.ZipFile): zip archive of the xlsx file
+        name (str): name of the part in the archive
+        source (IO[bytes]): file with the content of the part
+    """
+    size = os.fstat(source.fileno()).st_size
+    source.seek(0)
+    with archive.open(name, 'w', force_zip64=size * 1.05 > zipfile.ZIP64_LIMIT) as part:
+        shutil.copyfileobj(source, part)
+
+
+def close_sheets(sheets: list[tuple[str, IO[bytes]]]) -> None:
+    """Close the temporary files of the sheets of a workbook.
+
+    Args:
+        sheets (list[tuple[str, IO[bytes]]]): names and files of the sheets
+    """
+    for _, file in sheets:
+        file.close()
+
+
+def write_package(archive: zipfile.ZipFile, sheetnames: list[str]) -> None:
+    """Write the parts of an xlsx file that connect the sheets, strings, and styles.
+
+    Args:
+        archive (zipfile.ZipFile): zip archive of the xlsx file
+        sheetnames (list[str]): names of the sheets. The XML of the i-th sheet must be
+            saved as xl/worksheets/sheet{i}.xml (starting at 1).
+    """
+    sheet_overrides = ''.join(
+        f'<Override PartName="/xl/worksheets/sheet{index}.xml" '
+        f'ContentType="{CONTENT_TYPE}.spreadsheetml.worksheet+xml"/>'
+        for index in range(1, len(sheetnames) + 1)
+    )
+    archive.writestr(
+        '[Content_Types].xml',
+        XML_DECLARATION
+        + '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        + '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        + '<Default Extension="xml" ContentType="application/xml"/>'
+        + '<Override PartName="/xl/workbook.xml" '
+        + f'ContentType="{CONTENT_TYPE}.spreadsheetml.sheet.main+xml"/>'
+        + sheet_overrides
+        + '<Override PartName="/xl/theme/theme1.xml" '
+        + f'ContentType="{CONTENT_TYPE}.theme+xml"/>'
+        + '<Override PartName="/xl/styles.xml" '
+        + f'ContentType="{CONTENT_TYPE}.spreadsheetml.styles+xml"/>'
+        + '<Override PartName="/xl/sharedStrings.xml" '
+        + f'ContentType="{CONTENT_TYPE}.spreadsheetml.sharedStrings+xml"/>'
+        + '</Types>',
+    )
+    archive.writestr(
+        '_rels/.rels',
+        XML_DECLARATION
+        + f'<Relationships xmlns="{PACKAGE_REL_NS}">'
+        + f'<Relationship Id="rId1" Type="{REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+        + '</Relationships>',
+    )
+
+    sheets = ''.join(
+        f'<sheet name={quoteattr(title)} sheetId="{index}" r:id="rId{index}"/>'
+        for index, title in enumerate(sheetnames, 1)
+    )
+    archive.writestr(
+        'xl/workbook.xml',
+        XML_DECLARATION
+        + f'<workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">'
+        + '<bookViews><workbookView activeTab="0"/></bookViews>'
+        + f'<sheets>{sheets}</sheets>'
+        + '</workbook>',
+    )
+
+    relationships = [
+        (f'{REL_NS}/worksheet', f'worksheets/sheet{index}.xml')
+        for index in range(1, len(sheetnames) + 1)
+    ] + [
+        (f'{REL_NS}/styles', 'styles.xml'),
+        (f'{REL_NS}/theme', 'theme/theme1.xml'),
+        (f'{REL_NS}/sharedStrings', 'sharedStrings.xml'),
+    ]
+    archive.writestr(
+        'xl/_rels/workbook.xml.rels',
+        XML_DECLARATION
+        + f'<Relationships xmlns="{PACKAGE_REL_NS}">'
+        + ''.join(
+            f'<Relationship Id="rId{index}" Type="{kind}" Target="{target}"/>'
+            for index, (kind, target) in enumerate(relationships, 1)
+        )
+        + '</Relationships>',
+    )
+    archive.writestr('xl/theme/theme1.xml', theme_xml)
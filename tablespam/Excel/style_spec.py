@@ -0,0 +1,277 @@
+"""Declarative styles for tables exported to excel.
+
+A StyleSpec describes the font, fill, border, alignment, and number format of a cell.
+Specs are immutable and hashable. All cells styled with the same spec share the same
+openpyxl style objects, which are only created once per distinct spec. In contrast
+to style functions, specs can be pickled (e.g., to send them to another process).
+
+A StyleSpec can be used wherever tablespam expects a style function.
+"""
+
+from __future__ import annotations
+from dataclasses import astuple, dataclass
+from functools import cache
+from typing import Any, Literal, cast
+
+from openpyxl.cell.cell import Cell
+from openpyxl.styles import Font, PatternFill
+from openpyxl.styles.alignment import Alignment
+from openpyxl.styles.borders import Border, Side
+
+BorderStyle = Literal[
+    'dashDot',
+    'dashDotDot',
+    'dashed',
+    'dotted',
+    'double',
+    'hair',
+    'medium',
+    'mediumDashDot',
+    'mediumDashDotDot',
+    'mediumDashed',
+    'slantDashDot',
+    'thick',
+    'thin',
+    'none',
+]
+
+
+@dataclass(frozen=True)
+class FontSpec:
+    """Font of a cell.
+
+    Fields that are None use openpyxl's defaults.
+
+    Args:
+        name (str | None): name of the font (e.g., 'Calibri')
+        size (float | None): size of the font
+        bold (bool | None): should the text be bold?
+        italic (bool | None): should the text be italic?
+        underline (str | None): underline of the text (e.g., 'single' or 'double')
+        color (str | None): hex code of the text color
+    """
+
+    name: str | None = None
+    size: float | None = None
+    bold: bool | None = None
+    italic: bool | None = None
+    underline: (
+        Literal['single', 'double', 'singleAccounting', 'doubleAccounting'] | None
+    ) = None
+    color: str | None = None
+
+
+@dataclass(frozen=True)
+class BorderSpec:
+    """Borders of a cell.
+
+    By default, sides that are None retain the existing border of the cell.
+
+    Args:
+        left (BorderStyle | None): style (thin, thick, ...) of the left border
+        right (BorderStyle | None): style (thin, thick, ...) of the right border
+        top (BorderStyle | None): style (thin, thick, ...) of the top border
+        bottom (BorderStyle | None): style (thin, thick, ...) of the bottom border
+        color (str): hex code of the border color
+        retain (bool): Should sides that are None retain the existing border of the cell?
+            If False, the existing border is replaced.
+    """
+
+    left: BorderStyle | None = None
+    right: BorderStyle | None = None
+    top: BorderStyle | None = None
+    bottom: BorderStyle | None = None
+    color: str = 'FF000000'
+    retain: bool = True
+
+
+@dataclass(frozen=True)
+class AlignmentSpec:
+    """Alignment of a cell.
+
+    Fields that are None use openpyxl's defaults.
+
+    Args:
+        horizontal (str | None): horizontal alignment (e.g., 'left', 'center', or 'right')
+        vertical (str | None): vertical alignment (e.g., 'top', 'center', or 'bottom')
+        wrap_text (bool | None): should the text be wrapped?
+    """
+
+    horizontal: (
+        Literal[
+            'general',
+            'left',
+            'center',
+            'right',
+            'fill',
+            'justify',
+            'centerContinuous',
+            'distributed',
+        ]
+        | None
+    ) = None
+    vertical: Literal['top', 'center', 'bottom', 'justify', 'distributed'] | None = None
+    wrap_text: bool | None = None
+
+
+@dataclass(frozen=True)
+class StyleSpec:
+    """Declarative style of a cell.
+
+    Only the parts of the style that are not None are changed when the spec is
+    applied to a cell. The fill is a hex color code that is used as solid background.
+
+    Args:
+        font (FontSpec | None): font of the cell
+        fill (str | None): hex code of the background color
+        border (BorderSpec | None): borders of the cell
+        alignment (AlignmentSpec | None): alignment of the cell
+        number_format (str | None): number format of the cell (e.g., '0.00')
+
+    Example:
+        >>> from tablespam.Excel.style_spec import StyleSpec, FontSpec
+        >>> from tablespam.Excel.xlsx_styles import CellStyle
+        >>> style = CellStyle(
+        ...     rows=[1, 2],
+        ...     cols=['column_1'],
+        ...     style=StyleSpec(font=FontSpec(bold=True), number_format='0.00'),
+        ... )
+    """
+
+    font: FontSpec | None = None
+    fill: str | None = None
+    border: BorderSpec | None = None
+    alignment: AlignmentSpec | None = None
+    number_format: str | None = None
+
+    def __hash__(self) -> int:
+        """Hash of the spec.
+
+        Specs are hashed for every cell they are applied to when the styles of
+        a table are composed. The hash is therefore only computed once.
+
+        Returns:
+            int: hash of the spec
+        """
+        try:
+            return cast(int, self.__dict__['_hash'])
+        except KeyError:
+            value = hash(astuple(self))
+            object.__setattr__(self, '_hash', value)
+            return value
+
+    def __getstate__(self) -> dict[str, Any]:
+        """State of the spec used when pickling.
+
+        String hashes differ between processes, so the cached hash is not pickled.
+
+        Returns:
+            dict[str, Any]: fields of the spec
+        """
+        return {key: val for key, val in self.__dict__.items() if key != '_hash'}
+
+    def __call__(self, cell: Cell) -> None:
+        """Apply the style to a cell.
+
+        Args:
+            cell (Cell): Cell reference to which the style is applied
+        """
+        if self.font is not None:
+            cell.font = openpyxl_font(self.font)
+        if self.fill is not None:
+            cell.fill = openpyxl_fill(self.fill)
+        if self.border is not None:
+            cell.border = openpyxl_border(
+                self.border, cast(Border, cell.border) if self.border.retain else None
+            )
+        if self.alignment is not None:
+            cell.alignment = openpyxl_alignment(self.alignment)
+        if self.number_format is not None:
+            cell.number_format = self.number_format
+
+
+@cache
+def openpyxl_font(spec: FontSpec) -> Font:
+    """Translate a font spec to the shared openpyxl font.
+
+    Args:
+        spec (FontSpec): font spec
+
+    Returns:
+        Font: openpyxl font. Must not be changed.
+    """
+    return Font(
+        name=spec.name,
+        size=spec.size,
+        bold=spec.bold,
+        italic=spec.italic,
+        underline=spec.underline,
+        color=spec.color,
+    )
+
+
+@cache
+def openpyxl_fill(color: str) -> PatternFill:
+    """Translate a fill color to the shared openpyxl fill.
+
+    Args:
+        color (str): hex code of the background color
+
+    Returns:
+        PatternFill: solid openpyxl fill. Must not be changed.
+    """
+    return PatternFill(start_color=color, fill_type='solid')
+
+
+def openpyxl_border(spec: BorderSpec, current: Border | None) -> Border:
+    """Translate a border spec to an openpyxl border.
+
+    Args:
+        spec (BorderSpec): border spec
+        current (Border | None): existing border of the cell. Sides that are None in the
+            spec are taken from this border.
+
+    Returns:
+        Border: openpyxl border
+    """
+
+    def side(name: str) -> Side | None:
+        style = getattr(spec, name)
+        if style:
+            return openpyxl_side(style, spec.color)
+        if current is not None:
+            return cast(Side | None, getattr(current, name))
+        return None
+
+    return Border(
+        left=side('left'), right=side('right'), top=side('top'), bottom=side('bottom')
+    )
+
+
+@cache
+def openpyxl_side(style: BorderStyle, color: str) -> Side:
+    """Translate a border style to the shared openpyxl side.
+
+    Args:
+        style (BorderStyle): style (thin, thick, ...) of the border
+        color (str): hex code of the border color
+
+    Returns:
+        Side: openpyxl side. Must not be changed.
+    """
+    return Side(style=style, color=color)
+
+
+@cache
+def openpyxl_alignment(spec: AlignmentSpec) -> Alignment:
+    """Translate an alignment spec to the shared openpyxl alignment.
+
+    Args:
+        spec (AlignmentSpec): alignment spec
+
+    Returns:
+        Alignment: openpyxl alignment. Must not be changed.
+    """
+    return Alignment(
+        horizontal=spec.horizontal, vertical=spec.vertical, wrap_text=spec.wrap_text
+    )
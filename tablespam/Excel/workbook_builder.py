@@ -0,0 +1,346 @@
+"""Build workbooks with many tables by rendering the sheets in parallel.
+
+Each sheet is rendered by a worker process with the native xlsx writer (see
+native_excel.py). The worker writes the XML of its sheet to a temporary file and
+refers to strings and styles by their index in its own shared strings and styles.
+Once all sheets are rendered, the strings and styles of all sheets are merged into
+those of the workbook and the workers renumber the indices in their sheets.
+Finally, the sheets are packed into a single xlsx file.
+"""
+
+from __future__ import annotations
+import os
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import get_context
+from typing import TYPE_CHECKING, BinaryIO, Literal
+
+import polars as pl
+from openpyxl.styles.alignment import Alignment
+from openpyxl.styles.borders import Border
+from openpyxl.styles.differential import DifferentialStyle
+from openpyxl.styles.fills import Fill
+from openpyxl.styles.fonts import Font
+from openpyxl.styles.protection import Protection
+
+from tablespam.Excel.xlsx_styles import XlsxStyles
+from tablespam.Excel._as_excel.native_excel import write_sheet
+from tablespam.Excel._as_excel.overflow import sheet_parts
+from tablespam.Excel._as_excel.xlsx_writer import (
+    NativeWorkbook,
+    check_sheet_title,
+    copy_part,
+    open_archive,
+    write_package,
+)
+
+if TYPE_CHECKING:
+    from tablespam.TableSpam import TableSpam
+
+# The XML of a sheet is renumbered in blocks of about this many bytes
+BLOCK_SIZE = 1 << 24
+
+
+@dataclass
+class SheetJob:
+    """A table that is written to its own sheet.
+
+    Attributes:
+        tbl (TableSpam): TableSpam table created with TableSpam
+        sheet (str): name of the sheet
+        start_row (int): index of the row at which the table should start.
+        start_col (int): index of the column at which the table should start.
+        styles (XlsxStyles): Styles that should be applied to the table.
+    """
+
+    tbl: TableSpam
+    sheet: str
+    start_row: int
+    start_col: int
+    styles: XlsxStyles
+
+
+@dataclass
+class RenderedSheet:
+    """Strings and styles used in a rendered sheet.
+
+    Attributes:
+        strings (list[str]): strings in the order of their index in the sheet
+        cell_styles (list[tuple[Font, Fill, Border, Alignment, Protection, str]]): style
+            objects of the cell styles in the order of their index in the sheet
+        differential_styles (list[DifferentialStyle]): styles of the conditional
+            formatting rules in the order of their index in the sheet
+    """
+
+    strings: list[str]
+    cell_styles: list[tuple[Font, Fill, Border, Alignment, Protection, str]]
+    differential_styles: list[DifferentialStyle]
+
+
+class WorkbookBuilder:
+    """Collects tables and writes each of them to a sheet of a single xlsx file.
+
+    The sheets are rendered in parallel in a process pool. Tables and styles are
+    therefore sent to other processes and must be picklable: Use StyleSpecs instead
+    of style functions (lambdas cannot be pickled) or set max_workers=1 to render
+    all sheets in the current process.
+
+    Example:
+        >>> import io
+        >>> import polars as pl
+        >>> from tablespam import TableSpam, WorkbookBuilder
+        >>> builder = WorkbookBuilder()
+        >>> for group, data in pl.DataFrame({'g': ['a', 'b'], 'x': [1, 2]}).group_by(
+        ...     'g', maintain_order=True
+        ... ):
+        ...     builder.add(TableSpam(data=data, formula='g ~ x'), sheet=f'Group {group[0]}')
+        >>> builder.sheetnames
+        ['Group a', 'Group b']
+        >>> builder.save(io.BytesIO(), max_workers=1)  # or builder.save('tables.xlsx')
+    """
+
+    def __init__(self) -> None:
+        """Create a builder without tables."""
+        self.jobs: list[SheetJob] = []
+
+    @property
+    def sheetnames(self) -> list[str]:
+        """Names of the sheets in the order in which the tables were added."""
+        return [job.sheet for job in self.jobs]
+
+    def add(
+        self,
+        tbl: TableSpam,
+        sheet: str,
+        start_row: int = 1,
+        start_col: int = 1,
+        styles: XlsxStyles | None = None,
+        overflow: Literal['split', 'error'] = 'split',
+    ) -> None:
+        """Add a table to a new sheet.
+
+        Args:
+            tbl (TableSpam): TableSpam table created with TableSpam
+            sheet (str): name of the sheet that is created for the table.
+            start_row (int, optional): index of the row at which the table should start. Defaults to 1.
+            start_col (int, optional): index of the column at which the table should start. Defaults to 1.
+            styles (XlsxStyles | None, optional): Styles that should be applied to the table. Defaults to None.
+            overflow (Literal['split', 'error'], optional): 'split' continues tables with more rows than
+                an Excel sheet on additional sheets, 'error' raises an error. Defaults to 'split'.
+
+        Raises:
+            ValueError: Error if the name is not a valid sheet name or if the sheet already exists.
+        """
+        parts = sheet_parts(
+            tbl=tbl,
+            sheet=sheet,
+            start_row=start_row,
+            start_col=start_col,
+            styles=XlsxStyles() if styles is None else styles,
+            overflow=overflow,
+        )
+        sheetnames = self.sheetnames
+        for part_sheet, _, _ in parts:
+            check_sheet_title(title=part_sheet, sheetnames=sheetnames)
+            sheetnames.append(part_sheet)
+        self.jobs.extend(
+            SheetJob(
+                tbl=part,
+                sheet=part_sheet,
+                start_row=start_row,
+                start_col=start_col,
+                styles=part_styles,
+            )
+            for part_sheet, part, part_styles in parts
+        )
+
+    def save(
+        self,
+        file: str | os.PathLike[str] | BinaryIO,
+        max_workers: int | None = None,
+        compresslevel: int = 1,
+    ) -> None:
+        """Render all sheets and save the workbook as xlsx file.
+
+        Args:
+            file (str | os.PathLike[str] | BinaryIO): path of the file or an open binary stream
+            max_workers (int | None, optional): number of worker processes. 1 renders all
+                sheets in the current process. Defaults to None, which uses one process per CPU
+                (but not more than there are sheets).
+            compresslevel (int, optional): zlib compression level from 0 (no compression) to 9. Defaults to 1.
+
+        Raises:
+            ValueError: Error if no table was added.
+        """
+        if not self.jobs:
+            raise ValueError('Add at least one table before saving the workbook.')
+        if max_workers is None:
+            max_workers = min(len(self.jobs), os.cpu_count() or 1)
+
+        with tempfile.TemporaryDirectory() as directory:
+            files = [
+                os.path.join(directory, f'sheet{index}.xml')
+                for index in range(1, len(self.jobs) + 1)
+            ]
+            if max_workers == 1:
+                workbook = render_workbook(executor=None, jobs=self.jobs, files=files)
+            else:
+                # polars is multithreaded and must not be forked
+                with ProcessPoolExecutor(
+                    max_workers=max_workers, mp_context=get_context('spawn')
+                ) as executor:
+                    workbook = render_workbook(
+                        executor=executor, jobs=self.jobs, files=files
+                    )
+
+            with open_archive(file=file, compresslevel=compresslevel) as archive:
+                write_package(archive=archive, sheetnames=self.sheetnames)
+                for index, sheet_file in enumerate(files, 1):
+                    with open(sheet_file, 'rb') as sheet:
+                        copy_part(
+                            archive=archive,
+                            name=f'xl/worksheets/sheet{index}.xml',
+                            source=sheet,
+                        )
+                workbook.write_shared_parts(archive)
+
+
+def render_workbook(
+    executor: Executor | None, jobs: list[SheetJob], files: list[str]
+) -> NativeWorkbook:
+    """Render all sheets and merge their strings and styles.
+
+    Args:
+        executor (Executor | None): executor that renders the sheets; None renders them
+            in the current process.
+        jobs (list[SheetJob]): tables and their sheets
+        files (list[str]): files to which the XML of each sheet is written
+
+    Returns:
+        NativeWorkbook: workbook with the merged strings and styles of all sheets.
+            The sheets themselves are only saved in the files.
+    """
+    selected = [index == 0 for index in range(len(jobs))]
+    if executor is None:
+        rendered = list(map(render_sheet, jobs, files, selected))
+    else:
+        rendered = list(executor.map(render_sheet, jobs, files, selected))
+
+    workbook = NativeWorkbook()
+    string_maps = []
+    style_maps = []
+    differential_style_maps = []
+    for sheet in rendered:
+        string_maps.append([workbook.strings.add(value) for value in sheet.strings])
+        style_maps.append(
+            [workbook.styles.add_objects(*style) for style in sheet.cell_styles]
+        )
+        differential_style_maps.append(
+            [
+                workbook.styles.differential_styles.add(style)
+                for style in sheet.differential_styles
+            ]
+        )
+
+    # Sheets in which all indices stay the same are not rewritten
+    renumbered = [
+        (file, strings, styles, differential_styles)
+        for file, strings, styles, differential_styles in zip(
+            files, string_maps, style_maps, differential_style_maps
+        )
+        if any(
+            index != new_index
+            for index_map in [strings, styles, differential_styles]
+            for index, new_index in enumerate(index_map)
+        )
+    ]
+    if renumbered:
+        if executor is None:
+            list(map(renumber_sheet, *zip(*renumbered)))
+        else:
+            list(executor.map(renumber_sheet, *zip(*renumbered)))
+    return workbook
+
+
+def render_sheet(job: SheetJob, file: str, selected: bool) -> RenderedSheet:
+    """Write the XML of a single sheet to a file.
+
+    Args:
+        job (SheetJob): table and its sheet
+        file (str): file to which the XML is written
+        selected (bool): Is the sheet selected when the workbook is opened?
+
+    Returns:
+        RenderedSheet: strings and styles that are used in the sheet
+    """
+    workbook = NativeWorkbook()
+    with open(file, 'wb') as stream:
+        write_sheet(
+            tbl=job.tbl,
+            file=stream,
+            workbook=workbook,
+            start_row=job.start_row,
+            start_col=job.start_col,
+            styles=job.styles,
+            selected=selected,
+        )
+    return RenderedSheet(
+        strings=list(workbook.strings.index),
+        cell_styles=workbook.styles.cell_styles(),
+        differential_styles=workbook.styles.differential_styles.styles,
+    )
+
+
+def renumber_sheet(
+    file: str,
+    strings: list[int],
+    styles: list[int],
+    differential_styles: list[int],
+) -> None:
+    """Replace the indices of strings and styles in the XML of a sheet.
+
+    The indices are replaced as literal attributes and values (e.g., ' s="3"'), so
+    all indices can be replaced in a single pass over the XML (see polars'
+    str.replace_many). The XML is processed in blocks of complete rows.
+
+    Args:
+        file (str): file with the XML of the sheet
+        strings (list[int]): new index of each string
+        styles (list[int]): new index of each cell style
+        differential_styles (list[int]): new index of each differential style
+    """
+    patterns: list[str] = []
+    replacements: list[str] = []
+    for template, index_map in [
+        (' s="{}"', styles),
+        ('t="s"><v>{}</v>', strings),
+        ('dxfId="{}"', differential_styles),
+    ]:
+        for index, new_index in enumerate(index_map):
+            if index != new_index:
+                patterns.append(template.format(index))
+                replacements.append(template.format(new_index))
+
+    def renumber(rows: list[bytes]) -> list[bytes]:
+        return (
+            pl.Series(rows, dtype=pl.Binary)
+            .cast(pl.String)
+            .str.replace_many(patterns, replacements)
+            .cast(pl.Binary)
+            .to_list()
+        )
+
+    with open(file, 'rb') as source, open(f'{file}.tmp', 'wb') as target:
+        rest = b''
+        while True:
+            block = source.read(BLOCK_SIZE)
+            rows = (rest + block).split(b'</row>')
+            if not block:
+                # the end of the sheet after the last row
+                target.write(b'</row>'.join(renumber(rows)))
+                break
+            rest = rows.pop()
+            if rows:
+                target.write(b'</row>'.join(renumber(rows)) + b'</row>')
+    os.replace(f'{file}.tmp', file)
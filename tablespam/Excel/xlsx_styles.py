@@ -1,13 +1,12 @@
 """Styling options for tables exported to excel."""
 
 from __future__ import annotations
-from typing import Callable
+from typing import Callable, Literal
 import tablespam.Excel._as_excel.styles as sty
+from tablespam.Excel.style_spec import StyleSpec, FontSpec, BorderSpec
 from dataclasses import dataclass, field
-import openpyxl as opy
 from openpyxl.cell.cell import Cell
 import polars as pl
-from functools import partial
 
 
 @dataclass
@@ -61,23 +60,94 @@ class CellStyle:
     style: Callable[[Cell], None]
 
 
+ConditionOperator = Literal['>', '>=', '<', '<=', '==', '!=']
+
+
+@dataclass
+class ConditionalStyle:
+    """Conditional styles are applied to all data cells that fulfill a condition.
+
+    In contrast to CellStyle, conditional styles are not applied to each cell individually.
+    Instead, they are translated to conditional formatting rules of Excel. The number of
+    rules in the workbook therefore depends on the number of conditional styles and not
+    on the number of cells that are styled (but see below for the size of each rule).
+
+    The condition is either a polars expression or a threshold:
+
+    - A polars expression is evaluated on the data and must return a single boolean value
+      for each row. The style is applied to the cells of all rows where the expression is True.
+      Excel cannot evaluate the expression, so the rule lists the cell ranges of all runs of
+      consecutive rows where it is True. Its size grows with the number of these runs: if
+      every other row matches, the rule has one range per matching row and styled column.
+      For large tables with scattered matches, thresholds result in smaller files.
+    - A threshold is defined by an operator and a value. The style is applied to all cells
+      where the comparison of the cell value with the threshold is True. Thresholds are
+      evaluated by Excel and are therefore also updated when the cells are changed.
+
+    The style must be a StyleSpec. Excel only supports the font (except for its name
+    and size), fill, border, and built-in number formats in conditional formatting.
+    Styles with an alignment or a font name or size raise an error when the table is exported.
+
+    Args:
+        cols (list[str]): names of the columns that should be styled
+        style (StyleSpec): style applied to the cells that fulfill the condition
+        condition (pl.Expr | None): polars expression that returns True for the rows
+            that should be styled
+        operator (ConditionOperator | None): operator used to compare the cell values
+            with the threshold
+        value (float | int | str | None): threshold
+
+    Example:
+        >>> import polars as pl
+        >>> from tablespam.Excel.xlsx_styles import ConditionalStyle
+        >>> from tablespam.Excel.style_spec import StyleSpec, FontSpec
+        >>> # Style based on a polars expression:
+        >>> style = ConditionalStyle(
+        ...     cols=['column_1', 'column_2'],
+        ...     style=StyleSpec(font=FontSpec(bold=True)),
+        ...     condition=pl.col('column_1') >= 100,
+        ... )
+        >>> # Style based on a threshold:
+        >>> style = ConditionalStyle(
+        ...     cols=['column_1'],
+        ...     style=StyleSpec(font=FontSpec(bold=True)),
+        ...     operator='>=',
+        ...     value=100,
+        ... )
+    """
+
+    cols: list[str]
+    style: StyleSpec
+    condition: pl.Expr | None = None
+    operator: ConditionOperator | None = None
+    value: float | int | str | None = None
+
+
+def is_double(x: pl.DataFrame) -> bool:
+    """Check if a single data column is of type double.
+
+    Args:
+        x (pl.DataFrame): data frame with a single column.
+
+    Raises:
+        ValueError: Error if more than one column is passed.
+
+    Returns:
+        bool: True if the column is of type double.
+    """
+    if len(x.columns) != 1:
+        raise ValueError('Multiple columns passed to test.')
+    return all([tp in [pl.Float32, pl.Float64] for tp in x.dtypes])
+
+
 def default_data_styles() -> dict[str, DataStyle]:
     """Defines the default styles that are applied to different data types.
 
     Returns:
         dict[str, DataStyle]: dict with default styles.
     """
-
-    def test_double(x: pl.DataFrame) -> bool:
-        if len(x.columns) != 1:
-            raise ValueError('Multiple columns passed to test.')
-        return all([tp in [pl.Float32, pl.Float64] for tp in x.dtypes])
-
     return {
-        'double': DataStyle(
-            test=test_double,
-            style=lambda c: setattr(c, 'number_format', '0.00'),
-        ),
+        'double': DataStyle(test=is_double, style=StyleSpec(number_format='0.00')),
     }
 
 
@@ -85,8 +155,12 @@ def default_data_styles() -> dict[str, DataStyle]:
 class XlsxStyles:
     """Defines styles for different elements of the table.
 
-    Each style element is a function that takes in a single cell of the openpyxl workbook
-    and apply a style to that cell.
+    Each style element is either a declarative StyleSpec or a function that takes in a
+    single cell of the openpyxl workbook and apply a style to that cell. All default
+    styles are StyleSpecs, which makes XlsxStyles picklable. The styles of a cell are composed once for each
+    distinct combination of StyleSpecs and then copied to all cells with the same
+    combination. Style functions may read the value, row, and column of the cell and are
+    therefore applied to each cell separately, which is slower for large tables.
 
     Args:
         merge_rownames (bool): Should adjacent rows with identical names be merged?
@@ -94,7 +168,8 @@ class XlsxStyles:
         footnote_style (Callable[[Cell], None]): style applied to the table footnote
         data_styles (Callable[[Cell], None]): styles applied to the columns in the data set based on their classes (e.g., numeric, character, etc.). data_styles must be a dict of DataStyle. Note that styles will be applied in the
             order of the list, meaning that a later style may overwrite an earlier style.
-        cell_styles (list[CellStyle]): an optional list with styles for selected cells in the data frame.
+        cell_styles (list[CellStyle | ConditionalStyle]): an optional list with styles for selected cells in the data frame.
+            CellStyles are applied in order. ConditionalStyles take precedence over all other styles in Excel.
         bg_default (Callable[[Cell], None]): default color for the background of the table
         bg_title (Callable[[Cell], None]): background color for the title
         bg_subtitle (Callable[[Cell], None]): background color for the subtitle
@@ -113,6 +188,10 @@ class XlsxStyles:
         cell_rownames (Callable[[Cell], None]): style added to row name cells in the table
         cell_data (Callable[[Cell], None]): style added to data cells in the table
         cell_footnote (Callable[[Cell], None]): style added to footnote cells in the table
+        sparse (bool): Should cells whose style looks like the default style be left
+            unstyled? White background fills are then removed (which shows the gridlines of
+            Excel behind the table) and fonts that only set the default size are replaced by
+            the default font. This results in smaller sheets and styles.
     """
 
     bg_default: Callable[[Cell], None] = field(default=sty.default_bg_style)
@@ -143,7 +222,8 @@ class XlsxStyles:
     footnote_style: Callable[[Cell], None] = field(default=sty.footnote_style)
 
     data_styles: dict[str, DataStyle] = field(default_factory=default_data_styles)
-    cell_styles: None | list[CellStyle] = None
+    cell_styles: None | list[CellStyle | ConditionalStyle] = None
+    sparse: bool = False
 
 
 def style_color(primary_color: str = 'ffffff') -> XlsxStyles:
@@ -173,103 +253,28 @@ def style_color(primary_color: str = 'ffffff') -> XlsxStyles:
     else:
         line_color = primary_color
 
-    def bg_fun(cell: Cell, color: str) -> None:
-        """Default background style.
-
-        Args:
-            cell (Cell): Cell reference to which the style is applied
-            color (str): Color applied to cell
-        """
-        cell.fill = opy.styles.PatternFill(start_color=color, fill_type='solid')
-
-    def vline_color(cell: Cell, color: str) -> None:
-        """Default vertical line style.
-
-        Args:
-            cell (Cell): Cell reference to which the style is applied
-            color (str): Color applied to line
-        """
-        sty.set_border(cell, color=color, left='thin')
-
-    def hline_color(cell: Cell, color: str) -> None:
-        """Default horizontal line style.
-
-        Args:
-            cell (Cell): Cell reference to which the style is applied
-            color (str): Color applied to line
-        """
-        sty.set_border(cell, color=color, top='thin')
-
-    def cell_title_style(cell: Cell, color: str) -> None:
-        """Default title cell style.
-
-        Args:
-            cell (Cell): Cell reference to which the style is applied
-            color (str): Color applied to cell
-        """
-        cell.font = opy.styles.Font(size=14, bold=True, color=color)
-
-    def cell_subtitle_style(cell: Cell, color: str) -> None:
-        """Default subtitle style.
-
-        Args:
-            cell (Cell): Cell reference to which the style is applied
-            color (str): Color applied to cell
-        """
-        cell.font = opy.styles.Font(size=11, bold=True, color=color)
-
-    def cell_header_lhs_style(cell: Cell, color: str) -> None:
-        """Default style applied to left hand side of the table header.
-
-        Args:
-            cell (Cell): Cell reference to which the style is applied
-            color (str): Color applied to cell
-        """
-        cell.font = opy.styles.Font(size=11, bold=True, color=color)
-        cell.border = opy.styles.borders.Border(
-            left=opy.styles.borders.Side(style='thin', color=color),
-            bottom=opy.styles.borders.Side(style='thin', color=color),
-            right=opy.styles.borders.Side(style='thin', color=color),
-        )
-
-    def cell_header_rhs_style(cell: Cell, color: str) -> None:
-        """Default style applied to right hand side of the table header.
-
-        Args:
-            cell (Cell): Cell reference to which the style is applied
-            color (str): Color applied to cell
-        """
-        cell.font = opy.styles.Font(size=11, bold=True, color=color)
-        cell.border = opy.styles.borders.Border(
-            left=opy.styles.borders.Side(style='thin', color=color),
-            bottom=opy.styles.borders.Side(style='thin', color=color),
-            right=opy.styles.borders.Side(style='thin', color=color),
-        )
-
-    def cell_rownames_style(cell: Cell, color: str) -> None:
-        """Default style applied to rowname cells.
-
-        Args:
-            cell (Cell): Cell reference to which the style is applied
-            color (str): Color applied to cell
-        """
-        cell.font = opy.styles.Font(size=11, color=color)
+    header_style = StyleSpec(
+        font=FontSpec(size=11, bold=True, color=text_color),
+        border=BorderSpec(
+            left='thin', bottom='thin', right='thin', color=text_color, retain=False
+        ),
+    )
 
     styles = XlsxStyles(
-        bg_default=partial(bg_fun, color='ffffff'),
-        bg_title=partial(bg_fun, color=primary_color),
-        bg_subtitle=partial(bg_fun, color=primary_color),
-        bg_header_lhs=partial(bg_fun, color=primary_color),
-        bg_header_rhs=partial(bg_fun, color=primary_color),
-        bg_rownames=partial(bg_fun, color=primary_color),
-        bg_data=partial(bg_fun, color='ffffff'),
-        bg_footnote=partial(bg_fun, color='ffffff'),
-        vline=partial(vline_color, color=line_color),
-        hline=partial(hline_color, color=line_color),
-        cell_title=partial(cell_title_style, color=text_color),
-        cell_subtitle=partial(cell_subtitle_style, color=text_color),
-        cell_header_lhs=partial(cell_header_lhs_style, color=text_color),
-        cell_header_rhs=partial(cell_header_rhs_style, color=text_color),
-        cell_rownames=partial(cell_rownames_style, color=text_color),
+        bg_default=StyleSpec(fill='ffffff'),
+        bg_title=StyleSpec(fill=primary_color),
+        bg_subtitle=StyleSpec(fill=primary_color),
+        bg_header_lhs=StyleSpec(fill=primary_color),
+        bg_header_rhs=StyleSpec(fill=primary_color),
+        bg_rownames=StyleSpec(fill=primary_color),
+        bg_data=StyleSpec(fill='ffffff'),
+        bg_footnote=StyleSpec(fill='ffffff'),
+        vline=StyleSpec(border=BorderSpec(left='thin', color=line_color)),
+        hline=StyleSpec(border=BorderSpec(top='thin', color=line_color)),
+        cell_title=StyleSpec(font=FontSpec(size=14, bold=True, color=text_color)),
+        cell_subtitle=StyleSpec(font=FontSpec(size=11, bold=True, color=text_color)),
+        cell_header_lhs=header_style,
+        cell_header_rhs=header_style,
+        cell_rownames=StyleSpec(font=FontSpec(size=11, color=text_color)),
     )
     return styles
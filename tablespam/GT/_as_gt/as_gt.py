@@ -2,12 +2,14 @@ from __future__ import annotations  # noqa: D100
 from typing import TYPE_CHECKING, cast, Protocol, Any
 
 if TYPE_CHECKING:
+    from great_tables._text import BaseText
     from tablespam.TableSpam import TableSpam
-    from tablespam._Formula.Entry import HeaderEntry
+    from tablespam._Formula.Layout import HeaderLayout
 
 import great_tables as gt
 import polars as pl
 from dataclasses import dataclass
+from tablespam._Formula.Layout import LHS, RHS, to_list
 
 
 @dataclass
@@ -64,6 +66,9 @@ def add_gt_spanners(gt_tbl: gt.GT, tbl: TableSpam) -> gt.GT:
 def add_gt_spanner_partial(gt_tbl: gt.GT, tbl_partial: list[FlattenedEntry]) -> gt.GT:
     """Add the Great Table spanners for the left hand side and right hand side of the table.
 
+    The spanners are added level by level and all items that are renamed are labeled
+    with a single call to cols_label.
+
     Args:
         gt_tbl (gt.GT): Great Table without spanners
         tbl_partial (list[FlattenedEntry]): List with FlattenedEntry entries representing the table spanners
@@ -79,59 +84,87 @@ def add_gt_spanner_partial(gt_tbl: gt.GT, tbl_partial: list[FlattenedEntry]) ->
     # The level tells us the order; we have to start with the lowest one
     if tbl_partial is None:
         raise ValueError('tbl_partial should not be None.')
-    levels = list(set([tbl_part.level for tbl_part in tbl_partial]))
-    levels.sort()
+    levels: dict[int, list[FlattenedEntry]] = {}
+    for tbl_part in tbl_partial:
+        levels.setdefault(tbl_part.level, []).append(tbl_part)
+
+    tbl_data = cast(pl.DataFrame, gt_tbl._tbl_data)
+    assert isinstance(gt_tbl._tbl_data, pl.DataFrame)
+    columns = set(tbl_data.columns)
+    positions = column_positions(gt_tbl)
+    renames: dict[str, str | BaseText] = {}
 
     # Next, we iterate over the levels and add them to the gt:
-    for level in levels:
-        for parent in tbl_partial:
-            parent_name = parent.label
-
-            if parent.level == level:
-                tbl_data = cast(pl.DataFrame, gt_tbl._tbl_data)
-                assert isinstance(gt_tbl._tbl_data, pl.DataFrame)
-                item_names = [
-                    item for item in parent.children_items if item in tbl_data.columns
-                ]
-                spanner_ids = [
-                    item[1]
-                    for item in zip(parent.children_items, parent.children_ids)
-                    if item[0] not in tbl_data.columns
-                ]
-
-                # if we are at the base level, we do not add a spanner:
-                if parent_name != '_BASE_LEVEL_':
-                    assert isinstance(parent_name, str)  # required for type checking
-                    assert isinstance(parent.id, str)  # required for type checking
-                    gt_tbl = gt_tbl.tab_spanner(
-                        label=parent_name,
-                        id=parent.id,
-                        columns=item_names,
-                        spanners=spanner_ids,
-                    )
-
-                # If children_items and children don't match, we also need to rename elements
-                needs_renaming = [
-                    item
-                    for item in zip(parent.children_items, parent.children)
-                    if item[0] != item[1]
-                ]
-
-                if len(needs_renaming) > 0:
-                    for rename in needs_renaming:
-                        old_name: str = rename[0]
-                        new_name: str = rename[1]
-                        gt_tbl = gt_tbl.cols_label(cases=None, **{old_name: new_name})
+    for level in sorted(levels):
+        for parent in levels[level]:
+            item_names = [item for item in parent.children_items if item in columns]
+            spanner_ids = [
+                child_id
+                for item, child_id in zip(parent.children_items, parent.children_ids)
+                if item not in columns
+            ]
+
+            # if we are at the base level, we do not add a spanner:
+            if parent.label != '_BASE_LEVEL_':
+                # Spanners that only span columns are gathered by GT (see
+                # gt.GT.tab_spanner). This is skipped if the columns are already next
+                # to each other, as moving the columns takes long for wide tables.
+                gather = not is_contiguous(item_names, positions)
+                gt_tbl = gt_tbl.tab_spanner(
+                    label=parent.label,
+                    id=parent.id,
+                    columns=item_names,
+                    spanners=spanner_ids,
+                    gather=gather,
+                )
+                if gather:
+                    positions = column_positions(gt_tbl)
+
+            # If children_items and children don't match, we also need to rename elements
+            for old_name, new_name in zip(parent.children_items, parent.children):
+                if old_name != new_name:
+                    renames[old_name] = new_name
+
+    if len(renames) > 0:
+        gt_tbl = gt_tbl.cols_label(cases=renames)
 
     return gt_tbl
 
 
+def column_positions(gt_tbl: gt.GT) -> dict[str, int]:
+    """Find the position of each column in a Great Table.
+
+    Args:
+        gt_tbl (gt.GT): Great Table
+
+    Returns:
+        dict[str, int]: position of each column, with the column name as key
+    """
+    return {col.var: index for index, col in enumerate(gt_tbl._boxhead)}
+
+
+def is_contiguous(columns: list[str], positions: dict[str, int]) -> bool:
+    """Check if columns are located next to each other and in order.
+
+    Args:
+        columns (list[str]): names of the columns
+        positions (dict[str, int]): position of each column (see column_positions)
+
+    Returns:
+        bool: True if each column directly follows the previous one
+    """
+    return all(
+        positions[current] == positions[previous] + 1
+        for previous, current in zip(columns, columns[1:])
+    )
+
+
 def flatten_table(tbl: TableSpam) -> dict[str, None | list[FlattenedEntry]]:
     """Translate the highly nested table headers into a flat list.
 
     The table headers in a TableSpam are represented as highly nested elements
-    in the HeaderEntry of the lhs and rhs. This function takes these nested entries
-    and translates them to a list.
+    in the HeaderEntry of the lhs and rhs. This function takes the flat layout
+    of these entries (see TableSpam.layout) and translates it to a list.
 
     Args:
         tbl (TableSpam): Table
@@ -139,57 +172,44 @@ def flatten_table(tbl: TableSpam) -> dict[str, None | list[FlattenedEntry]]:
     Returns:
         dict[str, None | list[FlattenedEntry]]: Dict with flattened entries for lhs and rhs of the header.
     """
-    if tbl.header['lhs'] is not None:
-        flattened_lhs = flatten_table_partial(tbl_partial=tbl.header['lhs'])
+    layout = tbl.layout
+    if layout.has_lhs:
+        flattened_lhs = flatten_table_partial(layout=layout, side=LHS)
     else:
         flattened_lhs = None
 
-    flattened_rhs = flatten_table_partial(tbl_partial=tbl.header['rhs'])
+    flattened_rhs = flatten_table_partial(layout=layout, side=RHS)
 
     return {'flattened_lhs': flattened_lhs, 'flattened_rhs': flattened_rhs}
 
 
-def flatten_table_partial(
-    tbl_partial: HeaderEntry,
-    id: str = '',
-    flattened: None | list[FlattenedEntry] = None,
-) -> None | list[FlattenedEntry]:
-    """Translates the highly nested HeaderEntries into a flat list.
+def flatten_table_partial(layout: HeaderLayout, side: int) -> list[FlattenedEntry]:
+    """Translates the header entries of one side of the table into a flat list.
+
+    Only entries with sub-entries (spanners and the _BASE_LEVEL_) are added to the list.
 
     Args:
-        tbl_partial (HeaderEntry): The current header entry that should be flattened
-        id (str, optional): Each entry is assigned a unique ID. This is necessary for GT, where
-          duplicated names would results in issues. Defaults to "".
-        flattened (None | list[FlattenedEntry], optional): The function is called recursively and fills this list. Defaults to None.
+        layout (HeaderLayout): layout of the table header
+        side (int): LHS or RHS
 
     Returns:
-        None | list[FlattenedEntry]: A list with flattened entries. See FlattenedEntry.
+        list[FlattenedEntry]: A list with flattened entries. See FlattenedEntry.
     """
-    if flattened is None:
-        flattened = []
-
-    if len(tbl_partial.entries) != 0:
-        flattened_entry = FlattenedEntry(
-            label=tbl_partial.name,
-            id=f'{id}_{tbl_partial.name}',
-            level=tbl_partial.level,
-            children=[entry.name for entry in tbl_partial.entries],
-            children_ids=[
-                f'{id}_{tbl_partial.name}_{entry.name}' for entry in tbl_partial.entries
-            ],
-            # For items, tablespan can store a name that is different from the actual item label to allow for renaming
-            children_items=[
-                entry.item_name if entry.item_name is not None else entry.name
-                for entry in tbl_partial.entries
-            ],
-        )
-        flattened.append(flattened_entry)
-
-        for entry in tbl_partial.entries:
-            flattened = flatten_table_partial(
-                tbl_partial=entry, id=f'{id}_{tbl_partial.name}', flattened=flattened
+    flattened = []
+    for index in to_list(layout.spanners(side)):
+        children = layout.children(index)
+        flattened.append(
+            FlattenedEntry(
+                label=layout.names[index],
+                # Ids are unique, which is necessary for GT, where duplicated names would result in issues.
+                id=layout.ids[index],
+                level=int(layout.level[index]),
+                children=to_list(layout.names[children]),
+                children_ids=to_list(layout.ids[children]),
+                # For items, tablespan can store a name that is different from the actual item label to allow for renaming
+                children_items=to_list(layout.item_names[children]),
             )
-
+        )
     return flattened
 
 
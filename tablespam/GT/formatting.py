@@ -1,12 +1,18 @@
 """Formatting functions to use with great_tables."""
-from typing import cast
+from __future__ import annotations
+from typing import TYPE_CHECKING, cast
 
-import great_tables as gt
 import polars as pl
 
+if TYPE_CHECKING:
+    import great_tables as gt
+
 def default_formatting(gt_tbl: gt.GT, decimals: int = 2) -> gt.GT:
     """Provides a default formatting for all columns in the great table.
 
+    The columns are grouped by their data type and each formatter is applied once to
+    all columns of the corresponding type. Missing values are shown as empty cells.
+
     Args:
         gt_tbl (gt.GT): Great table before formatting
         decimals (int, optional): The number of decimals to round floats to. Defaults to 2.
@@ -15,15 +21,28 @@ def default_formatting(gt_tbl: gt.GT, decimals: int = 2) -> gt.GT:
         gt.GT: Great table after formatting
     """
     tbl_data = cast(pl.DataFrame, gt_tbl._tbl_data)
+    numbers: list[str] = []
+    dates: list[str] = []
+    datetimes: list[str] = []
+    times: list[str] = []
     for item, data_type in zip(tbl_data.columns, tbl_data.dtypes):
         if data_type in [pl.Float32, pl.Float64]:
-            gt_tbl = gt_tbl.fmt_number(columns=[item], decimals=decimals)
+            numbers.append(item)
         elif data_type in [pl.Date]:
-            gt_tbl = gt_tbl.fmt_date(columns=[item])
+            dates.append(item)
         elif data_type in [pl.Datetime]:
-            gt_tbl = gt_tbl.fmt_datetime(columns=[item])
+            datetimes.append(item)
         elif data_type in [pl.Time]:
-            gt_tbl = gt_tbl.fmt_time(columns=[item])
+            times.append(item)
+
+    if len(numbers) > 0:
+        gt_tbl = gt_tbl.fmt_number(columns=numbers, decimals=decimals)
+    if len(dates) > 0:
+        gt_tbl = gt_tbl.fmt_date(columns=dates)
+    if len(datetimes) > 0:
+        gt_tbl = gt_tbl.fmt_datetime(columns=datetimes)
+    if len(times) > 0:
+        gt_tbl = gt_tbl.fmt_time(columns=times)
 
-    gt_tbl.sub_missing(missing_text='')
+    gt_tbl = gt_tbl.sub_missing(missing_text='')
     return gt_tbl
@@ -1,20 +1,26 @@
 """TableSpam provides a formla-based syntax to define good-enough tables."""
 
+from __future__ import annotations
 from tablespam._Formula.Formulas import Formula
-from tablespam._as_string.as_string import tbl_as_string
+from tablespam._Formula.Entry import HeaderEntry
+from tablespam._Formula.Layout import HeaderLayout
+from tablespam._as_string.as_string import tbl_as_string, tbl_iter_lines
+from tablespam._as_html.as_html import tbl_iter_html
 import polars as pl
-import great_tables as gt
-import openpyxl as opy
-from tablespam.GT._as_gt.as_gt import (
-    add_gt_spanners,
-    add_gt_rowname_separator,
-    add_gt_titles,
-    add_gt_footnote,
-    FormattingFunction,
-)
 from tablespam.GT.formatting import default_formatting
-from tablespam.Excel.xlsx_styles import XlsxStyles
-from tablespam.Excel._as_excel.as_excel import tbl_as_excel
+from typing import TYPE_CHECKING, BinaryIO, Literal, TextIO, overload
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from copy import copy
+import os
+
+# great_tables and openpyxl are only imported when a table is exported with them
+if TYPE_CHECKING:
+    import great_tables as gt
+    import openpyxl as opy
+    from tablespam.GT._as_gt.as_gt import FormattingFunction
+    from tablespam.Excel.xlsx_styles import XlsxStyles
+    from tablespam.Excel._as_excel.xlsx_writer import NativeWorkbook
 
 
 class TableSpam:
@@ -133,11 +139,12 @@ class TableSpam:
 
     def __init__(
         self,
-        data: pl.DataFrame,
+        data: pl.DataFrame | pl.LazyFrame,
         formula: str,
         title: str | None = None,
         subtitle: str | None = None,
         footnote: str | None = None,
+        keep_data: bool = True,
     ):
         """Create complex table spanners with a simple formula.
 
@@ -210,11 +217,15 @@ class TableSpam:
         - `great_tables`: https://posit-dev.github.io/great-tables/articles/intro.html
 
         Args:
-            data (pl.DataFrame): Polars data frame with the data that should be shown in the table.
+            data (pl.DataFrame | pl.LazyFrame): Polars data frame with the data that should be shown in the table.
+                If a pl.LazyFrame is passed (e.g., from pl.scan_parquet), only the variables used in the formula
+                are read and the data are collected when the table is first exported.
             formula (str): The tables for TableSpam are described in a single formula. See above for a detailed description.
             title (str | None, optional): The title of the table. Defaults to None.
             subtitle (str | None, optional): The subtitle of the table. Defaults to None.
             footnote (str | None, optional): The footnote of the table. Defaults to None.
+            keep_data (bool, optional): Should the full data be kept in `data`? If False, the table only keeps
+                the variables used in the formula (see projected_data) and `data` is None. Defaults to True.
 
         Returns:
             TableSpam: An object containing the title, subtitle, header info, data, and footnote.
@@ -261,19 +272,119 @@ class TableSpam:
             Data from the infamous mtcars data set.
             <BLANKLINE>
         """
-        self.data = data
+        self.data = data if keep_data else None
 
         form = Formula(formula=formula)
-        variables = form.get_variables()
-        self.table_data = {
-            'row_data': select_data(self.data, variables['lhs']),
-            'col_data': select_data(self.data, variables['rhs']),
-        }
+        self.header_trees = form.get_trees()
+        self.variables = form.get_variables()
+        self._projected_data: pl.DataFrame | None = None
+        self._lazy_data: pl.LazyFrame | None = None
+        self._table_data: dict[str, pl.DataFrame | None] | None = None
+        if isinstance(data, pl.LazyFrame):
+            # Only the variables used in the formula are read from the source and the
+            # data are collected when the rows are first needed (see projected_data).
+            # Resolving the schema already raises an error for missing variables.
+            self._lazy_data = project_data(data, self.variables)
+            self._lazy_data.collect_schema()
+        else:
+            self._projected_data = project_data(data.lazy(), self.variables).collect()
 
         self.title = title
         self.subtitle = subtitle
         self.footnote = footnote
-        self.header = form.get_entries()
+        self._header: dict[str, HeaderEntry | None] | None = None
+        self._layout: HeaderLayout | None = None
+
+    @property
+    def projected_data(self) -> pl.DataFrame:
+        """Single data frame with the variables used in the formula.
+
+        The variables of the row names come first, followed by the variables of the
+        columns. If the table was created from a pl.LazyFrame, the data are collected
+        when they are first requested.
+
+        Returns:
+            pl.DataFrame: data of the table
+        """
+        if self._projected_data is None:
+            if self._lazy_data is None:
+                raise ValueError('The table has no data.')
+            self._projected_data = self._lazy_data.collect()
+            self._lazy_data = None
+        return self._projected_data
+
+    @property
+    def table_data(self) -> dict[str, pl.DataFrame | None]:
+        """Data of the row names (row_data) and of the columns (col_data) of the table.
+
+        Both are views of projected_data; selecting the columns does not copy the data.
+        The row_data are None if the table has no row names.
+
+        Returns:
+            dict[str, pl.DataFrame | None]: data of the row names and of the columns
+        """
+        if self._table_data is None:
+            self._table_data = {
+                'row_data': select_data(self.projected_data, self.variables['lhs']),
+                'col_data': select_data(self.projected_data, self.variables['rhs']),
+            }
+        return self._table_data
+
+    def _slice_rows(self, offset: int, length: int) -> TableSpam:
+        """Create a table with a subset of the rows of this table.
+
+        The new table shares the formula, header, and titles of this table; its data
+        are views of the selected rows.
+
+        Args:
+            offset (int): index of the first row
+            length (int): number of rows
+
+        Returns:
+            TableSpam: table with the selected rows
+        """
+        part = copy(self)
+        # The header layout is created once and shared with the new table
+        part._layout = self.layout
+        part._table_data = {
+            name: None if data is None else data.slice(offset, length)
+            for name, data in self.table_data.items()
+        }
+        return part
+
+    @property
+    def header(self) -> dict[str, HeaderEntry | None]:
+        """Nested header entries of the lhs and rhs of the table.
+
+        The entries are created from the header trees (see header_trees) when they are
+        first requested. The lhs is None if the table has no row names.
+
+        Returns:
+            dict[str, HeaderEntry | None]: header entries of the lhs and rhs
+        """
+        if self._header is None:
+            self._header = {
+                side: tree.to_entry() if tree is not None else None
+                for side, tree in self.header_trees.items()
+            }
+        return self._header
+
+    @property
+    def layout(self) -> HeaderLayout:
+        """Flat layout of the table header.
+
+        The layout is compiled from the header trees when it is first requested and
+        shared by all exports of the table.
+
+        Returns:
+            HeaderLayout: layout of the header
+        """
+        if self._layout is None:
+            rhs = self.header_trees['rhs']
+            if rhs is None:
+                raise ValueError('The formula must have a right hand side.')
+            self._layout = HeaderLayout(lhs=self.header_trees['lhs'], rhs=rhs)
+        return self._layout
 
     def __repr__(self) -> str:
         """Print the TableSpam table.
@@ -341,11 +452,116 @@ class TableSpam:
         """
         return tbl_as_string(self, digits=digits, n=n, max_char=max_char)
 
+    def iter_lines(
+        self,
+        digits: int = 2,
+        n: int | None = None,
+        max_char: int = 30,
+        batch_size: int = 10_000,
+    ) -> Iterator[str]:
+        """Translates a table to lines of text.
+
+        In contrast to as_string, all rows are printed by default and the lines are
+        created batch by batch. The memory needed does therefore not grow with the
+        number of rows that are printed. Joining the lines with line breaks results
+        in the same text as as_string.
+
+        Args:
+            digits (int, optional): Number of digits to round floats to. Defaults to 2.
+            n (int | None, optional): number of rows from the data set to print. Defaults to None (all rows).
+            max_char (int, optional): number of characters that each cell at maximum is allows to have. Defaults to 30.
+            batch_size (int, optional): number of rows that are formatted at once. Defaults to 10_000.
+
+        Returns:
+            Iterator[str]: lines of the table without line breaks
+
+        Examples:
+            >>> from tablespam import TableSpam
+            >>> import polars as pl
+            >>> data = pl.DataFrame({'x': ['a', 'b'], 'y': [1.234, 5.678]})
+            >>> tbl = TableSpam(data=data, formula='x ~ y')
+            >>> for line in tbl.iter_lines():
+            ...     print(line)
+            <BLANKLINE>
+            | x | y    |
+            | - - ---- |
+            | a | 1.23 |
+            | b | 5.68 |
+        """
+        return tbl_iter_lines(
+            self, digits=digits, n=n, max_char=max_char, batch_size=batch_size
+        )
+
+    def to_text(
+        self,
+        file: str | os.PathLike[str] | TextIO,
+        digits: int = 2,
+        n: int | None = None,
+        max_char: int = 30,
+        batch_size: int = 10_000,
+    ) -> None:
+        """Write the table as text to a file.
+
+        The lines are written as they are created (see iter_lines), so that large tables
+        can be written to logs without creating the full text in memory.
+
+        Args:
+            file (str | os.PathLike[str] | TextIO): path of the file or an open text stream (e.g., sys.stdout)
+            digits (int, optional): Number of digits to round floats to. Defaults to 2.
+            n (int | None, optional): number of rows from the data set to print. Defaults to None (all rows).
+            max_char (int, optional): number of characters that each cell at maximum is allows to have. Defaults to 30.
+            batch_size (int, optional): number of rows that are formatted at once. Defaults to 10_000.
+        """
+        lines = self.iter_lines(
+            digits=digits, n=n, max_char=max_char, batch_size=batch_size
+        )
+        write_lines(file=file, lines=lines)
+
+    def to_html(
+        self,
+        file: str | os.PathLike[str] | TextIO,
+        digits: int = 2,
+        chunk_rows: int = 10_000,
+        merge_rownames: bool = True,
+    ) -> None:
+        """Write the table as HTML to a file.
+
+        In contrast to as_gt, the HTML is created without great_tables: The header is
+        created from the header layout and the rows of the body are formatted, escaped,
+        and written chunk by chunk. The memory needed for the HTML therefore does not grow
+        with the number of rows in the table. The HTML contains a small style sheet;
+        all elements have classes starting with `tablespam`.
+
+        Args:
+            file (str | os.PathLike[str] | TextIO): path of the file or an open text stream
+            digits (int, optional): Number of digits to round floats to. Defaults to 2.
+            chunk_rows (int, optional): number of rows that are formatted at once. Defaults to 10_000.
+            merge_rownames (bool, optional): Should identical row names in consecutive rows be merged? Defaults to True.
+
+        Examples:
+            >>> from tablespam import TableSpam
+            >>> import polars as pl
+            >>> import io
+            >>> data = pl.DataFrame({'x': ['a', 'a'], 'y': [1.234, 5.678]})
+            >>> tbl = TableSpam(data=data, formula='x ~ y')
+            >>> html = io.StringIO()
+            >>> tbl.to_html(html)
+            >>> print(html.getvalue().split('<tbody>')[1])
+            <BLANKLINE>
+            <tr><td rowspan="2" class="tablespam-rowname tablespam-rownames">a</td><td>1.23</td></tr>
+            <tr><td>5.68</td></tr>
+            </tbody>
+            </table>
+            <BLANKLINE>
+        """
+        lines = tbl_iter_html(
+            self, digits=digits, chunk_rows=chunk_rows, merge_rownames=merge_rownames
+        )
+        write_lines(file=file, lines=lines)
+
     def as_gt(
         self,
-        separator_style: gt.style.borders = gt.style.borders(
-            sides=['right'], color='gray'
-        ),
+        separator_style: gt.style.borders | None = None,
         formatting: FormattingFunction | None = default_formatting,
         groupname_col: str | None = None,
         auto_align: bool = True,
@@ -362,8 +578,8 @@ class TableSpam:
         Args:
             groupname_col (str, optional): Column names to group data. Refer to the
                 `gt` documentation for details.
-            separator_style (str, optional): Style of the vertical line separating row
-                names from data.
+            separator_style (gt.style.borders | None, optional): Style of the vertical line separating row
+                names from data. Defaults to None (a gray line).
             formatting (function, optional): This function is applied to the gt to format
                 all columns.
             auto_align (bool, optional): Should the table entries be aligned automatically? See great_tables for more information
@@ -404,24 +620,20 @@ class TableSpam:
             >>> gt_tbl = tbl.as_gt()
             >>> # Use tbl.as_gt().show() to show the table in the browser.
         """
-        if (
-            (self.header['lhs'] is not None)
-            and (self.table_data['row_data'] is not None)
-            and (isinstance(self.table_data['row_data'], pl.DataFrame))
-            and (isinstance(self.table_data['col_data'], pl.DataFrame))
-        ):
-            data_set = pl.concat(
-                [self.table_data['row_data'], self.table_data['col_data']],
-                how='horizontal',
-            )
-        elif isinstance(self.table_data['col_data'], pl.DataFrame):
-            data_set = self.table_data['col_data']
-        else:
-            raise ValueError('table_data should be of type pl.DataFrame.')
+        import great_tables as gt
+        from tablespam.GT._as_gt.as_gt import (
+            add_gt_spanners,
+            add_gt_rowname_separator,
+            add_gt_titles,
+            add_gt_footnote,
+        )
+
+        if separator_style is None:
+            separator_style = gt.style.borders(sides=['right'], color='gray')
 
-        # Create the gt-like table (assuming `gt` functionality is implemented)
+        # projected_data already has the row names followed by the columns
         gt_tbl = gt.GT(
-            data=data_set,
+            data=self.projected_data,
             groupname_col=groupname_col,
             auto_align=auto_align,
             id=id,
@@ -430,9 +642,7 @@ class TableSpam:
 
         gt_tbl = add_gt_spanners(gt_tbl=gt_tbl, tbl=self)
 
-        if (self.header['lhs'] is not None) and (
-            self.table_data['row_data'] is not None
-        ):
+        if self.layout.has_lhs and (self.table_data['row_data'] is not None):
             rowname_headers = self.table_data['row_data'].columns
             gt_tbl = add_gt_rowname_separator(
                 gt_tbl=gt_tbl,
@@ -452,10 +662,11 @@ class TableSpam:
 
         # Apply auto-formatting if requested
         if formatting is not None:
-            gt_tbl = default_formatting(gt_tbl)
+            gt_tbl = formatting(gt_tbl)
 
         return gt_tbl
 
+    @overload
     def as_excel(
         self,
         workbook: opy.Workbook | None = None,
@@ -463,28 +674,81 @@ class TableSpam:
         start_row: int = 1,
         start_col: int = 1,
         styles: XlsxStyles | None = None,
-    ) -> opy.Workbook:
+        mode: Literal['default', 'stream'] = 'default',
+        backend: Literal['openpyxl'] = 'openpyxl',
+        overflow: Literal['split', 'error'] = 'split',
+    ) -> opy.Workbook: ...
+
+    @overload
+    def as_excel(
+        self,
+        workbook: NativeWorkbook | None = None,
+        sheet: str = 'Table',
+        start_row: int = 1,
+        start_col: int = 1,
+        styles: XlsxStyles | None = None,
+        mode: Literal['default', 'stream'] = 'default',
+        *,
+        backend: Literal['native'],
+        overflow: Literal['split', 'error'] = 'split',
+    ) -> NativeWorkbook: ...
+
+    def as_excel(
+        self,
+        workbook: opy.Workbook | NativeWorkbook | None = None,
+        sheet: str = 'Table',
+        start_row: int = 1,
+        start_col: int = 1,
+        styles: XlsxStyles | None = None,
+        mode: Literal['default', 'stream'] = 'default',
+        backend: Literal['openpyxl', 'native'] = 'openpyxl',
+        overflow: Literal['split', 'error'] = 'split',
+    ) -> opy.Workbook | NativeWorkbook:
         """Export a TableSpam table to Excel.
 
         Tablespam uses openpyxl to export tables to Excel workbooks. See
         https://openpyxl.readthedocs.io/en/stable/ for more details on openpyxl.
 
+        For very large tables, use mode='stream'. The table is then written row by row
+        to a write-only workbook (see openpyxl's write-only mode) and the memory
+        requirements no longer grow with the number of rows. Write-only workbooks
+        can only be saved once and their sheets cannot be changed after the table was added.
+
+        backend='native' skips openpyxl's cell objects altogether: the XML of the sheet is
+        written directly from the data and the workbook is only assembled when it is saved.
+        The resulting file looks exactly like the one created with openpyxl, but the export
+        is much faster for large tables. Native workbooks can only hold tables added with
+        backend='native' and cannot be edited with openpyxl.
+
         Args:
-            workbook (opy.Workbook | None, optional): An openpyxl workbook to which the table should be added.
+            workbook (opy.Workbook | NativeWorkbook | None, optional): A workbook to which the table should be added.
+                Must be a NativeWorkbook if backend='native' and an openpyxl workbook otherwise.
                 When set to None, a new workbook will be created. Defaults to None.
             sheet (str, optional): The name of the sheet to which the table should be written. Defaults to 'Table'.
             start_row (int, optional): Index of the row where the table starts in the sheet. Defaults to 1.
             start_col (int, optional): Index of the column where the table starts in the sheet. Defaults to 1.
             styles (XlsxStyles | None, optional): Custom styles that are applied to the table. Defaults to None.
+            mode (Literal['default', 'stream'], optional): 'default' creates a regular openpyxl workbook, 'stream'
+                writes the table to a write-only workbook (created with opy.Workbook(write_only=True)). Defaults to 'default'.
+            backend (Literal['openpyxl', 'native'], optional): 'openpyxl' creates the cells with openpyxl,
+                'native' writes the XML of the sheet directly to a NativeWorkbook. Defaults to 'openpyxl'.
+            overflow (Literal['split', 'error'], optional): What happens if the table has more rows than an Excel sheet
+                (1,048,576): 'split' continues the table on additional sheets named 'Table (2)', 'Table (3)', ...,
+                each repeating the title, header, and footnote; 'error' raises an error. Defaults to 'split'.
+
+        Raises:
+            ValueError: Error if the mode, backend, or overflow policy is unknown or if the workbook does not fit the backend.
+            ValueError: Error if the table does not fit on a single sheet and overflow='error'.
 
         Returns:
-            opy.Workbook: openpyxl workbook
+            opy.Workbook | NativeWorkbook: openpyxl workbook or, if backend='native', a NativeWorkbook
 
 
         Examples:
             >>> from tablespam import TableSpam
             >>> from tablespam.Data.mtcars import mtcars
             >>> import polars as pl
+            >>> import io
             >>> cars = mtcars()
             >>> summarized_table = (
             ...     cars.group_by(['cyl', 'vs'])
@@ -511,35 +775,197 @@ class TableSpam:
             ... )
             >>> wb = tbl.as_excel()  # Export to Excel workbook
             >>> # wb.save("tablespam_table.xlsx") # Write to an Excel file.
+            >>> # For large tables, stream the rows to a write-only workbook:
+            >>> wb = tbl.as_excel(mode='stream')
+            >>> wb.save(io.BytesIO())  # Write-only workbooks must be saved.
+            >>> # or skip openpyxl's cells and write the sheet directly:
+            >>> wb = tbl.as_excel(backend='native')
         """
+        import openpyxl as opy
+        from tablespam.Excel.xlsx_styles import XlsxStyles
+        from tablespam.Excel._as_excel.as_excel import tbl_as_excel
+        from tablespam.Excel._as_excel.stream_excel import tbl_stream_excel
+        from tablespam.Excel._as_excel.native_excel import tbl_native_excel
+        from tablespam.Excel._as_excel.xlsx_writer import NativeWorkbook
+        from tablespam.Excel._as_excel.overflow import sheet_parts
+
+        if mode not in ['default', 'stream']:
+            raise ValueError(f"mode must be 'default' or 'stream', got {mode}.")
+        if backend not in ['openpyxl', 'native']:
+            raise ValueError(f"backend must be 'openpyxl' or 'native', got {backend}.")
+        if styles is None:
+            styles = XlsxStyles()
+        parts = sheet_parts(
+            tbl=self,
+            sheet=sheet,
+            start_row=start_row,
+            start_col=start_col,
+            styles=styles,
+            overflow=overflow,
+        )
+
+        if backend == 'native':
+            if mode == 'stream':
+                raise ValueError(
+                    "mode='stream' is only supported with backend='openpyxl'."
+                )
+            if workbook is None:
+                workbook = NativeWorkbook()
+            if not isinstance(workbook, NativeWorkbook):
+                raise ValueError("backend='native' requires a NativeWorkbook.")
+            for part_sheet, part, part_styles in parts:
+                tbl_native_excel(
+                    tbl=part,
+                    workbook=workbook,
+                    sheet=part_sheet,
+                    start_row=start_row,
+                    start_col=start_col,
+                    styles=part_styles,
+                )
+            return workbook
+
+        if isinstance(workbook, NativeWorkbook):
+            raise ValueError("A NativeWorkbook requires backend='native'.")
         if workbook is None:
-            workbook = opy.Workbook()
+            workbook = opy.Workbook(write_only=mode == 'stream')
             # openpyxl automatically adds a default sheet
             # that we will remove
             if 'Sheet' in workbook.sheetnames:
                 workbook.remove(workbook['Sheet'])
-        if styles is None:
-            styles = XlsxStyles()
-        if sheet not in workbook.sheetnames:
-            workbook.create_sheet(title=sheet)
 
-        wb = tbl_as_excel(
+        for part_sheet, part, part_styles in parts:
+            if mode == 'stream':
+                # write-only sheets are created when the table is written
+                tbl_stream_excel(
+                    tbl=part,
+                    workbook=workbook,
+                    sheet=part_sheet,
+                    start_row=start_row,
+                    start_col=start_col,
+                    styles=part_styles,
+                )
+                continue
+
+            if part_sheet not in workbook.sheetnames:
+                workbook.create_sheet(title=part_sheet)
+
+            tbl_as_excel(
+                tbl=part,
+                workbook=workbook,
+                sheet=part_sheet,
+                start_row=start_row,
+                start_col=start_col,
+                styles=part_styles,
+            )
+        return workbook
+
+    def write_excel(
+        self,
+        target: str | os.PathLike[str] | BinaryIO,
+        sheet: str = 'Table',
+        start_row: int = 1,
+        start_col: int = 1,
+        styles: XlsxStyles | None = None,
+        compresslevel: int = 1,
+        overflow: Literal['split', 'error'] = 'split',
+    ) -> None:
+        """Write the table to an xlsx file.
+
+        In contrast to as_excel, no workbook is returned: The sheet is created with the
+        native backend (see as_excel) and its XML is compressed and written to the
+        target chunk by chunk while the table is rendered. The memory needed for the
+        file therefore does not grow with the number of rows in the table. The target
+        does not have to be seekable, so the file can, for instance, be streamed
+        directly into the body of an HTTP response.
+
+        Args:
+            target (str | os.PathLike[str] | BinaryIO): path of the file or an open binary stream
+            sheet (str, optional): The name of the sheet to which the table should be written. Defaults to 'Table'.
+            start_row (int, optional): Index of the row where the table starts in the sheet. Defaults to 1.
+            start_col (int, optional): Index of the column where the table starts in the sheet. Defaults to 1.
+            styles (XlsxStyles | None, optional): Custom styles that are applied to the table. Defaults to None.
+            compresslevel (int, optional): zlib compression level from 0 (no compression) to 9. Defaults to 1.
+            overflow (Literal['split', 'error'], optional): What happens if the table has more rows than an Excel sheet
+                (see as_excel). Continuation sheets are streamed in the same way. Defaults to 'split'.
+
+        Examples:
+            >>> from tablespam import TableSpam
+            >>> import polars as pl
+            >>> import io
+            >>> data = pl.DataFrame({'x': ['a', 'a'], 'y': [1.234, 5.678]})
+            >>> tbl = TableSpam(data=data, formula='x ~ y')
+            >>> xlsx = io.BytesIO()
+            >>> tbl.write_excel(xlsx)  # or tbl.write_excel('tablespam_table.xlsx')
+            >>> xlsx.getvalue()[:2]
+            b'PK'
+        """
+        from tablespam.Excel._as_excel.native_excel import write_excel
+
+        write_excel(
             tbl=self,
-            workbook=workbook,
+            target=target,
             sheet=sheet,
             start_row=start_row,
             start_col=start_col,
             styles=styles,
+            compresslevel=compresslevel,
+            overflow=overflow,
         )
-        return wb
 
 
-def select_data(data: pl.DataFrame, variables: list[str]) -> pl.DataFrame | None:
+def write_lines(file: str | os.PathLike[str] | TextIO, lines: Iterable[str]) -> None:
+    """Write lines to a file as they are created.
+
+    Args:
+        file (str | os.PathLike[str] | TextIO): path of the file or an open text stream
+        lines (Iterable[str]): lines without line breaks
+    """
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'w', encoding='utf-8') as stream:
+            stream.writelines(f'{line}\n' for line in lines)
+    else:
+        file.writelines(f'{line}\n' for line in lines)
+
+
+def project_data(
+    data: pl.LazyFrame, variables: dict[str, list[str] | None]
+) -> pl.LazyFrame:
+    """Restrict a lazy data frame to the variables used in a table.
+
+    The projection is pushed down into the scan of the data, so that only the
+    variables of the lhs and the rhs are read when the data are collected.
+
+    Args:
+        data (pl.LazyFrame): polars lazy frame that should be projected
+        variables (dict[str, list[str] | None]): names of the variables of the lhs and rhs
+
+    Raises:
+        ValueError: Error if a variable is used more than once on the same side of the formula.
+
+    Returns:
+        pl.LazyFrame: lazy frame with each of the variables once
+    """
+    names = []
+    for side in variables.values():
+        if side is None:
+            continue
+        duplicated = [name for name, count in Counter(side).items() if count > 1]
+        if duplicated:
+            raise ValueError(
+                'Each variable can only be used once on each side of the formula. '
+                + f'Found {duplicated} more than once.'
+            )
+        names.extend(side)
+    # A variable may be used both as row name and as column
+    return data.select(list(dict.fromkeys(names)))
+
+
+def select_data(data: pl.DataFrame, variables: list[str] | None) -> pl.DataFrame | None:
     """Subsets the data frame to only the relevant variables.
 
     Args:
         data (pl.DataFrame): polars data frame that should be subsetted
-        variables (list[str]): list with names of items that should be retained
+        variables (list[str] | None): list with names of items that should be retained
 
     Returns:
         pl.DataFrame | None: polars data frame with the specified variables
@@ -1,6 +1,13 @@
 """Entries defines the header entry structure for tables."""
 
-from typing import Self  # noqa: D100
+from __future__ import annotations
+from array import array
+from typing import TYPE_CHECKING, Iterator, Self
+
+from tablespam._Formula.Parser import parse_variable
+
+if TYPE_CHECKING:
+    from tablespam._Formula.Parser import RecursiveList
 
 
 class HeaderEntry:
@@ -16,8 +23,13 @@ class HeaderEntry:
     | setosa  |    5.1 |   3.5 |    1.4 |   0.2 |
     ```
     Each of the entries (e.g., Sepal) is represented by a HeaderEntry.
+
+    Internally, tablespam represents the header as a HeaderTree. HeaderEntries
+    are created from the tree when they are requested (see HeaderTree.to_entry).
     """
 
+    __slots__ = ('name', 'item_name', 'entries', 'width', 'level')
+
     name: str
     item_name: str
     entries: list[Self]
@@ -105,20 +117,215 @@ class HeaderEntry:
         Returns:
             bool: True if both objects are equal, False otherwise.
         """
-        if not isinstance(other, HeaderEntry):
-            return False
-        equal = all([self.name == other.name, self.item_name == other.item_name])
-        if hasattr(self, 'width'):
-            if hasattr(other, 'width'):
-                equal = equal & (self.width == other.width)
-            else:
-                equal = False
-        if hasattr(self, 'level'):
-            if hasattr(other, 'level'):
-                equal = equal & (self.level == other.level)
+        # The entries are compared iteratively to support deeply nested headers
+        pairs: list[tuple[HeaderEntry, object]] = [(self, other)]
+        while pairs:
+            entry, other_entry = pairs.pop()
+            if not isinstance(other_entry, HeaderEntry):
+                return False
+            if (entry.name, entry.item_name) != (
+                other_entry.name,
+                other_entry.item_name,
+            ):
+                return False
+            for attribute in ('width', 'level'):
+                if hasattr(entry, attribute) and (
+                    getattr(entry, attribute) != getattr(other_entry, attribute, None)
+                ):
+                    return False
+            if len(entry.entries) != len(other_entry.entries):
+                return False
+            pairs.extend(zip(entry.entries, other_entry.entries))
+        return True
+
+
+class HeaderTree:
+    """Flat representation of one side (lhs or rhs) of a table header.
+
+    The entries of the header are stored in parallel arrays, with one element per
+    entry in pre-order (each entry is followed by its sub-entries). Entry 0 is the
+    root (_BASE_LEVEL_). The sub-entries of an entry are linked with first_child and
+    next_sibling; -1 indicates that there is no such entry.
+
+    In contrast to nested HeaderEntries, the tree is created and processed without
+    recursion, so headers with many thousands of entries are supported.
+
+    Attributes:
+        name (list[str]): name of each entry as shown in the table
+        item_name (list[str]): name of the item in the data (same as name for spanners)
+        parent (array): index of the parent entry (-1 for the root)
+        first_child (array): index of the first sub-entry
+        next_sibling (array): index of the next entry with the same parent
+        width (array): number of columns spanned by each entry (see HeaderEntry.set_width)
+        level (array): level of each entry (see HeaderEntry.set_level)
+    """
+
+    __slots__ = (
+        'name',
+        'item_name',
+        'parent',
+        'first_child',
+        'next_sibling',
+        'width',
+        'level',
+    )
+
+    def __init__(self) -> None:
+        """Create a tree with only the root entry."""
+        self.name = ['_BASE_LEVEL_']
+        self.item_name = ['_BASE_LEVEL_']
+        self.parent = array('q', [-1])
+        self.first_child = array('q', [-1])
+        self.next_sibling = array('q', [-1])
+        self.width = array('q', [0])
+        self.level = array('q', [0])
+
+    def __len__(self) -> int:
+        """Number of entries in the tree (including the root).
+
+        Returns:
+            int: number of entries
+        """
+        return len(self.name)
+
+    def add(self, name: str, item_name: str, parent: int, last_sibling: int) -> int:
+        """Add an entry to the tree.
+
+        Args:
+            name (str): name of the entry
+            item_name (str): name of the item in the data
+            parent (int): index of the parent entry
+            last_sibling (int): index of the current last sub-entry of the parent or -1
+
+        Returns:
+            int: index of the new entry
+        """
+        index = len(self.name)
+        self.name.append(name)
+        self.item_name.append(item_name)
+        self.parent.append(parent)
+        self.first_child.append(-1)
+        self.next_sibling.append(-1)
+        self.width.append(0)
+        self.level.append(0)
+        if last_sibling == -1:
+            self.first_child[parent] = index
+        else:
+            self.next_sibling[last_sibling] = index
+        return index
+
+    def children(self, index: int) -> Iterator[int]:
+        """Iterate over the sub-entries of an entry.
+
+        Args:
+            index (int): index of the entry
+
+        Yields:
+            int: indices of the sub-entries in order
+        """
+        child = self.first_child[index]
+        while child != -1:
+            yield child
+            child = self.next_sibling[child]
+
+    @classmethod
+    def from_parsed(cls, parsed: RecursiveList) -> HeaderTree:
+        """Create the tree for one side of a parsed formula.
+
+        Args:
+            parsed (RecursiveList): lhs or rhs of the parsed formula (see Formula.parse_formula)
+
+        Raises:
+            ValueError: Error in case of missing spanner name
+            ValueError: Error in case of parsing issues
+
+        Returns:
+            HeaderTree: tree with width and level of all entries
+        """
+        tree = cls()
+        # Elements that still have to be added with the index of their parent
+        # and the last sub-entry that was added to each entry so far.
+        last_child = [-1]
+        stack: list[tuple[RecursiveList | str, int]] = [
+            (element, 0) for element in reversed(parsed)
+        ]
+        while stack:
+            element, parent = stack.pop()
+            if isinstance(element, str):
+                # It's a variable
+                name, item_name = parse_variable(element)
+                index = tree.add(
+                    name=name,
+                    item_name=item_name,
+                    parent=parent,
+                    last_sibling=last_child[parent],
+                )
+            elif isinstance(element, list):
+                # It's a spanner: name = entries
+                if len(element) < 3 or element[1] != '=':
+                    raise ValueError(f'Expected a spanner name in {element}.')
+                if not isinstance(element[0], str):
+                    raise ValueError('Incorrect type; expected str.')
+                # spanner names could still contain backticks; those are only removed
+                # for variables. Therefore, we remove them here:
+                spanner_name = element[0].strip('`')
+                index = tree.add(
+                    name=spanner_name,
+                    item_name=spanner_name,
+                    parent=parent,
+                    last_sibling=last_child[parent],
+                )
+                stack.extend((entry, index) for entry in reversed(element[2:]))
             else:
-                equal = False
+                raise ValueError(f'Could not parse {parsed}.')
+            last_child[parent] = index
+            last_child.append(-1)
 
-        for i in range(len(self.entries)):
-            equal = equal & self.entries[i].__eq__(other.entries[i])
-        return equal
+        tree.set_width_and_level()
+        return tree
+
+    def set_width_and_level(self) -> None:
+        """Compute the width and level of all entries.
+
+        Entries without sub-entries have width 1 and level 1. Spanners span all columns of
+        their sub-entries and are one level above their highest sub-entry. As sub-entries
+        always come after their parent, a single backward pass over the entries suffices.
+        """
+        width, level, parent = self.width, self.level, self.parent
+        for index in range(len(self.name) - 1, -1, -1):
+            if self.first_child[index] == -1:
+                width[index] = 1
+                level[index] = 1
+            if index > 0:
+                width[parent[index]] += width[index]
+                level[parent[index]] = max(level[parent[index]], level[index] + 1)
+
+    @property
+    def variables(self) -> list[str]:
+        """Names of the items in the data set (entries without sub-entries).
+
+        Returns:
+            list[str]: item names in order
+        """
+        first_child, item_name = self.first_child, self.item_name
+        return [
+            item_name[index]
+            for index in range(1, len(item_name))
+            if first_child[index] == -1
+        ]
+
+    def to_entry(self) -> HeaderEntry:
+        """Create the nested HeaderEntries of the tree.
+
+        Returns:
+            HeaderEntry: the root entry (_BASE_LEVEL_)
+        """
+        entries = []
+        for index in range(len(self.name)):
+            entry = HeaderEntry(name=self.name[index], item_name=self.item_name[index])
+            entry.set_width(self.width[index])
+            entry.set_level(self.level[index])
+            entries.append(entry)
+            if index > 0:
+                entries[self.parent[index]].add_entry(entry)
+        return entries[0]
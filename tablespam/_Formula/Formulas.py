@@ -1,10 +1,19 @@
 """Formulas are a rudimentary and limited implementation of an R-style formula syntax for TableSpam."""
 
-from tablespam._Formula.Entry import HeaderEntry
-import pyparsing as pyp
-from typing import Union
-
-RecursiveList = list[Union['RecursiveList', str]]
+from tablespam._Formula.Entry import HeaderTree
+from tablespam._Formula.Parser import (
+    RecursiveList,
+    parse_formula_string,
+    parse_variable,
+)
+from collections import OrderedDict
+from threading import Lock
+
+# Header trees of the most recently used formulas (see get_trees).
+# The cache is shared by all tables created in the process.
+_entries_cache: OrderedDict[str, dict[str, HeaderTree | None]] = OrderedDict()
+_entries_cache_size = 128
+_entries_cache_lock = Lock()
 
 
 class Formula:
@@ -47,7 +56,7 @@ class Formula:
         [['a', 'b'], ['c', 'd']]
         """
         self.formula = formula
-        self.expression = define_parser()
+        self._trees: dict[str, HeaderTree | None] | None = None
 
     def parse_formula(self) -> RecursiveList:
         """Parse_formula breaks down the formula into its elements to make it usable for creating the table.
@@ -55,119 +64,111 @@ class Formula:
         Returns:
             RecursiveList: nested lists with the elements of the table.
         """
-        parsed_formula = self.expression.parseString(self.formula).asList()
+        parsed_formula = parse_formula_string(self.formula)
         return parsed_formula
 
     def get_entries(self) -> dict:
         """Extracts the entries found in a table.
 
+        The entries are created from the header trees (see get_trees).
+
         Returns:
             dict: dict with entries for the lhs and rhs of the table.
         """
+        trees = self.get_trees()
+        return {
+            side: tree.to_entry() if tree is not None else None
+            for side, tree in trees.items()
+        }
+
+    def get_trees(self) -> dict[str, HeaderTree | None]:
+        """Extracts the header trees of the lhs and rhs of a table.
+
+        The trees of the most recently used formulas are cached (see set_formula_cache_size),
+        so a formula is only parsed once, even if it is used for many tables. The trees are
+        shared between all tables using the same formula and must not be changed.
+
+        Returns:
+            dict[str, HeaderTree | None]: dict with the trees for the lhs and rhs of the table.
+            The lhs is None if the table has no row names.
+        """
+        if self._trees is not None:
+            return self._trees
+        with _entries_cache_lock:
+            trees = _entries_cache.get(self.formula)
+            if trees is not None:
+                _entries_cache.move_to_end(self.formula)
+        if trees is None:
+            trees = self.parse_trees()
+            with _entries_cache_lock:
+                if _entries_cache_size > 0:
+                    _entries_cache[self.formula] = trees
+                    while len(_entries_cache) > _entries_cache_size:
+                        _entries_cache.popitem(last=False)
+        self._trees = trees
+        return trees
+
+    def parse_trees(self) -> dict[str, HeaderTree | None]:
+        """Parse the formula and create the header trees of the table.
+
+        Returns:
+            dict[str, HeaderTree | None]: dict with the trees for the lhs and rhs of the table.
+        """
         parsed_formula = self.parse_formula()
         if parsed_formula[0] == '1':
             lhs = None
+        elif isinstance(parsed_formula[0], list):
+            lhs = HeaderTree.from_parsed(parsed_formula[0])
         else:
-            lhs = create_entries(parsed_formula[0])
-            lhs = add_header_width(lhs)
-            lhs = add_header_level(lhs)
-        rhs = create_entries(parsed_formula[1])
-        rhs = add_header_width(rhs)
-        rhs = add_header_level(rhs)
+            raise ValueError(f'Could not parse {parsed_formula[0]}.')
+        if not isinstance(parsed_formula[1], list):
+            raise ValueError(f'Could not parse {parsed_formula[1]}.')
+        rhs = HeaderTree.from_parsed(parsed_formula[1])
 
         return {'lhs': lhs, 'rhs': rhs}
 
-    def get_variables(self) -> dict[str, list[str]]:
+    def get_variables(self) -> dict[str, list[str] | None]:
         """Extract the names of the variables found in the formula.
 
         The names should also be found in the data set.
 
         Returns:
-            dict[str, list[str]]: The dictionary will have the names found on the
-            left hand side (lhs) and right hand side (rhs) of the formula.
+            dict[str, list[str] | None]: The dictionary will have the names found on the
+            left hand side (lhs) and right hand side (rhs) of the formula. The lhs is None
+            if the table has no row names.
         """
-        entries = self.get_entries()
-        lhs = extract_variables(entries['lhs'])
-        rhs = extract_variables(entries['rhs'])
-        return {'lhs': lhs, 'rhs': rhs}
+        trees = self.get_trees()
+        return {
+            side: tree.variables if tree is not None else None
+            for side, tree in trees.items()
+        }
 
 
-def create_entries(
-    entry_list: RecursiveList | list[str] | str, depth: int | None = None
-) -> HeaderEntry:
-    """Create header entries.
+def set_formula_cache_size(size: int) -> None:
+    """Set the number of formulas whose header trees are cached.
 
-    The entries are of type HeaderEntry and may contain other entries nested within them.
+    When more formulas are used, the trees of the least recently used formula are dropped.
+    Defaults to 128 formulas. A size of 0 disables the cache.
 
     Args:
-        entry_list (RecursiveList): Current entry list. This list will be filled recursively
-        depth (int | None, optional): current depht of the entry. Defaults to None.
+        size (int): maximal number of cached formulas
 
     Raises:
-        ValueError: Error in case of missing spanner name
-        ValueError: Error in case of parsing issues
-
-    Returns:
-        list: the header entries
+        ValueError: Error if the size is negative
     """
-    if depth is None:
-        depth = 1
-        header_entry = HeaderEntry(name='_BASE_LEVEL_', item_name='_BASE_LEVEL_')
-    elif (depth > 1) & ((entry_list[1] != '=') | (len(entry_list) < 3)):
-        raise ValueError(f'Expected a spanner name in {entry_list}.')
-    else:
-        # spanner names could still contain backticks; those are only removed
-        # for variables. Therefore, we remove them here:
-        if isinstance(entry_list[0], str):
-            spanner_name = entry_list[0].strip('`')
-        else:
-            raise ValueError('Incorrect type; expected str.')
-        # We can now drop the first two entries as those are the spanner name
-        # and the equal sign. Everything else should be actual entries.
-        entry_list = entry_list[2:]
-
-        header_entry = HeaderEntry(name=spanner_name, item_name=spanner_name)
-
-    for entry in entry_list:
-        if isinstance(entry, str):
-            # It's a variable
-            variable = split_variable(entry)
-            sub_entry = HeaderEntry(
-                name=variable['name'], item_name=variable['item_name']
-            )
-            header_entry.add_entry(sub_entry)
-        elif isinstance(entry, list):
-            header_entry.add_entry(create_entries(entry, depth=depth + 1))
-        else:
-            raise ValueError(f'Could not parse {entry_list}.')
-    return header_entry
-
-
-def extract_variables(
-    entry_list: HeaderEntry, variables: list[str] | None = None
-) -> list[str]:
-    """Get the names of the variables found in a formula.
+    global _entries_cache_size
+    if size < 0:
+        raise ValueError(f'The cache size must be non-negative, got {size}.')
+    with _entries_cache_lock:
+        _entries_cache_size = size
+        while len(_entries_cache) > size:
+            _entries_cache.popitem(last=False)
 
-    The variables are the items that we expect to also be in the data set.
 
-    Args:
-        entry_list (list[str]): list with entries for the header
-        variables (list[str] | None, optional): list that gets filled with the names
-        of the items. Defaults to None.
-
-    Returns:
-        list[str]: list with names of items
-    """
-    if entry_list is None:
-        return None
-    if variables is None:
-        variables = []
-    if len(entry_list.entries) == 0:
-        variables.append(entry_list.item_name)
-    else:
-        for entry in entry_list.entries:
-            extract_variables(entry, variables=variables)
-    return variables
+def clear_formula_cache() -> None:
+    """Remove the header trees of all formulas from the cache."""
+    with _entries_cache_lock:
+        _entries_cache.clear()
 
 
 def split_variable(var: str) -> dict[str, str]:
@@ -181,177 +182,12 @@ def split_variable(var: str) -> dict[str, str]:
         var (str): variable
 
     Raises:
-        ValueError: in case of more than one : within the string
+        FormulaParseError: in case the variable does not start with a valid name
 
     Returns:
         dict[str, str]: name and item_name
     """
     if var == '1':
         return {'name': var, 'item_name': var}
-    variable = pyp.Word(
-        pyp.alphas + '_', pyp.alphas + pyp.nums + '_'
-    ) | pyp.QuotedString('`', escChar='\\', unquote_results=True)
-    variable_with_name = variable + pyp.Suppress(':') + variable
-    if variable_with_name.matches(var):
-        result = variable_with_name.parseString(var).asList()
-        if len(result) == 2:
-            return {'name': result[0], 'item_name': result[1]}
-        else:
-            raise ValueError(f'Expected two elements, got {result}')
-    else:
-        result = variable.parseString(var).asList()
-        return {'name': result[0], 'item_name': result[0]}
-
-
-def define_variable() -> pyp.core.Combine:
-    """Internal function defining the pattern that variables can have for pyparsing.
-
-    Returns:
-        pyp.core.Combine: pyparsing pattern for variables
-    """
-    # Match regular variable names:
-    #  Variable names must start with a letter or underscore, followed
-    #  by any combination of letters, numbers, and underscores.
-    single_variable = pyp.Word(pyp.alphas + '_', pyp.alphas + pyp.nums + '_')
-
-    # We also want to allow for labels with spaces and special characters in them. This is
-    # mostly required for renaming columns:
-    #  Any variable in `` will be seen as one variable
-    quoted_variable = pyp.QuotedString('`', escChar='\\', unquoteResults=False)
-    base_variable = single_variable | quoted_variable
-
-    # Match colon-separated variable patterns
-    variable = pyp.Combine(base_variable + pyp.Optional(':' + base_variable))
-
-    return variable
-
-
-def define_operators() -> pyp.core.ParserElement:
-    """Internal function describing the pyparsing pattern for operators (+, :) used in the formulas.
-
-    Returns:
-        pyp.core.ParserElement: pyparsing definition of operators
-    """
-    # Operator definitions
-    # We only need the following operators:
-    #  = separates the name of a spanner from the spanner content
-    #  + separates elements within a spanner
-    equal = pyp.one_of('=')
-    plus = pyp.Suppress('+')
-    operator = equal | plus
-
-    return operator
-
-
-def define_parser() -> pyp.core.ParserElement:
-    """Internal function defining the full syntax for the formula parser used to decipher the R-style formula.
-
-    Returns:
-        pyp.core.ParserElement: pyparsing definition
-    """
-    # Define a forward-declared grammar
-    expr = pyp.Forward()
-
-    # Additionally, we need braces that define groups which will form a spanner.
-    # Note that the group itself may contain the expression again, so we have a
-    # recursive algorithm
-    term = define_variable() | pyp.Group(pyp.Suppress('(') + expr + pyp.Suppress(')'))
-    expr <<= term + pyp.ZeroOrMore(define_operators() + term)  # Recursive expression
-    full_expression = (
-        ('1' | pyp.Group(expr).setResultsName('lhs'))
-        + pyp.Suppress('~')
-        + pyp.Group(expr).setResultsName('rhs')
-        + pyp.StringEnd()
-    )
-
-    return full_expression
-
-
-def add_header_width(parsed_partial: HeaderEntry) -> HeaderEntry:
-    """Adds width information to each element in a table header.
-
-    Tablespam represents headers as nested lists. This function calculates how
-    wide each header entry must be by determining how many root elements each
-    parent element spans. For example, if a header 'x' spans two elements 'x1' and 'x2':
-
-        |    x    |
-        | x1 | x2 |
-
-    The function updates each header entry with its corresponding width. Here, the width of
-    x is 2, and the width of x1 and x2 is 1.
-
-    Args:
-        parsed_partial (dict): The left-hand side or right-hand side of the parsed table.
-
-    Returns:
-        dict or None: The parsed_partial with additional width fields, or None if parsed_partial is None.
-    """
-    if parsed_partial is None:
-        return None
-
-    # In case of single level set width to 1 (current parsed_partial is not a spanner)
-    if len(parsed_partial.entries) == 0:
-        parsed_partial.set_width(1)
-        return parsed_partial
-
-    # Recursively go through all nested spanners and add to width
-    parsed_partial.set_width(0)
-    for entry_index in range(len(parsed_partial.entries)):
-        parsed_partial.entries[entry_index] = add_header_width(
-            parsed_partial.entries[entry_index]
-        )
-        parsed_partial.set_width(
-            parsed_partial.width + parsed_partial.entries[entry_index].width
-        )
-
-    return parsed_partial
-
-
-def add_header_level(parsed_partial: HeaderEntry) -> HeaderEntry:
-    """Adds level information to each element in a table header.
-
-    Tablespam represents headers as nested lists. This function calculates at which
-    level each header entry must be by determining how many root elements each
-    parent element spans. For example, if a header 'x' spans two elements 'x1' and 'x2':
-
-        |  other  | <- level 3
-        |    x    | <- level 2
-        | x1 | x2 | <- level 1
-
-    Args:
-        parsed_partial (_type_): left or right hand side of the header
-
-    Raises:
-        ValueError: Error if no level could be defined
-
-    Returns:
-        _type_: the parsed_partial with added level info
-    """
-    if parsed_partial is None:
-        return None
-
-    # Level 1 is the level of the headers that are closest
-    # to the data. When we have an empty entries list,
-    # we reached that level.
-    if len(parsed_partial.entries) == 0:
-        parsed_partial.set_level(1)
-        return parsed_partial
-
-    parsed_partial.set_level(0)
-    for entry_index in range(len(parsed_partial.entries)):
-        # Bascially, what we are doing here is updating the level of one
-        # subentry at a time
-        parsed_partial.entries[entry_index] = add_header_level(
-            parsed_partial.entries[entry_index]
-        )
-        # After updating the subentries, we check if the current level of the entry
-        # is lower than the subentry + 1. If this is the case, we need to update the level
-        # of the entry.
-        parsed_partial.set_level(
-            max(parsed_partial.level, parsed_partial.entries[entry_index].level + 1)
-        )
-
-    if parsed_partial.level == 0:
-        raise ValueError(f'Could not set a level for {parsed_partial}')
-
-    return parsed_partial
+    name, item_name = parse_variable(var)
+    return {'name': name, 'item_name': item_name}
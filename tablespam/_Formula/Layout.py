@@ -0,0 +1,180 @@
+"""Layout defines the flat, array-based geometry of the table header."""
+
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, cast
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from tablespam._Formula.Entry import HeaderTree
+
+# Values of HeaderLayout.side
+LHS = 0
+RHS = 1
+
+Array = np.ndarray[Any, np.dtype[Any]]
+Index = np.ndarray[Any, np.dtype[np.intp]]
+
+
+class HeaderLayout:
+    """Flat layout of the table header.
+
+    The header of a table is a tree of entries (see HeaderTree). All exports need the same
+    information from this tree: where each entry is located, how many columns it spans,
+    and which entries are nested within each other. HeaderLayout walks the tree once and
+    stores this information in flat numpy arrays with one element per entry.
+
+    The entries are stored in pre-order (each entry is followed by its sub-entries),
+    first for the lhs and then for the rhs of the header. The roots of both sides
+    (_BASE_LEVEL_) are included, but they are not shown in the table.
+
+    For the following table, the rhs entry Sepal is in row 0 and column 1 and
+    spans 2 columns, while Width is in row 1 and column 2:
+    ```
+    |         |      Sepal     | <- row 0
+    | Species | Length | Width | <- row 1
+    |:--------|-------:|------:|
+    | setosa  |    5.1 |   3.5 |
+    ```
+
+    Attributes:
+        has_lhs (bool): Does the table have row names?
+        max_level (int): highest level of the header entries (including _BASE_LEVEL_)
+        n_rows (int): number of rows of the header
+        lhs_width (int): number of columns of the lhs
+        rhs_width (int): number of columns of the rhs
+        n_cols (int): number of columns of the table
+        names (np.ndarray): name of each entry
+        item_names (np.ndarray): item name of each entry
+        ids (np.ndarray): unique id of each entry. The id is made up of the names of
+            all parents of the entry and the entry itself (e.g., '__BASE_LEVEL__Sepal').
+        side (np.ndarray): LHS (0) or RHS (1)
+        parent (np.ndarray): index of the parent entry or -1 for the roots
+        level (np.ndarray): level of each entry (see HeaderTree.set_width_and_level)
+        width (np.ndarray): number of columns spanned by each entry
+        row (np.ndarray): 0-based row of each entry within the header
+        col (np.ndarray): 0-based column of each entry within the table
+    """
+
+    def __init__(self, lhs: HeaderTree | None, rhs: HeaderTree):
+        """Compile the layout of a table header.
+
+        Args:
+            lhs (HeaderTree | None): tree of the lhs header or None if the table has no row names
+            rhs (HeaderTree): tree of the rhs header
+        """
+        self.has_lhs = lhs is not None
+        self.lhs_width = lhs.width[0] if lhs is not None else 0
+        self.rhs_width = rhs.width[0]
+        self.n_cols = self.lhs_width + self.rhs_width
+        self.max_level = (
+            max(lhs.level[0], rhs.level[0]) if lhs is not None else rhs.level[0]
+        )
+        self.n_rows = self.max_level - 1
+
+        names: list[str] = []
+        item_names: list[str] = []
+        ids: list[str] = []
+        side: list[int] = []
+        parent: list[int] = []
+        level: list[int] = []
+        width: list[int] = []
+        col: list[int] = []
+
+        for root_side, tree, root_col in ((LHS, lhs, 0), (RHS, rhs, self.lhs_width)):
+            if tree is None:
+                continue
+            # The trees are already in pre-order; only the ids and columns are added.
+            # Sub-entries start where their previous sibling ended (next_col).
+            offset = len(names)
+            tree_ids = ['_' + tree.name[0]]
+            tree_cols = [root_col]
+            next_col = [root_col]
+            for index in range(1, len(tree)):
+                tree_parent = tree.parent[index]
+                tree_ids.append(f'{tree_ids[tree_parent]}_{tree.name[index]}')
+                tree_cols.append(next_col[tree_parent])
+                next_col[tree_parent] += tree.width[index]
+                next_col.append(tree_cols[index])
+            names.extend(tree.name)
+            item_names.extend(tree.item_name)
+            ids.extend(tree_ids)
+            side.extend([root_side] * len(tree))
+            parent.extend(p + offset if p >= 0 else -1 for p in tree.parent)
+            level.extend(tree.level)
+            width.extend(tree.width)
+            col.extend(tree_cols)
+
+        self.names: Array = np.array(names, dtype=object)
+        self.item_names: Array = np.array(item_names, dtype=object)
+        self.ids: Array = np.array(ids, dtype=object)
+        self.side: Array = np.array(side, dtype=np.int8)
+        self.parent: Array = np.array(parent, dtype=np.int64)
+        self.level: Array = np.array(level, dtype=np.int64)
+        self.width: Array = np.array(width, dtype=np.int64)
+        self.row: Array = self.max_level - self.level - 1
+        self.col: Array = np.array(col, dtype=np.int64)
+
+        # Sub-entries of each entry: as the entries are in pre-order, sorting the
+        # entries by their parent (stable) keeps the order of the sub-entries.
+        self._children: Index = np.argsort(self.parent, kind='stable')
+        self._children_start: Index = np.searchsorted(
+            self.parent[self._children], np.arange(len(names) + 1)
+        )
+
+    @property
+    def cells(self) -> Index:
+        """Indices of all entries that are shown in the header.
+
+        Returns:
+            np.ndarray: indices of the entries (all but the roots)
+        """
+        return np.flatnonzero(self.parent >= 0)
+
+    @property
+    def merges(self) -> Index:
+        """Indices of all entries that span multiple columns.
+
+        The cells of these entries are merged from col to col + width - 1.
+
+        Returns:
+            np.ndarray: indices of the entries
+        """
+        return np.flatnonzero((self.parent >= 0) & (self.width > 1))
+
+    def children(self, index: int) -> Index:
+        """Indices of the sub-entries of an entry.
+
+        Args:
+            index (int): index of the entry
+
+        Returns:
+            np.ndarray: indices of the sub-entries in order
+        """
+        return self._children[
+            self._children_start[index] : self._children_start[index + 1]
+        ]
+
+    def spanners(self, side: int) -> Index:
+        """Indices of all entries of one side that have sub-entries.
+
+        Args:
+            side (int): LHS or RHS
+
+        Returns:
+            np.ndarray: indices of the entries in pre-order (including the root)
+        """
+        has_children = np.diff(self._children_start) > 0
+        return np.flatnonzero(has_children & (self.side == side))
+
+
+def to_list(values: Array) -> list[Any]:
+    """Translate a one-dimensional array of the layout to a list of Python objects.
+
+    Args:
+        values (Array): one-dimensional array
+
+    Returns:
+        list[Any]: values of the array
+    """
+    return cast(list[Any], values.tolist())
@@ -0,0 +1,292 @@
+"""Recursive-descent parser for the formula syntax of TableSpam.
+
+The grammar of the formulas is small:
+
+.. code-block::
+
+    formula    := ('1' | expression) '~' expression
+    expression := term (('=' | '+') term)*
+    term       := variable | '(' expression ')'
+    variable   := name [':' name]
+    name       := [A-Za-z_][A-Za-z0-9_]* | `quoted name`
+
+Whitespace is allowed between the elements of an expression, but not within a
+variable. The parser returns the same nested lists as the pyparsing grammar that
+was originally used by tablespam (see tests/reference_parser.py): Each expression becomes
+a list of variables and sub-lists, the + is dropped and the = is kept.
+"""
+
+import re
+from typing import NoReturn, Union
+
+RecursiveList = list[Union['RecursiveList', str]]
+
+WHITESPACE = ' \n\t\r'
+SINGLE_NAME = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+# Quoted names may contain any character but new lines. A backtick can be escaped with \.
+QUOTED_NAME = re.compile(r'`(?:(?:\\.)|(?:[^`\n\r\\]))*`')
+# Escape sequences that are translated when a quoted name is unquoted
+ESCAPES = re.compile(r'(\\[tnfr])|\\(.)')
+WHITESPACE_ESCAPES = {r'\t': '\t', r'\n': '\n', r'\f': '\f', r'\r': '\r'}
+# The part of the formula that is shown in error messages
+FOUND = re.compile(r'[^\W_]{1,16}|.')
+
+EXPECTED_TERM = "Expected a variable or '('"
+
+
+class FormulaParseError(ValueError):
+    """Error raised if a formula does not follow the formula syntax.
+
+    The message shows what was expected and where the error occurred, e.g.,
+    `Expected end of text, found '*'  (at char 11), (line:1, col:12)`.
+
+    Attributes:
+        formula (str): the formula that could not be parsed
+        loc (int): 0-based index of the character at which the error occurred
+        msg (str): description of what was expected
+        lineno (int): 1-based line of the error
+        col (int): 1-based column of the error within the line
+        found (str): the part of the formula at which the error occurred
+    """
+
+    def __init__(self, formula: str, loc: int, msg: str):
+        """Create a parse error.
+
+        Args:
+            formula (str): the formula that could not be parsed
+            loc (int): 0-based index of the character at which the error occurred
+            msg (str): description of what was expected
+        """
+        self.formula = formula
+        self.loc = loc
+        self.msg = msg
+        self.lineno = formula.count('\n', 0, loc) + 1
+        if 0 < loc < len(formula) and formula[loc - 1] == '\n':
+            self.col = 1
+        else:
+            self.col = loc - formula.rfind('\n', 0, loc)
+        if not formula:
+            self.found = ''
+        elif loc >= len(formula):
+            self.found = 'end of text'
+        else:
+            match = FOUND.match(formula, loc)
+            text = match.group(0) if match else formula[loc]
+            self.found = repr(text).replace('\\\\', '\\')
+        found = f', found {self.found}' if self.found else ''
+        super().__init__(
+            f'{msg}{found}  (at char {loc}), (line:{self.lineno}, col:{self.col})'
+        )
+
+
+class FormulaParser:
+    """Parser for a single formula.
+
+    Tabs in the formula are expanded to spaces before parsing; the locations in error
+    messages refer to the expanded formula.
+    """
+
+    def __init__(self, formula: str):
+        """Prepare the parser.
+
+        Args:
+            formula (str): formula that should be parsed
+        """
+        self.formula = formula.expandtabs()
+        self.pos = 0
+
+    def parse(self) -> RecursiveList:
+        """Parse the formula.
+
+        Raises:
+            FormulaParseError: Error if the formula does not follow the formula syntax.
+
+        Returns:
+            RecursiveList: '1' or list with the lhs and list with the rhs elements
+        """
+        self.skip_whitespace()
+        lhs: RecursiveList | str
+        if self.formula.startswith('1', self.pos):
+            lhs = '1'
+            self.pos += 1
+        else:
+            lhs = self.expression(expected="Expected '1', a variable or '('")
+        self.expect('~')
+        rhs = self.expression(expected=EXPECTED_TERM)
+        self.skip_whitespace()
+        if self.pos < len(self.formula):
+            self.error('Expected end of text')
+        return [lhs, rhs]
+
+    def expression(self, expected: str) -> RecursiveList:
+        """Parse a sequence of terms separated by = or +.
+
+        Args:
+            expected (str): error message if the expression does not start with a term
+
+        Returns:
+            RecursiveList: list with the terms and =
+        """
+        elements: RecursiveList = []
+        term = self.term()
+        if term is None:
+            self.error(expected)
+        elements.append(term)
+        while True:
+            # An operator that is not followed by a term ends the expression before the
+            # operator; the error is then raised by whatever should follow the expression.
+            start = self.pos
+            self.skip_whitespace()
+            operator = self.formula[self.pos : self.pos + 1]
+            if operator not in ('=', '+'):
+                self.pos = start
+                return elements
+            self.pos += 1
+            try:
+                term = self.term()
+            except FormulaParseError:
+                term = None
+            if term is None:
+                self.pos = start
+                return elements
+            if operator == '=':
+                elements.append(operator)
+            elements.append(term)
+
+    def term(self) -> RecursiveList | str | None:
+        """Parse a variable or an expression in parentheses.
+
+        Returns:
+            RecursiveList | str | None: variable, list with the elements of the expression,
+            or None if there is neither a variable nor an opening parenthesis
+        """
+        self.skip_whitespace()
+        start = self.pos
+        if self.name() is not None:
+            end = self.pos
+            # A variable can be followed by :name to rename it. There must not be
+            # any whitespace around the :
+            if self.formula.startswith(':', self.pos):
+                self.pos += 1
+                if self.name() is None:
+                    self.pos = end
+            return self.formula[start : self.pos]
+        if self.formula.startswith('(', self.pos):
+            self.pos += 1
+            elements = self.expression(expected=EXPECTED_TERM)
+            self.expect(')')
+            return elements
+        return None
+
+    def name(self) -> str | None:
+        """Parse a single name or a quoted name.
+
+        Returns:
+            str | None: the name as found in the formula or None if there is no name
+        """
+        if self.formula.startswith('`', self.pos):
+            match = QUOTED_NAME.match(self.formula, self.pos)
+        else:
+            match = SINGLE_NAME.match(self.formula, self.pos)
+        if match is None:
+            return None
+        self.pos = match.end()
+        return match.group(0)
+
+    def expect(self, token: str) -> None:
+        """Parse a token that must follow.
+
+        Args:
+            token (str): the expected token
+
+        Raises:
+            FormulaParseError: Error if the token is missing.
+        """
+        self.skip_whitespace()
+        if not self.formula.startswith(token, self.pos):
+            self.error(f"Expected '{token}'")
+        self.pos += len(token)
+
+    def skip_whitespace(self) -> None:
+        """Move to the next character that is not a whitespace."""
+        while self.pos < len(self.formula) and self.formula[self.pos] in WHITESPACE:
+            self.pos += 1
+
+    def error(self, msg: str) -> NoReturn:
+        """Raise an error at the current location.
+
+        Args:
+            msg (str): description of what was expected
+
+        Raises:
+            FormulaParseError: always
+        """
+        raise FormulaParseError(formula=self.formula, loc=self.pos, msg=msg)
+
+
+def parse_formula_string(formula: str) -> RecursiveList:
+    """Break down a formula into its elements.
+
+    Args:
+        formula (str): the formula (e.g., 'a + b ~ c + d')
+
+    Returns:
+        RecursiveList: nested lists with the elements of the formula.
+
+    >>> parse_formula_string('a ~ b + (C = c1:`Column 1` + c2)')
+    [['a'], ['b', ['C', '=', 'c1:`Column 1`', 'c2']]]
+    """
+    return FormulaParser(formula).parse()
+
+
+def parse_variable(variable: str) -> tuple[str, str]:
+    """Split a variable into the name shown in the table and the item name.
+
+    Args:
+        variable (str): variable as found in the formula (e.g., 'name:item')
+
+    Raises:
+        FormulaParseError: Error if the variable does not start with a name.
+
+    Returns:
+        tuple[str, str]: name and item name without backticks. If the variable is not
+        renamed, both are the same.
+    """
+    parser = FormulaParser(variable)
+    parser.skip_whitespace()
+    name = parser.name()
+    if name is None:
+        parser.error('Expected a variable')
+    name = unquote(name)
+    parser.skip_whitespace()
+    if parser.formula.startswith(':', parser.pos):
+        parser.pos += 1
+        parser.skip_whitespace()
+        item_name = parser.name()
+        parser.skip_whitespace()
+        if item_name is not None and parser.pos == len(parser.formula):
+            return name, unquote(item_name)
+    return name, name
+
+
+def unquote(name: str) -> str:
+    r"""Remove the backticks from a quoted name and translate escape sequences.
+
+    \t, \n, \f, and \r are translated to the corresponding whitespace. For all other
+    characters, the backslash is removed (e.g., \` becomes `).
+
+    Args:
+        name (str): name as found in the formula
+
+    Returns:
+        str: name without backticks
+    """
+    if not name.startswith('`'):
+        return name
+
+    def translate(match: re.Match[str]) -> str:
+        if match.group(1):
+            return WHITESPACE_ESCAPES[match.group(1)]
+        return match.group(2)
+
+    return ESCAPES.sub(translate, name[1:-1])
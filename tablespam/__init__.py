@@ -7,9 +7,66 @@ formats. To this end, tablespam leverages the awesome packages great_tables
 (https://openpyxl.readthedocs.io/en/stable/).
 """
 
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
 from tablespam.TableSpam import TableSpam
-from tablespam.Excel.xlsx_styles import XlsxStyles, DataStyle, CellStyle, style_color
 from tablespam.GT.formatting import default_formatting
+from tablespam._Formula.Formulas import clear_formula_cache, set_formula_cache_size
+from tablespam._Formula.Parser import FormulaParseError
+
+if TYPE_CHECKING:
+    from tablespam.Excel.xlsx_styles import (
+        XlsxStyles,
+        DataStyle,
+        CellStyle,
+        ConditionalStyle,
+        style_color,
+    )
+    from tablespam.Excel.style_spec import (
+        StyleSpec,
+        FontSpec,
+        BorderSpec,
+        AlignmentSpec,
+    )
+    from tablespam.Excel._as_excel.xlsx_writer import NativeWorkbook
+    from tablespam.Excel.workbook_builder import WorkbookBuilder
+
+# The Excel styles depend on openpyxl, which takes long to import. They are
+# therefore only imported when they are first used (see __getattr__).
+_lazy_exports = {
+    'XlsxStyles': 'tablespam.Excel.xlsx_styles',
+    'DataStyle': 'tablespam.Excel.xlsx_styles',
+    'CellStyle': 'tablespam.Excel.xlsx_styles',
+    'ConditionalStyle': 'tablespam.Excel.xlsx_styles',
+    'style_color': 'tablespam.Excel.xlsx_styles',
+    'StyleSpec': 'tablespam.Excel.style_spec',
+    'FontSpec': 'tablespam.Excel.style_spec',
+    'BorderSpec': 'tablespam.Excel.style_spec',
+    'AlignmentSpec': 'tablespam.Excel.style_spec',
+    'NativeWorkbook': 'tablespam.Excel._as_excel.xlsx_writer',
+    'WorkbookBuilder': 'tablespam.Excel.workbook_builder',
+}
+
+
+def __getattr__(name: str) -> Any:
+    """Import the exports that depend on optional backends when they are first used.
+
+    Args:
+        name (str): name of the export
+
+    Raises:
+        AttributeError: Error if the package has no export with this name.
+
+    Returns:
+        Any: the exported object
+    """
+    if name not in _lazy_exports:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(import_module(_lazy_exports[name]), name)
+    globals()[name] = value
+    return value
+
 
 # Define the exports for the package
 __all__ = [
@@ -17,6 +74,16 @@ __all__ = [
     'XlsxStyles',
     'DataStyle',
     'CellStyle',
+    'ConditionalStyle',
+    'StyleSpec',
+    'FontSpec',
+    'BorderSpec',
+    'AlignmentSpec',
     'style_color',
+    'NativeWorkbook',
+    'WorkbookBuilder',
     'default_formatting',
+    'clear_formula_cache',
+    'set_formula_cache_size',
+    'FormulaParseError',
 ]
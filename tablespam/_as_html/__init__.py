@@ -0,0 +1 @@
+"""Functions to write the tablespam table as HTML."""
@@ -0,0 +1,323 @@
+"""Write TableSpam tables as HTML without great_tables."""
+
+from __future__ import annotations
+from collections.abc import Iterator
+from html import escape
+from typing import TYPE_CHECKING
+
+import numpy as np
+import polars as pl
+import polars.selectors as cs
+
+from tablespam._Formula.Layout import LHS, RHS, to_list
+
+if TYPE_CHECKING:
+    from tablespam.TableSpam import TableSpam
+
+STYLE = (
+    '<style>'
+    '.tablespam{border-collapse:collapse}'
+    '.tablespam th,.tablespam td{padding:2px 8px}'
+    '.tablespam thead th{vertical-align:bottom;border-bottom:1px solid gray}'
+    '.tablespam .tablespam-title,.tablespam .tablespam-subtitle{text-align:left;border-bottom:none}'
+    '.tablespam .tablespam-spanner{text-align:center}'
+    '.tablespam .tablespam-rownames{border-right:1px solid gray}'
+    '.tablespam td.tablespam-rowname{vertical-align:top}'
+    '.tablespam tbody td{text-align:right}'
+    '.tablespam tbody td.tablespam-rowname{text-align:left}'
+    '.tablespam tfoot td{text-align:left;border-top:1px solid gray}'
+    '</style>'
+)
+
+
+def tbl_iter_html(
+    tbl: TableSpam,
+    digits: int = 2,
+    chunk_rows: int = 10_000,
+    merge_rownames: bool = True,
+) -> Iterator[str]:
+    """Translates a TableSpam to lines of HTML.
+
+    The header is created from the header layout of the table. The rows of the body
+    are created chunk by chunk: The cells of each chunk are formatted and escaped in
+    bulk with polars string expressions and combined to one line per row. Only a single
+    chunk of formatted rows is held in memory at a time.
+
+    Args:
+        tbl (TableSpam): TableSpam table
+        digits (int, optional): Number of digits to round floats to. Defaults to 2.
+        chunk_rows (int, optional): number of rows that are formatted at once. Defaults to 10_000.
+        merge_rownames (bool, optional): Should identical row names in consecutive rows be merged?
+            Defaults to True.
+
+    Raises:
+        ValueError: Error if chunk_rows is smaller than 1.
+
+    Yields:
+        str: lines of the HTML table
+    """
+    if chunk_rows < 1:
+        raise ValueError('chunk_rows must be at least 1.')
+    col_data = tbl.table_data['col_data']
+    if col_data is None:
+        raise ValueError("tbl.table_data['col_data'] should not be None.")
+    row_data = tbl.table_data['row_data'] if tbl.layout.has_lhs else None
+    n_cols = tbl.layout.n_cols
+
+    yield STYLE
+    yield '<table class="tablespam">'
+    yield '<thead>'
+    if tbl.title is not None:
+        yield f'<tr><th colspan="{n_cols}" class="tablespam-title">{escape(tbl.title)}</th></tr>'
+    if tbl.subtitle is not None:
+        yield f'<tr><th colspan="{n_cols}" class="tablespam-subtitle">{escape(tbl.subtitle)}</th></tr>'
+    yield from header_lines(tbl)
+    yield '</thead>'
+
+    yield '<tbody>'
+    for offset in range(0, col_data.height, chunk_rows):
+        # The row names and the columns are formatted separately as the same
+        # variable may be used in both.
+        chunk = format_cells(
+            data=col_data.slice(offset, chunk_rows), digits=digits, prefix='rhs'
+        )
+        rownames: list[pl.Expr] = []
+        if row_data is not None:
+            spans = None
+            if merge_rownames:
+                spans = rowname_spans(
+                    row_data=row_data,
+                    offset=offset,
+                    length=min(chunk_rows, row_data.height - offset),
+                )
+            rownames = rowname_cells(width=row_data.width, spans=spans)
+            chunk = pl.concat(
+                [
+                    format_cells(
+                        data=row_data.slice(offset, chunk_rows),
+                        digits=digits,
+                        prefix='lhs',
+                    ),
+                    chunk,
+                ],
+                how='horizontal',
+            )
+        rows = chunk.select(
+            pl.concat_str(
+                [
+                    pl.lit('<tr>'),
+                    *rownames,
+                    pl.lit('<td>'),
+                    pl.concat_str(cs.starts_with('rhs_'), separator='</td><td>'),
+                    pl.lit('</td></tr>'),
+                ]
+            )
+        )
+        yield from rows.to_series()
+    yield '</tbody>'
+
+    if tbl.footnote is not None:
+        yield '<tfoot>'
+        yield f'<tr><td colspan="{n_cols}">{escape(tbl.footnote)}</td></tr>'
+        yield '</tfoot>'
+    yield '</table>'
+
+
+def header_lines(tbl: TableSpam) -> list[str]:
+    """Create the rows of the table header.
+
+    Each entry starts in the row below its parent entry and spans all rows down to its
+    own row (rowspan) as well as the columns of its sub-entries (colspan). The name of
+    the entry is shown at the bottom of the cell. Together, the cells cover each row
+    and column of the header exactly once.
+
+    Args:
+        tbl (TableSpam): TableSpam table
+
+    Returns:
+        list[str]: one line per row of the header
+    """
+    layout = tbl.layout
+    entries = layout.cells
+    # The roots start above the first row of the header
+    parent_row = np.where(
+        layout.parent[layout.parent[entries]] < 0,
+        -1,
+        layout.row[layout.parent[entries]],
+    )
+    start_row = parent_row + 1
+    row_span = layout.row[entries] - parent_row
+    is_spanner = np.isin(
+        entries, np.concatenate([layout.spanners(LHS), layout.spanners(RHS)])
+    )
+    # The last column of the row names is separated from the data
+    is_rowname_end = (layout.side[entries] == LHS) & (
+        layout.col[entries] + layout.width[entries] == layout.lhs_width
+    )
+
+    rows: list[list[tuple[int, str]]] = [[] for _ in range(layout.n_rows)]
+    for row, col, name, width, span, spanner, rowname_end in zip(
+        to_list(start_row),
+        to_list(layout.col[entries]),
+        to_list(layout.names[entries]),
+        to_list(layout.width[entries]),
+        to_list(row_span),
+        to_list(is_spanner),
+        to_list(is_rowname_end),
+    ):
+        attributes = ''
+        if width > 1:
+            attributes += f' colspan="{width}"'
+        if span > 1:
+            attributes += f' rowspan="{span}"'
+        classes = []
+        if spanner:
+            classes.append('tablespam-spanner')
+        if rowname_end:
+            classes.append('tablespam-rownames')
+        if classes:
+            attributes += f' class="{" ".join(classes)}"'
+        rows[row].append((col, f'<th{attributes}>{escape(name)}</th>'))
+    return ['<tr>' + ''.join(cell for _, cell in sorted(row)) + '</tr>' for row in rows]
+
+
+def format_cells(data: pl.DataFrame, digits: int, prefix: str) -> pl.DataFrame:
+    """Translate all cells of a data frame to escaped HTML text.
+
+    Args:
+        data (pl.DataFrame): data that should be shown in the table
+        digits (int): Number of digits to round floats to.
+        prefix (str): prefix of the column names of the result
+
+    Returns:
+        pl.DataFrame: data frame with string columns named by the prefix and their position
+    """
+    formatted = data.with_columns(cs.float().round(digits)).select(
+        escape_html(pl.all().cast(pl.String).fill_null(''))
+    )
+    formatted.columns = [f'{prefix}_{index}' for index in range(formatted.width)]
+    return formatted
+
+
+def escape_html(text: pl.Expr) -> pl.Expr:
+    """Replace the characters that have a special meaning in HTML.
+
+    Args:
+        text (pl.Expr): expression with strings
+
+    Returns:
+        pl.Expr: expression with escaped strings (see html.escape)
+    """
+    for character, replacement in (
+        ('&', '&amp;'),
+        ('<', '&lt;'),
+        ('>', '&gt;'),
+        ('"', '&quot;'),
+        ("'", '&#x27;'),
+    ):
+        text = text.str.replace_all(character, replacement, literal=True)
+    return text
+
+
+def rowname_spans(row_data: pl.DataFrame, offset: int, length: int) -> pl.DataFrame:
+    """Find the number of rows spanned by each row name in a chunk of rows.
+
+    Row names are merged if they and all row names to their left are identical to
+    those of the previous row (see also row_data_cell_ids of the Excel export). Only the
+    chunk, the row before it, and the rows that continue a run starting in the chunk are
+    read, so the memory does not grow with the number of rows in the table.
+
+    Args:
+        row_data (pl.DataFrame): data of the row names
+        offset (int): index of the first row of the chunk
+        length (int): number of rows in the chunk
+
+    Returns:
+        pl.DataFrame: For each row name column, the number of rows spanned by the
+            cell in each row of the chunk. Rows that are merged into the cell above
+            (also in a previous chunk) have a span of 0.
+    """
+    # The row before the chunk decides if the first row continues a run
+    start = max(offset - 1, 0)
+    window = row_data.slice(start, offset + length - start)
+    spans = {}
+    for co in range(row_data.width):
+        columns = row_data.columns[: co + 1]
+        ids = window.select(pl.struct(columns).rle_id()).to_series().to_numpy()
+        is_first = np.concatenate(([True], ids[1:] != ids[:-1]))
+        span = np.where(is_first, np.bincount(ids)[ids], 0)[offset - start :]
+        first_rows = np.flatnonzero(span)
+        if first_rows.size > 0:
+            # The last run that starts in the chunk may continue after it
+            span[first_rows[-1]] += continued_rows(
+                row_data=row_data.select(columns),
+                position=offset + length,
+                block_rows=length,
+            )
+        spans[f'span_{co}'] = pl.Series(span, dtype=pl.Int64)
+    return pl.DataFrame(spans)
+
+
+def continued_rows(row_data: pl.DataFrame, position: int, block_rows: int) -> int:
+    """Count the rows that continue the run of row names of the row before a position.
+
+    Args:
+        row_data (pl.DataFrame): row name columns that are compared
+        position (int): index of the first row that is compared with the row before it
+        block_rows (int): number of rows that are compared at once
+
+    Returns:
+        int: number of consecutive rows from position on that are identical to the row
+            before position
+    """
+    count = 0
+    while position + count < row_data.height:
+        block = row_data.slice(position + count - 1, block_rows + 1)
+        ids = block.select(pl.struct(block.columns).rle_id()).to_series()
+        continued = int((ids == 0).sum()) - 1
+        count += continued
+        if continued < block.height - 1:
+            break
+    return count
+
+
+def rowname_cells(width: int, spans: pl.DataFrame | None) -> list[pl.Expr]:
+    """Create expressions for the row name cells of a chunk of rows.
+
+    Args:
+        width (int): number of row name columns
+        spans (pl.DataFrame | None): spans of the row names in the chunk (see rowname_spans)
+            or None if the row names should not be merged
+
+    Returns:
+        list[pl.Expr]: one expression per row name column. The expressions must be
+            evaluated on the row names formatted with format_cells (prefix 'lhs').
+    """
+    cells = []
+    for co in range(width):
+        classes = 'tablespam-rowname'
+        if co == width - 1:
+            classes += ' tablespam-rownames'
+        cell = pl.concat_str(
+            pl.lit(f'<td class="{classes}">'), pl.col(f'lhs_{co}'), pl.lit('</td>')
+        )
+        if spans is None:
+            cells.append(cell)
+            continue
+        span = pl.lit(spans.get_column(f'span_{co}'))
+        cells.append(
+            pl.when(span == 0)
+            .then(pl.lit(''))
+            .when(span == 1)
+            .then(cell)
+            .otherwise(
+                pl.concat_str(
+                    pl.lit('<td rowspan="'),
+                    span.cast(pl.String),
+                    pl.lit(f'" class="{classes}">'),
+                    pl.col(f'lhs_{co}'),
+                    pl.lit('</td>'),
+                )
+            )
+        )
+    return cells
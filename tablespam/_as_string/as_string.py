@@ -1,13 +1,16 @@
 """Functions to print the TableSpam to the console."""
 
 from __future__ import annotations  # noqa: D100
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING
+from collections.abc import Iterator
 import numpy as np
 import polars as pl
+import polars.selectors as cs
+
+from tablespam._Formula.Layout import RHS, to_list
 
 if TYPE_CHECKING:
     from tablespam.TableSpam import TableSpam
-    from tablespam._Formula.Entry import HeaderEntry
 
 
 def tbl_as_string(
@@ -24,184 +27,184 @@ def tbl_as_string(
     Returns:
         str: String describing the table
     """
-    if tbl.table_data['col_data'] is None:
-        raise ValueError("tbl.table_data['col_data'] should not be None.")
+    lines = tbl_iter_lines(tbl=tbl, digits=digits, n=n, max_char=max_char)
+    return '\n'.join(lines) + '\n'
 
-    if tbl.header['lhs'] is not None:
-        max_level = max(tbl.header['lhs'].level, tbl.header['rhs'].level)
-        max_col = tbl.header['lhs'].width + tbl.header['rhs'].width
-    else:
-        max_level = tbl.header['rhs'].level
-        max_col = tbl.header['rhs'].width
-
-    header_table = np.full(
-        (
-            max_level + min(n, tbl.table_data['col_data'].height),
-            max_col + (tbl.header['lhs'] is not None),
-        ),
-        '',
-        dtype=f'<U{max_char}',
-    )
 
-    if tbl.header['lhs'] is not None:
-        header_table = insert_header_entries(
-            header_partial=tbl.header['lhs'],
-            max_level=max_level,
-            column_offset=1,
-            header_table=header_table,
-        )
-        column_offset = tbl.header['lhs'].width + 2
-    else:
-        column_offset = 1
-
-    header_table = insert_header_entries(
-        header_partial=tbl.header['rhs'],
-        max_level=max_level,
-        column_offset=column_offset,
-        header_table=header_table,
-    )
+def tbl_iter_lines(
+    tbl: TableSpam,
+    digits: int = 2,
+    n: int | None = None,
+    max_char: int = 30,
+    batch_size: int = 10_000,
+) -> Iterator[str]:
+    """Translates a TableSpam to lines of text.
 
-    # add data
-    rws = range(max_level, max_level + min(n, tbl.table_data['col_data'].height))
-
-    if tbl.header['lhs'] is not None:
-        if tbl.table_data['row_data'] is None:
-            raise ValueError("tbl.table_data['row_data'] should not be None.")
-        cls = range(0, tbl.table_data['row_data'].width)
-        df_transformed = tbl.table_data['row_data'].head(n=n)
-        # Round all floats
-        for c_n in [
-            c
-            for c in df_transformed.columns
-            if df_transformed[c].dtype in [pl.Float32, pl.Float64]
-        ]:
-            df_transformed = df_transformed.with_columns(pl.col(c_n).round(digits))
-        # Cast all columns to string
-        for c_n in df_transformed.columns:
-            df_transformed = df_transformed.with_columns(pl.col(c_n).cast(pl.String))
-
-        header_table[np.ix_(rws, cls)] = df_transformed.to_numpy()
-
-        # add vertical line
-        header_table[:, max(cls) + 1] = '|'
-
-        cls = range(max(cls) + 2, tbl.table_data['col_data'].width + max(cls) + 2)
-    else:
-        cls = range(tbl.table_data['col_data'].width)
-
-    df_transformed = tbl.table_data['col_data'].head(n=n)
-    # Round all floats
-    for c_n in [
-        c
-        for c in df_transformed.columns
-        if df_transformed[c].dtype in [pl.Float32, pl.Float64]
-    ]:
-        df_transformed = df_transformed.with_columns(pl.col(c_n).round(digits))
-    # Cast all columns to string
-    for c_n in df_transformed.columns:
-        df_transformed = df_transformed.with_columns(pl.col(c_n).cast(pl.String))
-
-    header_table[np.ix_(rws, cls)] = df_transformed.to_numpy()
-
-    # add ...
-    if n < tbl.table_data['col_data'].shape[0]:
-        header_table = np.vstack(
-            [
-                header_table,
-                np.full(
-                    (1, header_table.shape[1]),
-                    '...',
-                    dtype=f'<U{max_char}',
-                ),
-            ]
-        )
-        # This also replaces the vertical line between the rownames and the data with ..., so
-        # we have to reintroduce the |.
-        if tbl.table_data['row_data'] is not None:
-            header_table[
-                header_table.shape[0] - 1, tbl.table_data['row_data'].shape[1]
-            ] = '|'
-
-    # Add horizontal line. We need the number of characters in
-    # each column
-    max_lengths = np.vectorize(len)(header_table).max(axis=0)
-
-    # Create strings of dashes of corresponding lengths
-    header_table[max_level - 1, :] = np.array(
-        ['-' * length for length in max_lengths],
-        dtype=f'<U{max_char}',
-    )
+    The data are processed in batches of rows: A first pass over all batches finds the
+    width of each column, a second pass formats the rows and yields the lines of each
+    batch. The cells are formatted and padded in bulk with polars string expressions.
+    Only a single batch of formatted rows is held in memory at a time.
 
-    # set the length of each string to be the same
-    header_table = np.array(
-        [
-            [item.ljust(max_lengths[col_idx]) for col_idx, item in enumerate(row)]
-            for row in header_table
-        ],
-        dtype=f'<U{max_char}',
-    )
+    Args:
+        tbl (TableSpam): TableSpam table
+        digits (int, optional): Number of digits to round floats to. Defaults to 2.
+        n (int | None, optional): number of rows from the data set to print. Defaults to None (all rows).
+        max_char (int, optional): number of characters that each cell at maximum is allows to have. Defaults to 30.
+        batch_size (int, optional): number of rows that are formatted at once. Defaults to 10_000.
 
-    # add vertical lines to the left and right of the table
-    header_table = np.hstack(
-        [
-            np.hstack([np.full((header_table.shape[0], 1), '|'), header_table]),
-            np.full(
-                (header_table.shape[0], 1),
-                '|',
-                dtype=f'<U{max_char}',
-            ),
-        ]
-    )
+    Raises:
+        ValueError: Error if batch_size is smaller than 1.
 
-    # actual printing
-    tbl_string = ''
-    if tbl.title is not None:
-        tbl_string = f'{tbl_string}{tbl.title}\n'
-    if tbl.subtitle is not None:
-        tbl_string = f'{tbl_string}{tbl.subtitle}\n'
+    Yields:
+        str: lines of the table without line breaks
+    """
+    if batch_size < 1:
+        raise ValueError('batch_size must be at least 1.')
+    col_data = tbl.table_data['col_data']
+    if col_data is None:
+        raise ValueError("tbl.table_data['col_data'] should not be None.")
+    row_data = tbl.table_data['row_data']
+
+    layout = tbl.layout
+    # With row names, the lhs and rhs are separated by an additional column with |
+    sep_col = layout.lhs_width if layout.has_lhs else None
+    if sep_col is not None and row_data is None:
+        raise ValueError("tbl.table_data['row_data'] should not be None.")
+    n_cols = layout.n_cols + layout.has_lhs
+    data_cols = [col for col in range(n_cols) if col != sep_col]
+    n_rows = col_data.height if n is None else min(n, col_data.height)
+
+    def batches() -> Iterator[pl.DataFrame]:
+        # The row names and the columns are formatted separately as the same
+        # variable may be used in both.
+        for offset in range(0, n_rows, batch_size):
+            length = min(batch_size, n_rows - offset)
+            formatted = []
+            if sep_col is not None and row_data is not None:
+                formatted.append(
+                    format_data(
+                        data=row_data.slice(offset, length),
+                        digits=digits,
+                        max_char=max_char,
+                        prefix='lhs',
+                    )
+                )
+            formatted.append(
+                format_data(
+                    data=col_data.slice(offset, length),
+                    digits=digits,
+                    max_char=max_char,
+                    prefix='rhs',
+                )
+            )
+            yield pl.concat(formatted, how='horizontal')
+
+    # Header: the rhs entries are shifted by one column if there is a separator
+    entries = layout.cells
+    header_rows = layout.row[entries]
+    header_cols = layout.col[entries] + layout.has_lhs * (layout.side[entries] == RHS)
+    header_names = [name[:max_char] for name in to_list(layout.names[entries])]
+
+    widths = np.zeros(n_cols, dtype=np.int64)
+    np.maximum.at(widths, header_cols, [len(name) for name in header_names])
+
+    # First pass: widths of the data
+    for data in batches():
+        data_widths = data.select(pl.all().str.len_chars().max()).row(0)
+        widths[data_cols] = np.maximum(widths[data_cols], data_widths)
+
+    is_truncated = n_rows < col_data.height
+    ellipsis = '...'[:max_char]
+    if is_truncated:
+        widths[data_cols] = np.maximum(widths[data_cols], len(ellipsis))
+    if sep_col is not None:
+        widths[sep_col] = len('|'[:max_char])
+    width_list: list[int] = widths.tolist()
+
+    for title in (tbl.title, tbl.subtitle):
+        if title is not None:
+            yield title
+    yield ''
+
+    header_table = np.full((layout.max_level - 1, n_cols), '', dtype=object)
+    header_table[header_rows, header_cols] = header_names
+    if sep_col is not None:
+        header_table[:, sep_col] = '|'
+    for row in header_table.tolist():
+        yield pad_row(row, width_list)
+
+    yield pad_row(['-' * width for width in width_list], width_list)
+
+    # Second pass: lines of the data
+    for data in batches():
+        yield from data_lines(data=data, widths=width_list, sep_col=sep_col)
+
+    if is_truncated:
+        row = [ellipsis] * n_cols
+        if sep_col is not None:
+            row[sep_col] = '|'
+        yield pad_row(row, width_list)
 
-    for row in header_table:
-        tbl_string = f"{tbl_string}\n{(' '.join(f'{x}' for x in row))}"
+    if tbl.footnote is not None:
+        yield tbl.footnote
 
-    tbl_string = f'{tbl_string}\n'
 
-    if tbl.footnote is not None:
-        tbl_string = f'{tbl_string}{tbl.footnote}\n'
+def format_data(
+    data: pl.DataFrame, digits: int, max_char: int, prefix: str
+) -> pl.DataFrame:
+    """Translate all cells of a data frame to strings.
 
-    return tbl_string
+    Args:
+        data (pl.DataFrame): data that should be printed
+        digits (int): Number of digits to round floats to.
+        max_char (int): number of characters that each cell at maximum is allows to have.
+        prefix (str): prefix of the column names of the result
+
+    Returns:
+        pl.DataFrame: data frame with string columns named by the prefix and their position
+    """
+    formatted = data.with_columns(cs.float().round(digits)).select(
+        pl.all().cast(pl.String).fill_null('None').str.slice(0, max_char)
+    )
+    formatted.columns = [f'{prefix}_{index}' for index in range(formatted.width)]
+    return formatted
 
 
-def insert_header_entries(
-    header_partial: HeaderEntry,
-    max_level: int,
-    column_offset: int,
-    header_table: np.ndarray[tuple[Any, Any], np.dtype[Any]],
-) -> np.ndarray[tuple[Any, Any], np.dtype[Any]]:
-    """Insert specific entries into the table.
+def data_lines(data: pl.DataFrame, widths: list[int], sep_col: int | None) -> list[str]:
+    """Pad the formatted cells and combine them to the lines of the table.
 
     Args:
-        header_partial (HeaderEntry): header entry to insert
-        max_level (int): maximal number of levels in the table header
-        column_offset (int): offset used to specify which column to write to
-        header_table (np.ndarray): array filled recursively
+        data (pl.DataFrame): data frame returned by format_data
+        widths (list[int]): width of each column of the table, including the separator
+        sep_col (int | None): index of the column separating row names and data
 
     Returns:
-        np.ndarray: array with header
+        list[str]: one line per row of the data
     """
-    if header_partial.name != '_BASE_LEVEL_':
-        # We have to take the 0-based indexing into account:
-        header_table[max_level - header_partial.level - 1, column_offset - 1] = (
-            header_partial.name
+    if sep_col is not None:
+        data = data.clone().insert_column(
+            sep_col, pl.repeat('|', data.height, eager=True).alias('sep')
         )
+    # Columns with the same width are padded with a single expression
+    columns_by_width: dict[int, list[str]] = {}
+    for column, width in zip(data.columns, widths):
+        columns_by_width.setdefault(width, []).append(column)
+    lines = data.with_columns(
+        pl.col(columns).str.pad_end(width)
+        for width, columns in columns_by_width.items()
+    ).select(pl.concat_str([pl.lit('|'), pl.all(), pl.lit('|')], separator=' '))
+    return lines.to_series().to_list()
 
-    if header_partial.entries is not None:
-        for i in range(len(header_partial.entries)):
-            header_table = insert_header_entries(
-                header_partial=header_partial.entries[i],
-                max_level=max_level,
-                column_offset=column_offset,
-                header_table=header_table,
-            )
-            column_offset = column_offset + header_partial.entries[i].width
 
-    return header_table
+def pad_row(row: list[str], widths: list[int]) -> str:
+    """Pad the cells of a single row and combine them to a line of the table.
+
+    Args:
+        row (list[str]): cells of the row
+        widths (list[int]): width of each column
+
+    Returns:
+        str: line of the table
+    """
+    cells = ' '.join(cell.ljust(width) for cell, width in zip(row, widths))
+    return f'| {cells} |'
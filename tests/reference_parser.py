@@ -0,0 +1,126 @@
+"""Reference implementation of the formula parser based on pyparsing.
+
+tablespam parses formulas with the dependency-free parser in tablespam/_Formula/Parser.py.
+This module keeps the original pyparsing grammar, which is used to test that both
+parsers agree. It is not part of the package; pyparsing is only required for the tests.
+"""
+
+from functools import cache
+
+import pyparsing as pyp
+
+from tablespam._Formula.Parser import RecursiveList
+
+
+def reference_parse_formula(formula: str) -> RecursiveList:
+    """Break down a formula into its elements with pyparsing.
+
+    Args:
+        formula (str): the formula (e.g., 'a + b ~ c + d')
+
+    Returns:
+        RecursiveList: nested lists with the elements of the formula.
+    """
+    parsed_formula: RecursiveList = define_parser().parseString(formula).asList()
+    return parsed_formula
+
+
+def reference_split_variable(var: str) -> tuple[str, str]:
+    """Split a variable into the name shown in the table and the item name with pyparsing.
+
+    Args:
+        var (str): variable as found in the formula (e.g., 'name:item')
+
+    Returns:
+        tuple[str, str]: name and item name without backticks
+    """
+    variable, variable_with_name = define_split_variable()
+    if variable_with_name.matches(var):
+        result = variable_with_name.parseString(var).asList()
+        return result[0], result[1]
+    result = variable.parseString(var).asList()
+    return result[0], result[0]
+
+
+@cache
+def define_split_variable() -> tuple[pyp.core.ParserElement, pyp.core.ParserElement]:
+    """Internal function defining the patterns used to split variables into name and item.
+
+    The patterns are only created once.
+
+    Returns:
+        tuple[pyp.core.ParserElement, pyp.core.ParserElement]: pyparsing patterns for
+        single variables and for variables with name (name:item)
+    """
+    variable = pyp.Word(
+        pyp.alphas + '_', pyp.alphas + pyp.nums + '_'
+    ) | pyp.QuotedString('`', escChar='\\', unquote_results=True)
+    variable_with_name = variable + pyp.Suppress(':') + variable
+    return variable, variable_with_name
+
+
+def define_variable() -> pyp.core.Combine:
+    """Internal function defining the pattern that variables can have for pyparsing.
+
+    Returns:
+        pyp.core.Combine: pyparsing pattern for variables
+    """
+    # Match regular variable names:
+    #  Variable names must start with a letter or underscore, followed
+    #  by any combination of letters, numbers, and underscores.
+    single_variable = pyp.Word(pyp.alphas + '_', pyp.alphas + pyp.nums + '_')
+
+    # We also want to allow for labels with spaces and special characters in them. This is
+    # mostly required for renaming columns:
+    #  Any variable in `` will be seen as one variable
+    quoted_variable = pyp.QuotedString('`', escChar='\\', unquoteResults=False)
+    base_variable = single_variable | quoted_variable
+
+    # Match colon-separated variable patterns
+    variable = pyp.Combine(base_variable + pyp.Optional(':' + base_variable))
+
+    return variable
+
+
+def define_operators() -> pyp.core.ParserElement:
+    """Internal function describing the pyparsing pattern for operators (+, :) used in the formulas.
+
+    Returns:
+        pyp.core.ParserElement: pyparsing definition of operators
+    """
+    # Operator definitions
+    # We only need the following operators:
+    #  = separates the name of a spanner from the spanner content
+    #  + separates elements within a spanner
+    equal = pyp.one_of('=')
+    plus = pyp.Suppress('+')
+    operator = equal | plus
+
+    return operator
+
+
+@cache
+def define_parser() -> pyp.core.ParserElement:
+    """Internal function defining the full syntax for the formula parser used to decipher the R-style formula.
+
+    The parser is only created once per process and shared by all formulas.
+
+    Returns:
+        pyp.core.ParserElement: pyparsing definition
+    """
+    # Define a forward-declared grammar
+    expr = pyp.Forward()
+
+    # Additionally, we need braces that define groups which will form a spanner.
+    # Note that the group itself may contain the expression again, so we have a
+    # recursive algorithm
+    term = define_variable() | pyp.Group(pyp.Suppress('(') + expr + pyp.Suppress(')'))
+    expr <<= term + pyp.ZeroOrMore(define_operators() + term)  # Recursive expression
+    full_expression = (
+        ('1' | pyp.Group(expr).setResultsName('lhs'))
+        + pyp.Suppress('~')
+        + pyp.Group(expr).setResultsName('rhs')
+        + pyp.StringEnd()
+    )
+
+    return full_expression
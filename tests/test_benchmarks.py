@@ -0,0 +1,33 @@
+import json
+import polars as pl
+from benchmarks.data import DTYPES, TableSize, make_data, make_formula
+from benchmarks.run import OPERATIONS, benchmark_case
+from tablespam import TableSpam
+
+
+def test_synthetic_table():
+    size = TableSize(
+        rows=50, cols=10, lhs_depth=2, nesting=2, group_size=3, dtypes=DTYPES
+    )
+    data = make_data(size)
+    assert data.columns == ['group_0', 'group_1'] + [f'col_{i}' for i in range(10)]
+    assert data.schema['col_3'] == pl.Date
+    assert data.select(['group_0', 'group_1']).equals(
+        data.select(['group_0', 'group_1']).sort(pl.all())
+    )
+
+    tbl = TableSpam(data=data, formula=make_formula(size))
+    assert tbl.layout.n_rows == 3
+    assert tbl.layout.n_cols == 12
+
+    assert (
+        make_formula(TableSize(cols=2, lhs_depth=0, nesting=0))
+        == '1 ~ col_0 + `Col 1`:col_1'
+    )
+
+
+def test_benchmark_case():
+    results = benchmark_case(TableSize(rows=20, cols=4), repeat=2)
+    assert list(results) == OPERATIONS
+    assert all(len(times) == 2 for times in results.values())
+    json.dumps(results)
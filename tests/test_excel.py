@@ -1,12 +1,368 @@
 from tablespam.Excel._as_excel.create_test_files import create_test_files_cars
+from tablespam.Excel._as_excel import overflow
 from tablespam.Excel._as_excel.locations import Locations
+from tablespam.Excel._as_excel.compose import (
+    StyleCompositor,
+    row_data_cell_ids,
+    rowname_merge_ranges,
+)
+import dataclasses
+import io
 import openpyxl
+import pickle
+import zipfile
+from copy import copy
+from datetime import date, datetime, time, timedelta
 import polars as pl
+import pytest
+from tablespam import (
+    TableSpam,
+    NativeWorkbook,
+    WorkbookBuilder,
+    XlsxStyles,
+    CellStyle,
+    ConditionalStyle,
+    DataStyle,
+    style_color,
+)
+from tablespam.Excel.style_spec import (
+    AlignmentSpec,
+    BorderSpec,
+    FontSpec,
+    StyleSpec,
+    openpyxl_font,
+)
+from tablespam.Excel.xlsx_styles import is_double
+from tablespam.Data.mtcars import mtcars
 
 
 def test_excel(tmp_path):
     test_xlsx = create_test_files_cars()
+    compare_with_reference(test_xlsx, tmp_path)
 
+
+def test_excel_stream(tmp_path):
+    test_xlsx = create_test_files_cars(mode='stream')
+    compare_with_reference(test_xlsx, tmp_path)
+
+
+def test_excel_stream_requires_write_only(tmp_path):
+    tbl = TableSpam(data=mtcars(), formula='cyl ~ mpg + hp')
+    with pytest.raises(ValueError):
+        tbl.as_excel(workbook=openpyxl.Workbook(), mode='stream')
+
+    wb = tbl.as_excel(mode='stream')
+    with pytest.raises(ValueError):
+        tbl.as_excel(workbook=wb, mode='stream')
+    # Write-only workbooks warn when they are discarded without being saved.
+    wb.save(io.BytesIO())
+
+    with pytest.raises(ValueError):
+        tbl.as_excel(mode='unknown')
+
+
+@pytest.mark.parametrize('mode', ['default', 'stream'])
+def test_excel_date_formats(mode):
+    data = pl.DataFrame(
+        {
+            'group': ['a', 'b', 'c'],
+            'date': [date(2020, 1, 1), None, date(2024, 2, 29)],
+            'datetime': [datetime(2020, 1, 1, 12), datetime(1970, 1, 1), None],
+            'float': [0.5, 1.5, None],
+        }
+    )
+    tbl = TableSpam(data=data, formula='group ~ date + datetime + float')
+    file = io.BytesIO()
+    tbl.as_excel(mode=mode).save(file)
+    sheet = openpyxl.load_workbook(file)['Table']
+    formats = [
+        [(cell.number_format, cell.is_date) for cell in row]
+        for row in sheet.iter_rows(min_row=2, max_row=4, min_col=2, max_col=4)
+    ]
+    # Cells without value keep the default format
+    assert formats == [
+        [('yyyy-mm-dd', True), ('yyyy-mm-dd h:mm:ss', True), ('0.00', False)],
+        [('General', False), ('yyyy-mm-dd h:mm:ss', True), ('0.00', False)],
+        [('yyyy-mm-dd', True), ('General', False), ('0.00', False)],
+    ]
+
+
+def test_excel_native(tmp_path):
+    test_xlsx = create_test_files_cars(backend='native')
+    compare_with_reference(test_xlsx, tmp_path)
+
+
+def test_excel_native_requires_native_workbook():
+    tbl = TableSpam(data=mtcars(), formula='cyl ~ mpg + hp')
+    with pytest.raises(ValueError):
+        tbl.as_excel(mode='stream', backend='native')
+    with pytest.raises(ValueError):
+        tbl.as_excel(workbook=openpyxl.Workbook(), backend='native')
+    with pytest.raises(ValueError):
+        tbl.as_excel(backend='unknown')
+
+    wb = tbl.as_excel(backend='native')
+    with pytest.raises(ValueError):
+        tbl.as_excel(workbook=wb)
+    with pytest.raises(ValueError):
+        tbl.as_excel(workbook=wb, sheet='table', backend='native')
+    tbl.as_excel(workbook=wb, sheet='Second', backend='native')
+    assert wb.sheetnames == ['Table', 'Second']
+
+    with pytest.raises(ValueError, match='at least one table'):
+        NativeWorkbook().save(io.BytesIO())
+
+
+def test_excel_native_data_types(tmp_path):
+    data = pl.DataFrame(
+        {
+            'group': ['a', 'a', 'b', None],
+            'text': [' x', '', None, 'a&<b>"'],
+            'category': pl.Series(['x', 'y', 'x', None], dtype=pl.Categorical),
+            'float': [0.1 + 0.2, float('nan'), None, 1e300],
+            'int': [1, 2**60, None, -3],
+            'bool': [True, False, None, True],
+            'date': [date(1900, 1, 1), date(1900, 3, 1), None, date(2024, 2, 29)],
+            'datetime': [
+                datetime(1900, 2, 28, 23, 59, 59, 999999),
+                datetime(2024, 1, 1, 12),
+                None,
+                datetime(1970, 1, 1),
+            ],
+            'time': [time(0), time(12, 30, 15, 123456), None, time(23, 59, 59)],
+            'duration': [
+                timedelta(seconds=3703.7034),
+                timedelta(days=-1),
+                None,
+                timedelta(0),
+            ],
+        }
+    )
+    tbl = TableSpam(
+        data=data,
+        formula='group ~ text + category + float + int + bool + date + datetime + time + duration',
+    )
+    tbl.as_excel().save(f'{tmp_path}/default.xlsx')
+    tbl.as_excel(mode='stream').save(f'{tmp_path}/stream.xlsx')
+    tbl.as_excel(backend='native').save(f'{tmp_path}/native.xlsx')
+    tbl.write_excel(f'{tmp_path}/write_excel.xlsx')
+    # The reference was created with openpyxl cells, which set the number format of
+    # dates and times
+    target = openpyxl.load_workbook('tests/data/data_types.xlsx')['Table']
+    for file in ['default', 'stream', 'native', 'write_excel']:
+        to_test = openpyxl.load_workbook(f'{tmp_path}/{file}.xlsx')['Table']
+        for row in target.iter_rows():
+            for cell in row:
+                other = to_test.cell(row=cell.row, column=cell.column)
+                assert (cell.value, cell.data_type) == (other.value, other.data_type)
+                assert cell.number_format == other.number_format
+                assert copy(cell.font) == copy(other.font)
+                assert copy(cell.border) == copy(other.border)
+
+    with pytest.raises(TypeError):
+        TableSpam(
+            data=pl.DataFrame({'x': [datetime(2024, 1, 1)]}).with_columns(
+                pl.col('x').dt.replace_time_zone('UTC')
+            ),
+            formula='1 ~ x',
+        ).as_excel(backend='native')
+
+
+class UnseekableStream(io.RawIOBase):
+    # e.g., the body of an HTTP response
+    def __init__(self):
+        self.buffer = io.BytesIO()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return self.buffer.write(data)
+
+
+def test_write_excel(tmp_path):
+    tbl = create_test_files_cars().tbls['cars_complex_merge']
+    tbl.as_excel(backend='native').save(f'{tmp_path}/target.xlsx')
+    target = openpyxl.load_workbook(f'{tmp_path}/target.xlsx')['Table']
+
+    tbl.write_excel(f'{tmp_path}/path.xlsx')
+    stream = UnseekableStream()
+    tbl.write_excel(stream)
+    for file in [f'{tmp_path}/path.xlsx', io.BytesIO(stream.buffer.getvalue())]:
+        to_test = openpyxl.load_workbook(file)['Table']
+        assert to_test.merged_cells.ranges == target.merged_cells.ranges
+        for row in target.iter_rows():
+            for cell in row:
+                other = to_test.cell(row=cell.row, column=cell.column)
+                assert cell.value == other.value
+                assert copy(cell.border) == copy(other.border)
+
+    with pytest.raises(ValueError):
+        tbl.write_excel(io.BytesIO(), sheet='a/b')
+
+
+def test_excel_zip64(tmp_path, monkeypatch):
+    # Sheets that exceed the size limit of regular zip entries need ZIP64 extensions
+    monkeypatch.setattr(zipfile, 'ZIP64_LIMIT', 1000)
+    tbl = TableSpam(data=mtcars(), formula='cyl ~ mpg + hp')
+    files = [f'{tmp_path}/native.xlsx']
+    tbl.as_excel(backend='native').save(files[0])
+    files.append(f'{tmp_path}/write_excel.xlsx')
+    tbl.write_excel(files[1])
+    stream = UnseekableStream()
+    tbl.write_excel(stream)
+    files.append(io.BytesIO(stream.buffer.getvalue()))
+    builder = WorkbookBuilder()
+    builder.add(tbl, sheet='Table')
+    files.append(f'{tmp_path}/builder.xlsx')
+    builder.save(files[-1], max_workers=1)
+    for file in files:
+        sheet = openpyxl.load_workbook(file)['Table']
+        assert sheet['B33'].value == mtcars()['mpg'][-1]
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_workbook_builder(tmp_path, max_workers):
+    cars = mtcars()
+    bold = StyleSpec(font=FontSpec(bold=True), fill='FF0000')
+    jobs = [
+        (TableSpam(data=cars, formula='cyl ~ mpg + hp', title='Cars'), None),
+        (
+            TableSpam(data=cars, formula='Gears:gear + am ~ hp + wt', footnote='Note'),
+            style_color('008080'),
+        ),
+        (
+            TableSpam(data=cars.with_columns(name=pl.lit('car')), formula='name ~ mpg'),
+            XlsxStyles(
+                cell_styles=[
+                    ConditionalStyle(
+                        cols=['mpg'], style=bold, condition=pl.col('mpg') > 20
+                    )
+                ]
+            ),
+        ),
+    ]
+    builder = WorkbookBuilder()
+    for index, (tbl, styles) in enumerate(jobs):
+        builder.add(tbl, sheet=f'Sheet {index}', styles=styles)
+    with pytest.raises(ValueError):
+        builder.add(jobs[0][0], sheet='sheet 0')
+    builder.save(f'{tmp_path}/builder.xlsx', max_workers=max_workers)
+
+    workbook = openpyxl.load_workbook(f'{tmp_path}/builder.xlsx')
+    assert workbook.sheetnames == ['Sheet 0', 'Sheet 1', 'Sheet 2']
+    for index, (tbl, styles) in enumerate(jobs):
+        tbl.as_excel(styles=styles).save(f'{tmp_path}/single.xlsx')
+        target = openpyxl.load_workbook(f'{tmp_path}/single.xlsx')['Table']
+        to_test = workbook[f'Sheet {index}']
+        assert to_test.merged_cells.ranges == target.merged_cells.ranges
+        for row in target.iter_rows():
+            for cell in row:
+                other = to_test.cell(row=cell.row, column=cell.column)
+                assert cell.value == other.value
+                assert copy(cell.font) == copy(other.font)
+                assert copy(cell.fill) == copy(other.fill)
+                assert copy(cell.border) == copy(other.border)
+    rules = [cf.rules for cf in workbook['Sheet 2'].conditional_formatting]
+    assert [cf_rules[0].dxf.font.b for cf_rules in rules] == [True]
+
+
+def test_excel_overflow(tmp_path, monkeypatch):
+    # Title in row 1, header in row 2, data from row 3 on, footnote in row 15
+    monkeypatch.setattr(overflow, 'EXCEL_MAX_ROWS', 15)
+    cars = mtcars()
+    tbl = TableSpam(data=cars, formula='cyl ~ mpg + hp', title='Cars', footnote='Note')
+    bold = StyleSpec(font=FontSpec(bold=True))
+    styles = XlsxStyles(cell_styles=[CellStyle(rows=[1, 13], cols=['hp'], style=bold)])
+
+    files = {}
+    for mode, backend in [
+        ('default', 'openpyxl'),
+        ('stream', 'openpyxl'),
+        ('default', 'native'),
+    ]:
+        files[f'{mode}_{backend}'] = f'{tmp_path}/{mode}_{backend}.xlsx'
+        tbl.as_excel(mode=mode, backend=backend, styles=styles).save(
+            files[f'{mode}_{backend}']
+        )
+    files['write_excel'] = f'{tmp_path}/write_excel.xlsx'
+    tbl.write_excel(files['write_excel'], styles=styles)
+    files['builder'] = f'{tmp_path}/builder.xlsx'
+    builder = WorkbookBuilder()
+    builder.add(tbl, sheet='Table', styles=styles)
+    builder.save(files['builder'], max_workers=1)
+
+    for file in files.values():
+        workbook = openpyxl.load_workbook(file)
+        assert workbook.sheetnames == ['Table', 'Table (2)', 'Table (3)']
+        hp = []
+        for sheet in workbook:
+            # Each sheet repeats the title, header, and footnote
+            max_row = sheet.max_row
+            assert max_row <= 15
+            assert [sheet['A1'].value, sheet['B2'].value] == ['Cars', 'mpg']
+            assert sheet.cell(row=max_row, column=1).value == 'Note'
+            hp.extend(sheet.cell(row=row, column=3).value for row in range(3, max_row))
+        assert hp == cars['hp'].to_list()
+        # The styles of the rows are moved to the sheet that shows the row
+        assert workbook['Table']['C3'].font.b
+        assert not workbook['Table']['C4'].font.b
+        assert workbook['Table (2)']['C3'].font.b
+
+    with pytest.raises(ValueError):
+        tbl.as_excel(overflow='error')
+    with pytest.raises(ValueError):
+        tbl.write_excel(io.BytesIO(), overflow='unknown')
+    assert overflow.continuation_title('x' * 31, 2) == 'x' * 27 + ' (2)'
+
+
+def test_excel_sparse(tmp_path):
+    tbl = TableSpam(
+        data=mtcars(),
+        formula='Cars:cyl ~ mpg + hp',
+        title='Cars',
+        footnote='Note',
+    )
+    for styles in [XlsxStyles, lambda: style_color('008080')]:
+        files = {}
+        for mode, backend in [
+            ('default', 'openpyxl'),
+            ('stream', 'openpyxl'),
+            ('default', 'native'),
+        ]:
+            for sparse in [False, True]:
+                style = styles()
+                style.sparse = sparse
+                file = f'{tmp_path}/{mode}_{backend}_{sparse}.xlsx'
+                tbl.as_excel(mode=mode, backend=backend, styles=style).save(file)
+                files[mode, backend, sparse] = file
+
+        for mode, backend in [
+            ('default', 'openpyxl'),
+            ('stream', 'openpyxl'),
+            ('default', 'native'),
+        ]:
+            dense = openpyxl.load_workbook(files[mode, backend, False])['Table']
+            sparse = openpyxl.load_workbook(files[mode, backend, True])['Table']
+            assert sum(cell.has_style for cell in sparse._cells.values()) < sum(
+                cell.has_style for cell in dense._cells.values()
+            )
+            assert len(sparse.parent._fills) < len(dense.parent._fills)
+            for row in dense.iter_rows():
+                for cell in row:
+                    other = sparse.cell(row=cell.row, column=cell.column)
+                    assert cell.value == other.value
+                    assert cell.number_format == other.number_format
+                    assert copy(cell.border) == copy(other.border)
+                    assert bool(cell.font.b) == bool(other.font.b)
+                    assert cell.font.sz == other.font.sz
+                    if str(cell.fill.fgColor.rgb).upper() == '00FFFFFF':
+                        assert other.fill.fill_type is None
+                    else:
+                        assert copy(cell.fill) == copy(other.fill)
+
+
+def compare_with_reference(test_xlsx, tmp_path):
     # The created xlsx files correspond to the excel files in data.
     # We load those files and compare our results in test_xlsx to them
     for tst in test_xlsx.wbs:
@@ -156,3 +512,276 @@ def test_excel(tmp_path):
                     next
                 else:
                     raise ValueError('Mismatch between expected and read data.')
+
+
+def test_row_data_cell_ids():
+    row_data = pl.DataFrame(
+        {
+            'a': [1, 1, 1, None, None, 2],
+            'b': ['x', 'x', 'y', 'y', 'y', 'y'],
+        }
+    )
+    ids = row_data_cell_ids(row_data)
+    assert ids.tolist() == [[1, 1], [1, 1], [1, 2], [2, 3], [2, 3], [3, 4]]
+
+    # ids must not overflow for many groups
+    row_data = pl.DataFrame({'a': list(range(1000)), 'b': [1] * 1000})
+    ids = row_data_cell_ids(row_data)
+    assert ids[:, 0].tolist() == list(range(1, 1001))
+    assert ids[:, 1].tolist() == list(range(1, 1001))
+
+
+def test_rowname_merge_ranges():
+    row_data = pl.DataFrame(
+        {
+            'a': [1, 1, 1, None, None, 2],
+            'b': ['x', 'x', 'y', 'y', 'y', 'y'],
+        }
+    )
+    ranges = rowname_merge_ranges(row_data_cell_ids(row_data))
+    assert ranges == [[(0, 2), (3, 4)], [(0, 1), (3, 4)]]
+
+
+def test_style_compositor():
+    calls = []
+
+    class CountingSpec(StyleSpec):
+        def __call__(self, cell):
+            calls.append(self.number_format or 'bold')
+            super().__call__(cell)
+
+    bold = CountingSpec(font=FontSpec(bold=True))
+    digits = CountingSpec(number_format='0.00')
+
+    wb = openpyxl.Workbook()
+    compositor = StyleCompositor()
+    for row in range(1, 11):
+        compositor.assign(cell=wb.active.cell(row=row, column=1), layers=[bold, digits])
+    compositor.assign(cell=wb.active.cell(row=1, column=2), layers=[digits])
+
+    # each combination of style specs is only composed once
+    assert calls == ['bold', '0.00', '0.00']
+    assert all(wb.active.cell(row=row, column=1).font.b for row in range(1, 11))
+    assert wb.active.cell(row=10, column=1).number_format == '0.00'
+    assert not wb.active.cell(row=1, column=2).font.b
+    assert wb.active.cell(row=1, column=2).number_format == '0.00'
+
+
+def test_style_functions_read_cell(tmp_path):
+    # Style functions may depend on the value and the position of the cell
+    def negative_red(c):
+        if isinstance(c.value, (int, float)) and c.value < 0:
+            c.font = openpyxl.styles.Font(color='FFFF0000')
+
+    def odd_rows_bold(c):
+        if c.row % 2 == 1:
+            c.font = openpyxl.styles.Font(bold=True, color=c.font.color)
+
+    data = pl.DataFrame({'g': ['a', 'a', 'b'], 'x': [-1.0, 2.0, -3.0]})
+    tbl = TableSpam(data=data, formula='g ~ x')
+    styles = XlsxStyles(
+        cell_rownames=odd_rows_bold,
+        merge_rownames=False,
+        data_styles={'double': DataStyle(test=is_double, style=negative_red)},
+    )
+    files = {}
+    for mode, backend in [
+        ('default', 'openpyxl'),
+        ('stream', 'openpyxl'),
+        ('default', 'native'),
+    ]:
+        files[mode, backend] = f'{tmp_path}/{mode}_{backend}.xlsx'
+        tbl.as_excel(mode=mode, backend=backend, styles=styles).save(
+            files[mode, backend]
+        )
+    for file in files.values():
+        sheet = openpyxl.load_workbook(file)['Table']
+        # Header in row 1, data in rows 2 to 4
+        assert [sheet.cell(row=row, column=2).value for row in range(2, 5)] == [
+            -1.0,
+            2.0,
+            -3.0,
+        ]
+        colors = [sheet.cell(row=row, column=2).font.color for row in range(2, 5)]
+        assert [color is not None and color.rgb == 'FFFF0000' for color in colors] == [
+            True,
+            False,
+            True,
+        ]
+        assert [sheet.cell(row=row, column=1).font.b for row in range(2, 5)] == [
+            False,
+            True,
+            False,
+        ]
+
+
+def test_style_spec():
+    wb = openpyxl.Workbook()
+    cell = wb.active['A1']
+    spec = StyleSpec(
+        font=FontSpec(size=14, bold=True),
+        fill='FFFFFF',
+        border=BorderSpec(left='thin'),
+        alignment=AlignmentSpec(horizontal='left'),
+        number_format='0.00',
+    )
+    spec(cell)
+    assert cell.font == openpyxl.styles.Font(size=14, bold=True)
+    assert cell.fill == openpyxl.styles.PatternFill(
+        start_color='FFFFFF', fill_type='solid'
+    )
+    assert cell.border.left.style == 'thin'
+    assert cell.alignment.horizontal == 'left'
+    assert cell.number_format == '0.00'
+
+    # existing borders are retained unless retain is False
+    StyleSpec(border=BorderSpec(top='thin'))(cell)
+    assert cell.border.left.style == 'thin'
+    assert cell.border.top.style == 'thin'
+    StyleSpec(border=BorderSpec(bottom='thin', retain=False))(cell)
+    assert cell.border.left is None
+    assert cell.border.bottom.style == 'thin'
+
+    # equal specs share their openpyxl objects
+    assert openpyxl_font(FontSpec(bold=True)) is openpyxl_font(FontSpec(bold=True))
+
+
+def test_styles_picklable():
+    for styles in [XlsxStyles(), style_color('#345678')]:
+        restored = pickle.loads(pickle.dumps(styles))
+        assert restored == styles
+
+
+def test_styles_positional_fields():
+    # New fields are appended so that positional arguments keep their meaning
+    names = [field.name for field in dataclasses.fields(XlsxStyles)]
+    assert names[17:] == [
+        'merge_rownames',
+        'merged_rownames_style',
+        'footnote_style',
+        'data_styles',
+        'cell_styles',
+        'sparse',
+    ]
+
+
+def test_conditional_styles(tmp_path):
+    data = pl.DataFrame(
+        {
+            'group': ['a', 'a', 'b', 'b', 'c'],
+            'x': [1.0, 5.0, 7.0, 2.0, 9.0],
+            'y': [1, 2, 3, 4, 5],
+        }
+    )
+    tbl = TableSpam(data=data, formula='group ~ x + y')
+    bold = StyleSpec(font=FontSpec(bold=True), fill='FF0000')
+    styles = XlsxStyles(
+        cell_styles=[
+            ConditionalStyle(cols=['x', 'y'], style=bold, condition=pl.col('x') > 4),
+            ConditionalStyle(cols=['y'], style=bold, operator='>=', value=3),
+            ConditionalStyle(cols=['y'], style=bold, condition=pl.col('x') > 100),
+        ]
+    )
+    for mode, backend in [
+        ('default', 'openpyxl'),
+        ('stream', 'openpyxl'),
+        ('default', 'native'),
+    ]:
+        wb = tbl.as_excel(styles=styles, mode=mode, backend=backend)
+        wb.save(f'{tmp_path}/conditional.xlsx')
+        sheet = openpyxl.load_workbook(f'{tmp_path}/conditional.xlsx')['Table']
+        rules = {str(cf.sqref): cf.rules for cf in sheet.conditional_formatting}
+        # one rule per conditional style; rows without matches do not create a rule
+        assert set(rules) == {'B3:B4 B6 C3:C4 C6', 'C2:C6'}
+        assert rules['B3:B4 B6 C3:C4 C6'][0].formula == ['TRUE']
+        assert rules['C2:C6'][0].operator == 'greaterThanOrEqual'
+        assert rules['C2:C6'][0].formula == ['3']
+        assert rules['C2:C6'][0].dxf.font.b
+
+    with pytest.raises(ValueError):
+        tbl.as_excel(
+            styles=XlsxStyles(
+                cell_styles=[
+                    ConditionalStyle(cols=['z'], style=bold, operator='>', value=1)
+                ]
+            )
+        )
+    with pytest.raises(ValueError):
+        tbl.as_excel(
+            styles=XlsxStyles(cell_styles=[ConditionalStyle(cols=['x'], style=bold)])
+        )
+    with pytest.raises(ValueError):
+        tbl.as_excel(
+            styles=XlsxStyles(
+                cell_styles=[
+                    ConditionalStyle(cols=['x'], style=bold, condition=pl.col('x'))
+                ]
+            )
+        )
+    for unsupported in [
+        StyleSpec(alignment=AlignmentSpec(horizontal='right')),
+        StyleSpec(font=FontSpec(size=14, bold=True)),
+    ]:
+        for backend in ['openpyxl', 'native']:
+            with pytest.raises(ValueError):
+                tbl.as_excel(
+                    backend=backend,
+                    styles=XlsxStyles(
+                        cell_styles=[
+                            ConditionalStyle(
+                                cols=['x'], style=unsupported, operator='>', value=1
+                            )
+                        ]
+                    ),
+                )
+
+
+def test_conditional_styles_without_rows(tmp_path):
+    tbl = TableSpam(data=mtcars().head(0), formula='cyl ~ mpg + hp')
+    bold = StyleSpec(font=FontSpec(bold=True))
+    styles = XlsxStyles(
+        cell_styles=[
+            ConditionalStyle(cols=['mpg'], style=bold, operator='>', value=20),
+            ConditionalStyle(cols=['hp'], style=bold, condition=pl.col('hp') > 100),
+        ]
+    )
+    for mode, backend in [
+        ('default', 'openpyxl'),
+        ('stream', 'openpyxl'),
+        ('default', 'native'),
+    ]:
+        wb = tbl.as_excel(styles=styles, mode=mode, backend=backend)
+        wb.save(f'{tmp_path}/conditional.xlsx')
+        sheet = openpyxl.load_workbook(f'{tmp_path}/conditional.xlsx')['Table']
+        assert list(sheet.conditional_formatting) == []
+        assert sheet['B1'].value == 'mpg'
+
+
+def test_conditional_styles_many_runs(tmp_path):
+    # Every other row matches, so each matching row is a run of its own
+    data = pl.DataFrame({'group': range(2_000), 'x': range(2_000), 'y': range(2_000)})
+    tbl = TableSpam(data=data, formula='group ~ x + y')
+    bold = StyleSpec(font=FontSpec(bold=True))
+    styles = XlsxStyles(
+        cell_styles=[
+            ConditionalStyle(
+                cols=['x', 'y'], style=bold, condition=pl.col('x') % 2 == 0
+            ),
+            ConditionalStyle(cols=['x', 'y'], style=bold, operator='>', value=10),
+        ]
+    )
+    for backend in ['openpyxl', 'native']:
+        wb = tbl.as_excel(styles=styles, backend=backend)
+        wb.save(f'{tmp_path}/conditional.xlsx')
+        sheet = openpyxl.load_workbook(f'{tmp_path}/conditional.xlsx')['Table']
+        sizes = sorted(len(cf.sqref.ranges) for cf in sheet.conditional_formatting)
+        # The threshold covers each column with one range, the expression needs one
+        # range per matching row and column
+        assert sizes == [2, 2_000]
+        ranges = {
+            str(cell_range)
+            for cf in sheet.conditional_formatting
+            for cell_range in cf.sqref.ranges
+        }
+        assert {'B2', 'C2', 'B2000', 'C2000'} <= ranges
+        assert 'B3' not in ranges
@@ -1,7 +1,16 @@
-from tablespam._Formula.Formulas import Formula
+from tablespam._Formula import Formulas
+from tablespam._Formula.Formulas import (
+    Formula,
+    clear_formula_cache,
+    set_formula_cache_size,
+    _entries_cache,
+)
 from tablespam._Formula.Entry import HeaderEntry
+from tablespam._Formula.Layout import HeaderLayout, LHS, RHS
+from tablespam._Formula.Parser import FormulaParseError, parse_variable
 import pytest
-import pyparsing
+import random
+import numpy as np
 
 
 def test_valid_formulas():
@@ -75,12 +84,12 @@ def test_valid_formulas():
 
 
 def test_invalid_formulas():
-    with pytest.raises(pyparsing.exceptions.ParseException):
+    with pytest.raises(FormulaParseError):
         f = Formula('x1 + x2 + a:y1 + b:y2 + y3')
         assert f.parse_formula()
 
     # incorrect symbol (*)
-    with pytest.raises(pyparsing.exceptions.ParseException):
+    with pytest.raises(FormulaParseError):
         f = Formula('x1 + x2 ~ a*y1 + b:y2 + y3')
         assert f.parse_formula()
 
@@ -93,9 +102,177 @@ def test_invalid_formulas():
         assert f.get_entries()
 
     # too many ~
-    with pytest.raises(pyparsing.exceptions.ParseException):
+    with pytest.raises(FormulaParseError):
         f = Formula('x1 + x2 ~~ y1 + b:y2 + y3')
         assert f.parse_formula()
 
 
+def test_header_layout():
+    trees = Formula('x ~ y1 + (A = a:y2 + (B = y3 + y4))').get_trees()
+    layout = HeaderLayout(lhs=trees['lhs'], rhs=trees['rhs'])
+    assert layout.has_lhs
+    assert (layout.max_level, layout.n_rows) == (4, 3)
+    assert (layout.lhs_width, layout.rhs_width, layout.n_cols) == (1, 4, 5)
+    assert layout.names.tolist() == [
+        '_BASE_LEVEL_',
+        'x',
+        '_BASE_LEVEL_',
+        'y1',
+        'A',
+        'a',
+        'B',
+        'y3',
+        'y4',
+    ]
+    assert layout.item_names[5] == 'y2'
+    assert layout.side.tolist() == [LHS, LHS, RHS, RHS, RHS, RHS, RHS, RHS, RHS]
+    assert layout.parent.tolist() == [-1, 0, -1, 2, 2, 4, 4, 6, 6]
+    assert layout.row.tolist() == [1, 2, -1, 2, 0, 2, 1, 2, 2]
+    assert layout.col.tolist() == [0, 0, 1, 1, 2, 2, 3, 3, 4]
+    assert layout.width.tolist() == [1, 1, 4, 1, 3, 1, 2, 1, 1]
+    assert layout.ids[7] == '__BASE_LEVEL__A_B_y3'
+    assert layout.cells.tolist() == [1, 3, 4, 5, 6, 7, 8]
+    assert layout.merges.tolist() == [4, 6]
+    assert layout.children(4).tolist() == [5, 6]
+    assert layout.spanners(RHS).tolist() == [2, 4, 6]
+    assert np.array_equal(layout.spanners(LHS), [0])
+
+    trees = Formula('1 ~ y1 + y2').get_trees()
+    layout = HeaderLayout(lhs=trees['lhs'], rhs=trees['rhs'])
+    assert not layout.has_lhs
+    assert (layout.lhs_width, layout.n_cols, layout.n_rows) == (0, 2, 1)
+    assert layout.col.tolist() == [0, 0, 1]
+
+
+@pytest.fixture
+def formula_cache():
+    # The cache is shared by the whole package; restore it for the other tests.
+    size = Formulas._entries_cache_size
+    clear_formula_cache()
+    yield _entries_cache
+    set_formula_cache_size(size)
+    clear_formula_cache()
+
+
+def test_formula_cache(formula_cache):
+    trees = Formula('x ~ y1 + y2').get_trees()
+    assert Formula('x ~ y1 + y2').get_trees() is trees
+    assert list(_entries_cache) == ['x ~ y1 + y2']
+
+    # least recently used formulas are dropped
+    set_formula_cache_size(2)
+    Formula('x ~ y1').get_trees()
+    Formula('x ~ y1 + y2').get_trees()
+    Formula('x ~ y2').get_trees()
+    assert list(_entries_cache) == ['x ~ y1 + y2', 'x ~ y2']
+
+    set_formula_cache_size(0)
+    assert len(_entries_cache) == 0
+    f = Formula('x ~ y1 + y2')
+    assert f.get_trees() is not trees
+    assert f.get_entries() == Formula('x ~ y1 + y2').get_entries()
+    assert len(_entries_cache) == 0
+
+    with pytest.raises(ValueError):
+        set_formula_cache_size(-1)
+
+
+def test_header_tree():
+    tree = Formula('x ~ y1 + (A = a:y2 + (B = y3 + y4))').get_trees()['rhs']
+    assert tree.name == ['_BASE_LEVEL_', 'y1', 'A', 'a', 'B', 'y3', 'y4']
+    assert tree.item_name[3] == 'y2'
+    assert list(tree.parent) == [-1, 0, 0, 2, 2, 4, 4]
+    assert list(tree.width) == [4, 1, 3, 1, 2, 1, 1]
+    assert list(tree.level) == [4, 1, 3, 1, 2, 1, 1]
+    assert list(tree.children(2)) == [3, 4]
+    assert tree.variables == ['y1', 'y2', 'y3', 'y4']
+
+    entry = tree.to_entry()
+    assert [child.name for child in entry.entries] == ['y1', 'A']
+    assert entry.entries[1].entries[1].width == 2
+
+    # wide and deeply nested headers are created without recursion
+    columns = [f'v{i}' for i in range(20_000)]
+    tree = Formula('x ~ (S = ' + ' + '.join(columns) + ')').get_trees()['rhs']
+    assert tree.width[0] == 20_000
+    assert tree.variables == columns
+
+    depth = 200
+    tree = Formula('x ~ ' + '(A = ' * depth + 'y' + ')' * depth).get_trees()['rhs']
+    assert tree.level[0] == depth + 2
+    entry = tree.to_entry()
+    assert entry == tree.to_entry()
+
+    with pytest.raises(ValueError, match='Expected a spanner name'):
+        Formula('x ~ (y)').get_trees()
+
+
+def test_parse_errors():
+    with pytest.raises(FormulaParseError) as error:
+        Formula('x1 + x2 ~ a*y1').parse_formula()
+    assert str(error.value) == (
+        "Expected end of text, found '*'  (at char 11), (line:1, col:12)"
+    )
+    assert (error.value.loc, error.value.lineno, error.value.col) == (11, 1, 12)
+
+    with pytest.raises(FormulaParseError) as error:
+        Formula('x ~ (A = y1 +\n y2').parse_formula()
+    assert str(error.value) == (
+        "Expected ')', found end of text  (at char 17), (line:2, col:4)"
+    )
+
+    with pytest.raises(FormulaParseError, match="Expected '~', found '2'"):
+        Formula('12 ~ y').parse_formula()
+
+    assert parse_variable('`a\\`b`:c') == ('a`b', 'c')
+    with pytest.raises(FormulaParseError, match='Expected a variable'):
+        parse_variable('=')
+
+
+def random_formula(rng: random.Random) -> str:
+    tokens = ['x', 'y1', '_z', '`a b`', '`a\\`b`', 'a:b', '`c`:d', '1', ':']
+    tokens += ['+', '+', '=', '(', ')', '~', ' ', '\n', '\t', '*', '`', '']
+    return ''.join(rng.choice(tokens) for _ in range(rng.randint(0, 12)))
+
+
+def test_reference_parser():
+    pytest.importorskip('pyparsing')
+    from pyparsing.exceptions import ParseException
+    from tests.reference_parser import (
+        reference_parse_formula,
+        reference_split_variable,
+    )
+
+    formulas = [
+        'x ~ y',
+        '1~y',
+        '  x\n~\ty ',
+        'x ~ (A = (B = y1 + y2) + `y 3`) + c:`d e`',
+        'x ~ a=b=c',
+        'x ~ y +',
+        'x ~ a: b',
+        'x ~ b + (a + ',
+        '(x ~ y',
+        '~ y',
+        '',
+    ]
+    rng = random.Random(1)
+    formulas += [random_formula(rng) for _ in range(2000)]
+    formulas += ['x ~ ' + random_formula(rng) for _ in range(2000)]
+
+    for formula in formulas:
+        try:
+            expected = reference_parse_formula(formula)
+        except ParseException as reference_error:
+            with pytest.raises(FormulaParseError) as error:
+                Formula(formula).parse_formula()
+            assert error.value.loc == reference_error.loc, formula
+            assert error.value.found == reference_error.found, formula
+        else:
+            assert Formula(formula).parse_formula() == expected, formula
+
+    for variable in ['a', 'a:b', '`a b`:c', '`a\\`b`', '`a\\tb`:`c\\)`', 'a:b:c']:
+        assert parse_variable(variable) == reference_split_variable(variable)
+
+
 test_invalid_formulas()
@@ -2,6 +2,7 @@ from tablespam import TableSpam
 import polars as pl
 import great_tables as gt
 import re
+from datetime import date
 
 
 def compare_tables(tbl_1: gt.GT, tbl_2: gt.GT) -> bool:
@@ -352,3 +353,45 @@ def test_cars_no_footnote():
         .sub_missing(missing_text='')
     )
     assert compare_tables(tbl, expected)
+
+
+def test_cars_renamed_items():
+    tbl = TableSpam(
+        data=cars,
+        formula='1 ~ (Engine = (Power = HP:hp + Cylinder:cyl) + disp) + Weight:wt',
+    ).as_gt(formatting=None)
+    expected = (
+        gt.GT(cars.select(['hp', 'cyl', 'disp', 'wt']))
+        .tab_spanner(
+            label='Power', id='__BASE_LEVEL__Engine_Power', columns=['hp', 'cyl']
+        )
+        .tab_spanner(
+            label='Engine',
+            id='__BASE_LEVEL__Engine',
+            columns=['disp'],
+            spanners=['__BASE_LEVEL__Engine_Power'],
+        )
+        .cols_label(hp='HP', cyl='Cylinder', wt='Weight')
+    )
+    assert compare_tables(tbl, expected)
+
+
+def test_default_formatting():
+    data = pl.DataFrame(
+        {
+            'x': [1.234, None],
+            'y': [2.5, 3.25],
+            'day': [date(2024, 1, 1), None],
+            'n': [1, 2],
+        }
+    )
+    tbl = TableSpam(data=data, formula='1 ~ x + y + day + n').as_gt()
+    expected = (
+        gt.GT(data)
+        .fmt_number(columns=['x', 'y'], decimals=2)
+        .fmt_date(columns=['day'])
+        .sub_missing(missing_text='')
+    )
+    assert compare_tables(tbl, expected)
+    # Missing values are shown as empty cells
+    assert 'None' not in tbl.as_raw_html()
@@ -0,0 +1,94 @@
+import io
+import re
+from tablespam import TableSpam
+from tablespam._as_html.as_html import rowname_spans
+import polars as pl
+
+data = pl.DataFrame(
+    {
+        'group': ['a', 'a', 'a', 'b', 'b'],
+        'sub': [1, 1, 2, 2, 2],
+        'x': [1.234, None, 3.0, 4.5, 5.0],
+        'text': ['<b>', 'Q&A', '"quoted"', 'plain', None],
+        'n': [1, 2, 3, 4, 5],
+    }
+)
+
+
+def to_html(tbl: TableSpam, **kwargs) -> str:
+    html = io.StringIO()
+    tbl.to_html(html, **kwargs)
+    return html.getvalue()
+
+
+def test_html_header():
+    tbl = TableSpam(
+        data=data,
+        formula='(Groups = group + sub) ~ (Values = X:x + (Text = text)) + n',
+        title='Title & more',
+        footnote='Footnote',
+    )
+    html = to_html(tbl)
+    header = html.split('<thead>')[1].split('</thead>')[0].splitlines()[1:]
+    assert header == [
+        '<tr><th colspan="5" class="tablespam-title">Title &amp; more</th></tr>',
+        '<tr><th colspan="2" rowspan="2" class="tablespam-spanner tablespam-rownames">Groups</th>'
+        '<th colspan="2" class="tablespam-spanner">Values</th><th rowspan="3">n</th></tr>',
+        '<tr><th rowspan="2">X</th><th class="tablespam-spanner">Text</th></tr>',
+        '<tr><th>group</th><th class="tablespam-rownames">sub</th><th>text</th></tr>',
+    ]
+    assert '<tfoot>\n<tr><td colspan="5">Footnote</td></tr>\n</tfoot>' in html
+
+
+def test_html_body(tmp_path):
+    tbl = TableSpam(data=data, formula='group + sub ~ x + text')
+    html = to_html(tbl)
+    body = html.split('<tbody>\n')[1].split('\n</tbody>')[0].splitlines()
+    assert body[0] == (
+        '<tr><td rowspan="3" class="tablespam-rowname">a</td>'
+        '<td rowspan="2" class="tablespam-rowname tablespam-rownames">1</td>'
+        '<td>1.23</td><td>&lt;b&gt;</td></tr>'
+    )
+    assert body[1] == '<tr><td></td><td>Q&amp;A</td></tr>'
+    assert body[2] == (
+        '<tr><td class="tablespam-rowname tablespam-rownames">2</td>'
+        '<td>3.0</td><td>&quot;quoted&quot;</td></tr>'
+    )
+    assert len(body) == data.height
+    # Each row has one cell per column unless it is merged into a row name above
+    rowspans = sum(int(span) - 1 for span in re.findall(r'rowspan="(\d+)"', html))
+    assert html.count('<td') == data.height * 4 - rowspans
+
+    # Merged row names span chunks
+    for chunk_rows in [1, 2, 10]:
+        assert to_html(tbl, chunk_rows=chunk_rows) == html
+
+    assert 'rowspan' not in to_html(tbl, merge_rownames=False)
+
+    tbl.to_html(tmp_path / 'table.html')
+    assert (tmp_path / 'table.html').read_text(encoding='utf-8') == html
+
+
+def test_rowname_spans_per_chunk():
+    row_data = pl.DataFrame(
+        {
+            'group': ['a'] * 7 + ['b'] * 3 + [None] * 2,
+            'sub': [1, 1, 1, 1, 2, 2, 2, 2, 2, 3, None, None],
+        }
+    )
+    expected = {
+        'span_0': [7, 0, 0, 0, 0, 0, 0, 3, 0, 0, 2, 0],
+        'span_1': [4, 0, 0, 0, 3, 0, 0, 2, 0, 1, 2, 0],
+    }
+    for length in [1, 2, 3, 5, 12]:
+        spans = pl.concat(
+            [
+                rowname_spans(
+                    row_data=row_data,
+                    offset=offset,
+                    length=min(length, row_data.height - offset),
+                )
+                for offset in range(0, row_data.height, length)
+            ]
+        )
+        assert spans.to_dict(as_series=False) == expected
@@ -0,0 +1,38 @@
+import subprocess
+import sys
+
+
+def imported_modules(code: str) -> set[str]:
+    # Run the code in a new interpreter so that no module is imported yet
+    script = f'{code}\nimport sys\nprint(" ".join(sys.modules))'
+    result = subprocess.run(
+        [sys.executable, '-c', script], capture_output=True, text=True, check=True
+    )
+    return set(result.stdout.split())
+
+
+def test_backends_are_imported_lazily():
+    modules = imported_modules(
+        'import polars as pl\n'
+        'from tablespam import TableSpam\n'
+        "tbl = TableSpam(data=pl.DataFrame({'a': [1], 'b': [2]}), formula='a ~ b')\n"
+        'tbl.as_string()'
+    )
+    assert 'great_tables' not in modules
+    assert 'openpyxl' not in modules
+    assert 'pyparsing' not in modules
+
+    modules = imported_modules('from tablespam import XlsxStyles')
+    assert 'openpyxl' in modules
+    assert 'great_tables' not in modules
+
+
+def test_package_does_not_require_test_dependencies():
+    # pyparsing is only used by the reference parser in the tests
+    modules = imported_modules(
+        'import importlib, pkgutil, tablespam\n'
+        'for module in pkgutil.walk_packages(tablespam.__path__, "tablespam."):\n'
+        '    importlib.import_module(module.name)'
+    )
+    assert 'tablespam._Formula.Parser' in modules
+    assert 'pyparsing' not in modules
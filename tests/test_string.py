@@ -1,4 +1,6 @@
+import io
 from tablespam import TableSpam
+import pytest
 import polars as pl
 
 cars = pl.DataFrame(
@@ -157,3 +159,103 @@ def test_cars_no_footnote():
 | ...      ...    | ... ...         ...  ...    ...  |
 """
     assert tbl == expected
+
+
+def test_lazy_frame(tmp_path):
+    formula = 'Cylinder:cyl + Engine:vs ~ N + (`Horse Power` = Mean:mean_hp + SD:sd_hp)'
+    summarized_table.write_parquet(tmp_path / 'cars.parquet')
+    tbl = TableSpam(data=pl.scan_parquet(tmp_path / 'cars.parquet'), formula=formula)
+
+    # Only the variables of the formula are read and nothing is collected yet
+    assert tbl._table_data is None
+    assert tbl._lazy_data is not None
+    assert tbl._lazy_data.collect_schema().names() == [
+        'cyl',
+        'vs',
+        'N',
+        'mean_hp',
+        'sd_hp',
+    ]
+
+    assert (
+        tbl.as_string() == TableSpam(data=summarized_table, formula=formula).as_string()
+    )
+    assert tbl.table_data['row_data'].columns == ['cyl', 'vs']
+
+    with pytest.raises(pl.exceptions.ColumnNotFoundError):
+        TableSpam(data=summarized_table.lazy(), formula='cyl ~ missing')
+
+
+def test_projected_data():
+    formula = 'Cylinder:cyl + Engine:vs ~ N + (`Horse Power` = Mean:mean_hp + SD:sd_hp)'
+    tbl = TableSpam(data=summarized_table, formula=formula, keep_data=False)
+
+    assert tbl.data is None
+    assert tbl.projected_data.columns == ['cyl', 'vs', 'N', 'mean_hp', 'sd_hp']
+    assert tbl.table_data['row_data'].columns == ['cyl', 'vs']
+    assert tbl.table_data['col_data'].columns == ['N', 'mean_hp', 'sd_hp']
+    assert tbl.as_gt()._tbl_data is tbl.projected_data
+    assert (
+        tbl.as_string() == TableSpam(data=summarized_table, formula=formula).as_string()
+    )
+
+
+def test_duplicated_variables():
+    # A variable may be used as row name and as column
+    expected = TableSpam(data=summarized_table, formula='cyl ~ cyl + N').as_string()
+    assert '| cyl | cyl N   |' in expected
+    tbl = TableSpam(data=summarized_table.lazy(), formula='cyl ~ cyl + N')
+    assert tbl.projected_data.columns == ['cyl', 'N']
+    assert tbl.as_string() == expected
+    tbl.as_excel()
+
+    for data in [summarized_table, summarized_table.lazy()]:
+        for formula in ['cyl ~ N + N', 'cyl + cyl ~ N']:
+            with pytest.raises(ValueError, match='more than once'):
+                TableSpam(data=data, formula=formula)
+
+
+def test_cell_formatting():
+    data = pl.DataFrame(
+        {
+            'name': ['a', 'a very long name', None, 'd'],
+            'x': [1.2345, None, 3.0, 4.0],
+            'flag': [True, None, False, True],
+        }
+    )
+    tbl = TableSpam(data=data, formula='name ~ (`A long spanner` = x + flag)')
+
+    expected = """
+|        | A long       |
+| name   | x      flag  |
+| ------ - ------ ----- |
+| a      | 1.2    true  |
+| a very | None   None  |
+| None   | 3.0    false |
+| ...    | ...    ...   |
+"""
+    assert tbl.as_string(digits=1, n=3, max_char=6) == expected
+
+
+def test_iter_lines(tmp_path):
+    tbl = TableSpam(
+        data=cars,
+        formula='cyl ~ (Engine = mpg + hp) + wt',
+        title='Cars',
+        footnote='Footnote',
+    )
+    full = tbl.as_string(n=cars.height)
+    assert '\n'.join(tbl.iter_lines()) + '\n' == full
+    # The widths are the same no matter how the rows are split into batches
+    for batch_size in [1, 3, 100]:
+        assert list(tbl.iter_lines(batch_size=batch_size)) == list(tbl.iter_lines())
+    assert '\n'.join(tbl.iter_lines(n=3, batch_size=2)) + '\n' == tbl.as_string()
+
+    tbl.to_text(tmp_path / 'table.txt', batch_size=4)
+    assert (tmp_path / 'table.txt').read_text(encoding='utf-8') == full
+    stream = io.StringIO()
+    tbl.to_text(stream)
+    assert stream.getvalue() == full
+
+    with pytest.raises(ValueError, match='batch_size'):
+        list(tbl.iter_lines(batch_size=0))